@@ -0,0 +1,408 @@
+# benchmarks/harness.py
+"""
+Offline end-to-end benchmark: the real handlers in main.py and the real services, with every
+provider (Telegram, Gemini, Groq, Perplexity, Serper, image hosts, LinkedIn) served by the
+local stand-ins in benchmarks/stand_ins.py. Nothing leaves the host.
+
+    python -m benchmarks.harness --flows 120 --concurrency 12
+    python -m benchmarks.harness --latency-scale 0.1 --json report.json --max-p95 20 --max-rss-mb 400
+
+Each synthetic user walks one FSM flow through Dispatcher.feed_update:
+    story_text    /start -> Story Mode -> English -> text note
+    story_voice   /start -> Story Mode -> English -> voice note (Groq)
+    generator     /start -> Generator Mode -> lens briefing (angle + Perplexity) -> text reaction
+then one visual path (web | ai | upload | skip) and Publish, timed until the queue job is done.
+--mix picks combinations (e.g. "story_voice:web,generator:ai"); by default all twelve rotate.
+
+--profile is a JSON file keyed by provider (telegram, gemini, gemini_image, groq, perplexity,
+serper, images, linkedin) with any of p50, p95 (seconds, log-normal), error_rate, error_status
+and payload; see stand_ins.DEFAULT_PROFILES. The stand-ins run in a child process, so the
+reported peak RSS is the bot's own (plus the media worker processes).
+
+Reports p50/p95/p99 per step and per flow, flows/s, updates/s and peak RSS.
+Exits with status 1 when a --max-* gate is exceeded.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+import statistics
+import logging
+import contextlib
+from collections import Counter, defaultdict
+import aiohttp
+from aiogram import types
+from benchmarks.stand_ins import PROVIDERS, GeminiStandInClient, bot_env, stand_in_urls
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_TOKEN = "123456:HARNESS-BENCHMARK"
+FIRST_USER_ID = 500_000
+VOICE_SECONDS = 20
+FLOWS = ("story_text", "story_voice", "generator")
+VISUALS = ("web", "ai", "upload", "skip")
+
+TEXT_NOTE = (
+    "Last week we cut our onboarding sequence from seven emails to three and activation went up about "
+    "eighteen percent. I think people were tired of us and the three emails each asked for one action."
+)
+REACTION = "I agree with half of this. In our team the same trick worked only after we fixed pricing."
+
+# Tunables the harness picks unless the caller's environment already sets them.
+HARNESS_DEFAULTS = {
+    "LLM_CACHE_ENABLED": "0",          # measure provider calls, not cache hits
+    "BRIEFING_POOL_SIZE": "0",         # research on demand; set it to measure the warm pool instead
+    "PUBLISH_BACKOFF_BASE": "0.5",
+    "PUBLISH_POLL_INTERVAL": "0.2",
+    "METRICS_PORT": "0",
+    "TRACE_LOG": "0",
+}
+
+
+def percentiles(values):
+    if not values:
+        return {"n": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    q = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return {"n": len(values), "p50": q[49], "p95": q[94], "p99": q[98], "max": max(values)}
+
+def peak_rss_mb(pid="self"):
+    """VmHWM (peak resident set) from /proc, None where that is not available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid == "self":
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 if sys.platform != "darwin" else rss / (1024 * 1024)
+    return None
+
+def parse_mix(spec):
+    if not spec:
+        return list(itertools.product(FLOWS, VISUALS))
+    mix = []
+    for item in spec.split(","):
+        flow, _, visual = item.strip().partition(":")
+        if flow not in FLOWS or visual not in VISUALS:
+            raise SystemExit(f"❌ Unknown flow '{item}'. Flows: {', '.join(FLOWS)}; visuals: {', '.join(VISUALS)}.")
+        mix.append((flow, visual))
+    return mix
+
+
+class FlowFailed(Exception):
+    def __init__(self, step, reason):
+        self.step = step
+        super().__init__(f"{step}: {reason}")
+
+
+# --- 1. SYNTHETIC USERS ---
+class Harness:
+    """Feeds synthetic updates into the real dispatcher and times every step."""
+
+    def __init__(self, bot_module, publish_timeout):
+        self.app = bot_module
+        self.publish_timeout = publish_timeout
+        self.steps = defaultdict(list)
+        self.flows = defaultdict(list)
+        self.outcomes = Counter()
+        self.updates = 0
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id):
+        return {"id": user_id, "is_bot": False, "first_name": "Bench"}
+
+    def _message(self, user_id, from_bot=False, **fields):
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "Linketron"} if from_bot else self._user(user_id),
+            **fields,
+        }
+
+    async def feed(self, step, payload):
+        update = types.Update.model_validate(
+            {"update_id": next(self._update_ids), **payload}, context={"bot": self.app.bot}
+        )
+        started = time.perf_counter()
+        await self.app.dp.feed_update(self.app.bot, update)
+        self.steps[step].append(time.perf_counter() - started)
+        self.updates += 1
+
+    async def send_text(self, step, user_id, text):
+        entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else None
+        fields = {"text": text, **({"entities": entities} if entities else {})}
+        await self.feed(step, {"message": self._message(user_id, **fields)})
+
+    async def send_voice(self, step, user_id):
+        file_id = f"voice_{user_id}_{next(self._message_ids)}"
+        voice = {"file_id": file_id, "file_unique_id": f"u{file_id}", "duration": VOICE_SECONDS}
+        await self.feed(step, {"message": self._message(user_id, voice=voice)})
+
+    async def send_photo(self, step, user_id):
+        file_id = f"photo_{user_id}_{next(self._message_ids)}"
+        photo = [{"file_id": file_id, "file_unique_id": f"u{file_id}", "width": 1280, "height": 800}]
+        await self.feed(step, {"message": self._message(user_id, photo=photo)})
+
+    async def click(self, step, user_id, data):
+        await self.feed(step, {"callback_query": {
+            "id": str(next(self._update_ids)),
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "message": self._message(user_id, from_bot=True, text="..."),
+            "data": data,
+        }})
+
+    def context(self, user_id):
+        return self.app.dp.fsm.get_context(bot=self.app.bot, chat_id=user_id, user_id=user_id)
+
+    async def expect_state(self, step, user_id, expected):
+        state = await self.context(user_id).get_state()
+        if state != expected.state:
+            raise FlowFailed(step, f"state is {state}")
+
+    async def wait_published(self, user_id, draft_id):
+        key = self.app.draft_key(user_id, draft_id)
+        started = time.perf_counter()
+        while time.perf_counter() - started < self.publish_timeout:
+            job = self.app.publish_queue.get(key)
+            if job and job["status"] == "done":
+                self.steps["publish_job"].append(time.perf_counter() - started)
+                return
+            if job and job["status"] == "failed":
+                raise FlowFailed("publish_job", job["result"])
+            await asyncio.sleep(0.05)
+        raise FlowFailed("publish_job", "timed out")
+
+    async def run_flow(self, user_id, flow, visual):
+        states = self.app.BotState
+        started = time.perf_counter()
+        await self.send_text("start", user_id, "/start")
+        if flow == "generator":
+            await self.click("mode", user_id, "mode_generator")
+            await self.click("research", user_id, "lens_principle")
+            await self.expect_state("research", user_id, states.waiting_for_reaction)
+            await self.send_text("draft_text", user_id, REACTION)
+        else:
+            await self.click("mode", user_id, "mode_story")
+            await self.click("language", user_id, "lang_en_story")
+            if flow == "story_voice":
+                await self.send_voice("draft_voice", user_id)
+            else:
+                await self.send_text("draft_text", user_id, TEXT_NOTE)
+        await self.expect_state("draft", user_id, states.waiting_for_visual_choice)
+
+        if visual == "upload":
+            await self.click("visual_upload", user_id, "visual_upload")
+            await self.send_photo("upload_photo", user_id)
+        else:
+            await self.click(f"visual_{visual}", user_id, f"visual_{visual}")
+        data = await self.context(user_id).get_data()
+        if visual != "skip" and not data.get("image_file_id"):
+            self.outcomes["no_image"] += 1
+
+        await self.click("publish", user_id, "action_publish")
+        await self.wait_published(user_id, data.get("draft_id"))
+        self.flows[f"{flow}+{visual}"].append(time.perf_counter() - started)
+
+    async def run(self, mix, flows, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            flow, visual = mix[i % len(mix)]
+            user_id = FIRST_USER_ID + i
+            self.app.save_user_credentials(user_id, "stand-in-token", "STANDIN_USER")
+            async with limit:
+                try:
+                    await self.run_flow(user_id, flow, visual)
+                    self.outcomes["ok"] += 1
+                except FlowFailed as e:
+                    self.outcomes[f"failed:{e.step}"] += 1
+                except Exception as e:
+                    self.outcomes[f"error:{type(e).__name__}"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(flows)))
+        return time.perf_counter() - started
+
+
+# --- 2. STAND-INS + BOT ---
+async def wait_for_stand_ins(urls, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        for url in urls.values():
+            while True:
+                try:
+                    async with session.get(f"{url}/stats") as resp:
+                        if resp.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"❌ Stand-in at {url} did not come up.")
+                await asyncio.sleep(0.1)
+
+async def provider_stats(urls):
+    stats = {}
+    async with aiohttp.ClientSession() as session:
+        for name, url in urls.items():
+            async with session.get(f"{url}/stats") as resp:
+                stats[name] = await resp.json()
+    return stats
+
+def _total(value):
+    return sum(value.values()) if isinstance(value, dict) else value
+
+async def run(args, workdir):
+    urls = stand_in_urls(args.host, args.base_port)
+    os.environ.update(bot_env(urls))
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": FAKE_TOKEN,
+        "BOT_MODE": "polling",
+        "CREDENTIALS_DB": os.path.join(workdir, "user_secrets.db"),
+        "LLM_CACHE_DB": os.path.join(workdir, "llm_cache.db"),
+        "PUBLISH_DB": os.path.join(workdir, "publish_queue.db"),
+        "FSM_DB": os.path.join(workdir, "fsm_state.db"),
+    })
+    for name, value in HARNESS_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
+    command = [sys.executable, "-m", "benchmarks.stand_ins", "--host", args.host,
+               "--base-port", str(args.base_port), "--latency-scale", str(args.latency_scale)]
+    if args.profile:
+        command += ["--profile", os.path.abspath(args.profile)]
+    stand_ins = await asyncio.create_subprocess_exec(
+        *command, cwd=BOT_DIR, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        await wait_for_stand_ins(urls)
+
+        # Imported only now: main.py and the services read their configuration at import time.
+        sys.path.insert(0, BOT_DIR)
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            import main as bot_module
+            from services import models, media_processor
+            from services.slop_linter import slop_linter
+            if not args.verbose:
+                logging.getLogger("aiogram").setLevel(logging.WARNING)
+
+            gemini = GeminiStandInClient(urls["gemini"])
+            models.use_backend(gemini.model, gemini)
+            await bot_module.dp.emit_startup(bot=bot_module.bot, dispatcher=bot_module.dp)
+
+            harness = Harness(bot_module, args.publish_timeout)
+            elapsed = await harness.run(parse_mix(args.mix), args.flows, args.concurrency)
+
+            pool = media_processor._pool
+            worker_rss = [peak_rss_mb(pid) for pid in getattr(pool, "_processes", None) or {}]
+            bot_rss = peak_rss_mb()
+            providers = await provider_stats(urls)
+            linter = slop_linter.stats()
+
+            await bot_module.dp.emit_shutdown(bot=bot_module.bot, dispatcher=bot_module.dp)
+            await bot_module.bot.session.close()
+            await gemini.close()
+    finally:
+        stand_ins.terminate()
+        await stand_ins.wait()
+
+    all_flows = [s for values in harness.flows.values() for s in values]
+    return {
+        "config": {"flows": args.flows, "concurrency": args.concurrency, "mix": args.mix or "all",
+                   "latency_scale": args.latency_scale, "profile": args.profile},
+        "elapsed_s": elapsed,
+        "flows_per_s": len(all_flows) / elapsed if elapsed else 0,
+        "updates_per_s": harness.updates / elapsed if elapsed else 0,
+        "outcomes": dict(harness.outcomes),
+        "flow": percentiles(all_flows),
+        "flows": {name: percentiles(values) for name, values in sorted(harness.flows.items())},
+        "steps": {name: percentiles(values) for name, values in harness.steps.items()},
+        "peak_rss_mb": {"bot": bot_rss, "media_workers": max(filter(None, worker_rss), default=None)},
+        "providers": providers,
+        "slop_linter": linter,
+    }
+
+
+# --- 3. REPORT ---
+def print_report(report):
+    config = report["config"]
+    print(f"🧪 Harness: {config['flows']} flows, concurrency {config['concurrency']}, "
+          f"mix {config['mix']}, latency x{config['latency_scale']}")
+    print(f"{'':<22} {'n':>5} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    rows = [("step " + name, stats) for name, stats in report["steps"].items()]
+    rows += [("flow " + name, stats) for name, stats in report["flows"].items()]
+    rows.append(("flow (all)", report["flow"]))
+    for name, s in rows:
+        print(f"{name:<22} {s['n']:>5} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f}")
+
+    outcomes = report["outcomes"]
+    print(f"✅ {outcomes.get('ok', 0)} ok | " + " | ".join(f"{k} {v}" for k, v in outcomes.items() if k != "ok"))
+    print(f"⏱️ {report['elapsed_s']:.1f}s: {report['flows_per_s']:.2f} flows/s, {report['updates_per_s']:.1f} updates/s")
+    rss = report["peak_rss_mb"]
+    workers = f"{rss['media_workers']:.0f} MB" if rss["media_workers"] else "n/a"
+    print(f"🧠 Peak RSS: bot {rss['bot']:.0f} MB | media worker {workers}")
+    print("📡 Provider calls: " + " | ".join(
+        f"{name} {_total(s['calls'])} ({_total(s['failures'])} failed)" for name, s in report["providers"].items()
+    ))
+    linter = report["slop_linter"]
+    print(f"🧽 Cleaner skipped: {linter['skip_rate']:.0%} ({linter['skipped']}/{linter['checked']} drafts, "
+          f"{linter['fixes']} local fixes)")
+
+def check_gates(report, args):
+    """Returns the list of exceeded gates."""
+    exceeded = []
+    if args.max_p95 is not None and report["flow"]["p95"] > args.max_p95:
+        exceeded.append(f"flow p95 {report['flow']['p95']:.2f}s > {args.max_p95:.2f}s")
+    if args.max_rss_mb is not None and report["peak_rss_mb"]["bot"] > args.max_rss_mb:
+        exceeded.append(f"bot peak RSS {report['peak_rss_mb']['bot']:.0f} MB > {args.max_rss_mb:.0f} MB")
+    if args.min_flows_per_s is not None and report["flows_per_s"] < args.min_flows_per_s:
+        exceeded.append(f"{report['flows_per_s']:.2f} flows/s < {args.min_flows_per_s:.2f}")
+    failed = sum(v for k, v in report["outcomes"].items() if k.startswith(("failed:", "error:")))
+    failure_rate = failed / max(report["config"]["flows"], 1)
+    if args.max_failure_rate is not None and failure_rate > args.max_failure_rate:
+        exceeded.append(f"failure rate {failure_rate:.1%} > {args.max_failure_rate:.1%}")
+    return exceeded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", help="comma-separated flow:visual pairs, e.g. story_voice:web,generator:skip")
+    parser.add_argument("--profile", help="JSON file with per-provider latency/error/payload overrides")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8800, help=f"stand-ins use {len(PROVIDERS)} ports from here")
+    parser.add_argument("--publish-timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's own output")
+    parser.add_argument("--max-p95", type=float, help="gate: flow p95 in seconds")
+    parser.add_argument("--max-rss-mb", type=float, help="gate: bot peak RSS in MB")
+    parser.add_argument("--min-flows-per-s", type=float, help="gate: throughput")
+    parser.add_argument("--max-failure-rate", type=float, help="gate: share of flows that failed (0-1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = asyncio.run(run(args, workdir))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    exceeded = check_gates(report, args)
+    if exceeded:
+        print("❌ Over budget: " + "; ".join(exceeded))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/linkedin_stand_in.py
+"""
+A local stand-in for the three LinkedIn endpoints the bot uses (registerUpload, the binary
+upload PUT, ugcPosts) plus /v2/userinfo, with failure injection for the publish queue.
+
+    python -m benchmarks.linkedin_stand_in --port 8790 --fail-rate 0.3 --fail-status 503
+    LINKEDIN_API_BASE=http://127.0.0.1:8790 python main.py
+
+--fail-rate      chance that any call fails
+--fail-status    status code for injected failures (429 also sends Retry-After)
+--fail-first N   the first N calls to each endpoint fail, then everything succeeds
+--fail-steps     which endpoints may fail: register,upload,create
+--latency        seconds added to every call
+"""
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from aiohttp import web
+
+
+class LinkedInStandIn:
+    def __init__(self, fail_rate=0.0, fail_status=503, fail_first=0, fail_steps=("register", "upload", "create"),
+                 latency=0.0):
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.fail_first = fail_first
+        self.fail_steps = set(fail_steps)
+        self.latency = latency
+        self.calls = {"register": 0, "upload": 0, "create": 0}
+        self.failures = {"register": 0, "upload": 0, "create": 0}
+        self.posts = []
+        self._ids = itertools.count(1)
+
+    async def _maybe_fail(self, step):
+        self.calls[step] += 1
+        # A number, or a callable that samples one (benchmarks/stand_ins.Profile.sample)
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        if step not in self.fail_steps:
+            return None
+        if self.calls[step] <= self.fail_first or random.random() < self.fail_rate:
+            self.failures[step] += 1
+            headers = {"Retry-After": "1"} if self.fail_status == 429 else None
+            return web.json_response({"message": f"injected {self.fail_status}"}, status=self.fail_status,
+                                     headers=headers)
+        return None
+
+    async def register_upload(self, request):
+        failure = await self._maybe_fail("register")
+        if failure:
+            return failure
+        asset_id = next(self._ids)
+        upload_url = f"{request.scheme}://{request.host}/upload/{asset_id}"
+        return web.json_response({"value": {
+            "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": upload_url}},
+            "asset": f"urn:li:digitalmediaAsset:STANDIN{asset_id}",
+        }})
+
+    async def upload(self, request):
+        await request.read()
+        failure = await self._maybe_fail("upload")
+        return failure or web.Response(status=201)
+
+    async def create_post(self, request):
+        payload = await request.json()
+        failure = await self._maybe_fail("create")
+        if failure:
+            return failure
+        post_id = f"urn:li:share:{next(self._ids)}"
+        self.posts.append({"id": post_id, "at": time.time(), "payload": payload})
+        return web.json_response({"id": post_id}, status=201)
+
+    async def userinfo(self, request):
+        return web.json_response({"sub": "STANDIN_USER"})
+
+    async def stats(self, request):
+        return web.json_response({"calls": self.calls, "failures": self.failures, "posts": len(self.posts)})
+
+    def app(self):
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_post("/v2/assets", self.register_upload)
+        app.router.add_put("/upload/{asset_id}", self.upload)
+        app.router.add_post("/v2/ugcPosts", self.create_post)
+        app.router.add_get("/v2/userinfo", self.userinfo)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-steps", default="register,upload,create")
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stand_in = LinkedInStandIn(args.fail_rate, args.fail_status, args.fail_first,
+                               args.fail_steps.split(","), args.latency)
+    print(f"🧪 LinkedIn stand-in on http://{args.host}:{args.port} (GET /stats for counters)")
+    web.run_app(stand_in.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
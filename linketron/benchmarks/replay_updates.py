@@ -0,0 +1,87 @@
+# benchmarks/replay_updates.py
+"""
+Replays Telegram updates against a running webhook (BOT_MODE=webhook) for load testing.
+
+    python -m benchmarks.replay_updates --url http://localhost:8080/telegram/webhook \\
+        --secret $WEBHOOK_SECRET --updates 2000 --concurrency 100
+
+With --file, updates are read from a JSONL file (one Telegram Update per line).
+Otherwise synthetic "/start" and text updates are generated for --users distinct users.
+Point TELEGRAM_API_BASE at a Bot API stand-in so the bot's replies don't hit Telegram.
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import aiohttp
+
+
+def synthetic_updates(count, users):
+    for i in range(count):
+        user_id = 100000 + (i % users)
+        text = "/start" if i % 4 == 0 else f"Replay message {i}"
+        yield {
+            "update_id": i + 1,
+            "message": {
+                "message_id": i + 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Replay"},
+                "text": text,
+                **({"entities": [{"type": "bot_command", "offset": 0, "length": 6}]} if text == "/start" else {}),
+            },
+        }
+
+def file_updates(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def replay(url, secret, updates, concurrency):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    limit = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def send(update):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, json=update) as resp:
+                        await resp.read()
+                        status = resp.status
+                except aiohttp.ClientError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(u) for u in updates))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"📨 {len(latencies)} updates in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} updates/s)")
+    print(f"   p50 {q[49] * 1000:.1f} ms | p95 {q[94] * 1000:.1f} ms | p99 {q[98] * 1000:.1f} ms")
+    print(f"   statuses: {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8080/telegram/webhook")
+    parser.add_argument("--secret")
+    parser.add_argument("--file")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    updates = list(file_updates(args.file) if args.file else synthetic_updates(args.updates, args.users))
+    asyncio.run(replay(args.url, args.secret, updates, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
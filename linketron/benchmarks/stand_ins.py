@@ -0,0 +1,508 @@
+# benchmarks/stand_ins.py
+"""
+Local stand-ins for every provider the bot talks to, used by benchmarks/harness.py.
+
+    python -m benchmarks.stand_ins --base-port 8800 --profile profiles.json --latency-scale 0.2
+
+Each stand-in is its own aiohttp server (base port + offset, see PROVIDERS) with a Profile:
+log-normal latency fitted to p50/p95 seconds, an injected error rate and a payload size.
+
+- telegram     Bot API methods the handlers call, plus file downloads (voice_* / photo_* ids)
+- gemini       generateContent / streamGenerateContent (drafts as JSON, short phrases, images)
+- groq         /openai/v1/audio/transcriptions
+- perplexity   /chat/completions (a well-formed briefing)
+- serper       /images (result URLs point at the images stand-in)
+- images       /img/{name}.jpg
+- linkedin     benchmarks/linkedin_stand_in.LinkedInStandIn
+
+Gemini goes through the SDKs, not http_client, so GeminiStandInClient mirrors the SDK call
+surface the services use; services.models.use_backend() installs it in the bot process.
+Every server answers GET /stats with its call and failure counters.
+"""
+import io
+import json
+import math
+import time
+import base64
+import random
+import struct
+import asyncio
+import argparse
+import itertools
+from types import SimpleNamespace
+import aiohttp
+from aiohttp import web
+from benchmarks.linkedin_stand_in import LinkedInStandIn
+
+PROVIDERS = ("telegram", "gemini", "groq", "perplexity", "serper", "images", "linkedin")
+
+# p50/p95 in seconds. payload: draft chars (gemini), image side px (gemini_image, images),
+# transcript chars (groq), search results (serper), voice note bytes (telegram).
+DEFAULT_PROFILES = {
+    "telegram": {"p50": 0.04, "p95": 0.12, "payload": 64 * 1024},
+    "gemini": {"p50": 1.5, "p95": 4.0, "payload": 1200},
+    "gemini_image": {"p50": 6.0, "p95": 12.0, "payload": 1024},
+    "groq": {"p50": 0.6, "p95": 1.5, "payload": 600},
+    "perplexity": {"p50": 4.0, "p95": 9.0},
+    "serper": {"p50": 0.4, "p95": 1.0, "payload": 10},
+    "images": {"p50": 0.3, "p95": 1.2, "payload": 1600},
+    "linkedin": {"p50": 0.5, "p95": 1.5},
+}
+
+STREAM_CHUNK_CHARS = 80
+STREAM_CHUNK_DELAY = 0.02
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Linketron", "username": "linketron_bench_bot"}
+
+WORDS = (
+    "team", "launch", "customer", "metric", "onboarding", "pricing", "email", "week", "result", "test",
+    "product", "feedback", "growth", "retention", "sales", "process", "hiring", "manager", "quarter", "budget",
+    "we", "cut", "shipped", "measured", "learned", "changed", "the", "a", "our", "with", "after", "because",
+)
+
+
+class Profile:
+    def __init__(self, p50=0.2, p95=0.6, error_rate=0.0, error_status=503, payload=None):
+        self.p50 = p50
+        self.p95 = max(p95, p50)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payload = payload
+        self._sigma = math.log(self.p95 / p50) / 1.645 if p50 > 0 and self.p95 > p50 else 0.0
+
+    def sample(self):
+        """One latency draw in seconds."""
+        if self.p50 <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.p50), self._sigma)
+
+    def fails(self):
+        return random.random() < self.error_rate
+
+
+def load_profiles(path=None, latency_scale=1.0):
+    """DEFAULT_PROFILES, overridden per provider by a JSON file, with every latency scaled."""
+    overrides = {}
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+    profiles = {}
+    for name, defaults in DEFAULT_PROFILES.items():
+        spec = {**defaults, **overrides.get(name, {})}
+        spec["p50"] = spec.get("p50", 0.2) * latency_scale
+        spec["p95"] = spec.get("p95", 0.6) * latency_scale
+        profiles[name] = Profile(**spec)
+    return profiles
+
+def stand_in_urls(host, base_port):
+    return {name: f"http://{host}:{base_port + i}" for i, name in enumerate(PROVIDERS)}
+
+def bot_env(urls):
+    """Environment that points the bot's providers at the stand-ins (Gemini is wired via use_backend)."""
+    return {
+        "TELEGRAM_API_BASE": urls["telegram"],
+        "GROQ_API_BASE": f"{urls['groq']}/openai/v1",
+        "PERPLEXITY_API_BASE": urls["perplexity"],
+        "SERPER_API_BASE": urls["serper"],
+        "LINKEDIN_API_BASE": urls["linkedin"],
+        "GEMINI_API_KEY": "stand-in",
+        "GROQ_API_KEY": "stand-in",
+        "PERPLEXITY_API_KEY": "stand-in",
+        "SERPER_API_KEY": "stand-in",
+    }
+
+def filler_text(chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).capitalize() + "."
+
+_images = {}
+
+def make_jpeg(width, height):
+    """A photo-sized JPEG (noise, so it compresses like a photo). Header-only stand-in without Pillow."""
+    key = (width, height)
+    if key not in _images:
+        try:
+            from PIL import Image
+            out = io.BytesIO()
+            Image.effect_noise((width, height), 48).convert("RGB").save(out, format="JPEG", quality=85)
+            _images[key] = out.getvalue()
+        except ImportError:
+            sof = b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x11\x00\x02\x11\x01\x03\x11\x01"
+            _images[key] = b"\xff\xd8" + sof + random.randbytes(width * height // 10) + b"\xff\xd9"
+    return _images[key]
+
+
+# --- 1. BASE ---
+class StandIn:
+    def __init__(self, profile):
+        self.profile = profile
+        self.calls = 0
+        self.failures = 0
+
+    def failure_response(self, status):
+        return web.json_response({"error": {"code": status, "message": f"injected {status}"}}, status=status)
+
+    async def delay_or_fail(self, profile=None):
+        """Sleeps one latency draw; returns an error response when a failure is injected, else None."""
+        profile = profile or self.profile
+        self.calls += 1
+        await asyncio.sleep(profile.sample())
+        if profile.fails():
+            self.failures += 1
+            return self.failure_response(profile.error_status)
+        return None
+
+    async def stats(self, request):
+        return web.json_response({"calls": self.calls, "failures": self.failures})
+
+    def routes(self, app):
+        raise NotImplementedError
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/stats", self.stats)
+        self.routes(app)
+        return app
+
+
+# --- 2. TELEGRAM ---
+class BotAPIStandIn(StandIn):
+    """
+    Answers every Bot API call with a plausible result. Files: voice_* -> OGG-sized bytes, anything else -> a JPEG.
+    For a bot in polling mode, getUpdates hands out whatever was put in `updates` (else an empty long poll);
+    `polled` / `replied` are set on the first getUpdates / sendMessage (see benchmarks/startup.py).
+    """
+
+    LONG_POLL_SECONDS = 0.5
+
+    def __init__(self, profile, image_side=1600):
+        super().__init__(profile)
+        self.image_side = image_side
+        self.methods = {}
+        self.updates = []
+        self.polled = asyncio.Event()
+        self.replied = asyncio.Event()
+        self._ids = itertools.count(10_000)
+
+    def failure_response(self, status):
+        return web.json_response({"ok": False, "error_code": status, "description": f"injected {status}"},
+                                 status=status)
+
+    def _message(self, fields, **extra):
+        message = {
+            "message_id": int(fields.get("message_id") or next(self._ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(fields.get("chat_id") or 0), "type": "private"},
+            "from": BOT_USER,
+            **extra,
+        }
+        if fields.get("text"):
+            message["text"] = fields["text"]
+        if fields.get("reply_markup"):
+            message["reply_markup"] = json.loads(fields["reply_markup"])
+        return message
+
+    def _file(self, file_id):
+        data = self._file_bytes(file_id)
+        return {"file_id": file_id, "file_unique_id": f"u{file_id}", "file_size": len(data),
+                "file_path": f"files/{file_id}"}
+
+    def _file_bytes(self, file_id):
+        if file_id.startswith("voice_"):
+            return b"OggS" + b"\0" * (self.profile.payload or 0)
+        return make_jpeg(self.image_side, self.image_side * 5 // 8)
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        self.methods[method] = self.methods.get(method, 0) + 1
+        fields = dict(await request.post())
+        failure = await self.delay_or_fail()
+        if failure:
+            return failure
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            self.polled.set()
+            if not self.updates:
+                await asyncio.sleep(self.LONG_POLL_SECONDS)
+            result, self.updates = self.updates, []
+        elif method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            if method == "sendMessage":
+                self.replied.set()
+            result = self._message(fields)
+        elif method == "sendPhoto":
+            # Re-sent by file_id, or uploaded ("attach://<field>" + a multipart file field)
+            photo = fields.get("photo")
+            reused = isinstance(photo, str) and not photo.startswith("attach://")
+            file_id = photo if reused else f"photo_{next(self._ids)}"
+            result = self._message(fields, photo=[{
+                "file_id": file_id, "file_unique_id": f"u{file_id}",
+                "width": self.image_side, "height": self.image_side * 5 // 8,
+            }])
+        elif method == "getFile":
+            result = self._file(fields["file_id"])
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def download(self, request):
+        self.calls += 1
+        return web.Response(body=self._file_bytes(request.match_info["path"].rsplit("/", 1)[-1]))
+
+    async def stats(self, request):
+        return web.json_response({"calls": self.calls, "failures": self.failures, "methods": self.methods})
+
+    def routes(self, app):
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/file/bot{token}/{path:.+}", self.download)
+
+
+# --- 3. GEMINI ---
+class GeminiStandIn(StandIn):
+    """JSON-mode calls get {"title", "text"} of `payload` chars, plain calls a short phrase, image calls a JPEG."""
+
+    def __init__(self, profile, image_profile):
+        super().__init__(profile)
+        self.image_profile = image_profile
+
+    def _answer(self, body):
+        config = body.get("generationConfig") or {}
+        if config.get("responseMimeType") == "application/json":
+            return json.dumps({"title": filler_text(40), "text": filler_text(self.profile.payload or 1200)})
+        return filler_text(40)
+
+    def _image_part(self):
+        side = self.image_profile.payload or 1024
+        data = make_jpeg(side, side)
+        return {"inlineData": {"mimeType": "image/jpeg", "data": base64.b64encode(data).decode()}}
+
+    async def generate(self, request):
+        body = await request.json()
+        wants_image = "IMAGE" in ((body.get("generationConfig") or {}).get("responseModalities") or [])
+        failure = await self.delay_or_fail(self.image_profile if wants_image else None)
+        if failure:
+            return failure
+        part = self._image_part() if wants_image else {"text": self._answer(body)}
+        return web.json_response({"candidates": [{"content": {"parts": [part]}}]})
+
+    async def stream(self, request):
+        body = await request.json()
+        failure = await self.delay_or_fail()   # time to first token
+        if failure:
+            return failure
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        text = self._answer(body)
+        for i in range(0, len(text), STREAM_CHUNK_CHARS):
+            chunk = {"candidates": [{"content": {"parts": [{"text": text[i:i + STREAM_CHUNK_CHARS]}]}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(STREAM_CHUNK_DELAY)
+        await response.write_eof()
+        return response
+
+    def routes(self, app):
+        app.router.add_post("/v1beta/models/{model}:generateContent", self.generate)
+        app.router.add_post("/v1beta/models/{model}:streamGenerateContent", self.stream)
+
+
+class GeminiStandInError(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        super().__init__(f"{status} {message}")
+
+
+def _config_fields(config):
+    if config is None:
+        return {}
+    get = config.get if isinstance(config, dict) else (lambda name: getattr(config, name, None))
+    return {"responseMimeType": get("response_mime_type"), "responseModalities": get("response_modalities")}
+
+def _response(data):
+    """SDK-shaped response: .text, .candidates[0].content.parts[i].text / .inline_data."""
+    candidates = []
+    for candidate in data.get("candidates", []):
+        parts = []
+        for part in candidate["content"]["parts"]:
+            inline = part.get("inlineData")
+            parts.append(SimpleNamespace(
+                text=part.get("text"),
+                inline_data=SimpleNamespace(data=base64.b64decode(inline["data"]), mime_type=inline["mimeType"])
+                if inline else None,
+            ))
+        candidates.append(SimpleNamespace(content=SimpleNamespace(parts=parts)))
+    text = "".join(p.text for c in candidates[:1] for p in c.content.parts if p.text)
+    return SimpleNamespace(candidates=candidates, text=text)
+
+
+class GeminiStandInClient:
+    """google.genai.Client look-alike (client.aio.models.generate_content) that also builds model look-alikes."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._session = None
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content))
+
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def model(self, name):
+        return GeminiStandInModel(name, self)
+
+    async def post(self, model, method, contents, config):
+        body = {"contents": str(contents), "generationConfig": _config_fields(config)}
+        async with self.session().post(f"{self.base_url}/v1beta/models/{model}:{method}", json=body) as resp:
+            if resp.status != 200:
+                raise GeminiStandInError(resp.status, await resp.text())
+            return await resp.json()
+
+    async def stream(self, model, contents, config):
+        body = {"contents": str(contents), "generationConfig": _config_fields(config)}
+        url = f"{self.base_url}/v1beta/models/{model}:streamGenerateContent"
+        async with self.session().post(url, json=body) as resp:
+            if resp.status != 200:
+                raise GeminiStandInError(resp.status, await resp.text())
+            async for line in resp.content:
+                if line.startswith(b"data: "):
+                    yield _response(json.loads(line[6:]))
+
+    async def _generate_content(self, model, contents, config=None):
+        return _response(await self.post(model, "generateContent", contents, config))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class GeminiStandInModel:
+    """google.generativeai.GenerativeModel look-alike: generate_content_async with and without stream."""
+
+    def __init__(self, model_name, client):
+        self.model_name = model_name
+        self.client = client
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False):
+        if stream:
+            return self.client.stream(self.model_name, contents, generation_config)
+        return _response(await self.client.post(self.model_name, "generateContent", contents, generation_config))
+
+
+# --- 4. GROQ, PERPLEXITY, SERPER, IMAGE HOSTS ---
+class GroqStandIn(StandIn):
+    async def transcribe(self, request):
+        await request.read()
+        failure = await self.delay_or_fail()
+        return failure or web.json_response({"text": filler_text(self.profile.payload or 600)})
+
+    def routes(self, app):
+        app.router.add_post("/openai/v1/audio/transcriptions", self.transcribe)
+
+
+class PerplexityStandIn(StandIn):
+    async def chat(self, request):
+        await request.json()
+        failure = await self.delay_or_fail()
+        if failure:
+            return failure
+        briefing = {
+            "headline_fact": f"Cut churn by {random.randint(5, 40)}% in {random.randint(2, 12)} weeks",
+            "subject_name": filler_text(20),
+            "origin_story": filler_text(200),
+            "core_mechanism": filler_text(200),
+            "viral_angle": filler_text(80),
+            "proof_points": [filler_text(40) for _ in range(3)],
+            "actionable_step": filler_text(80),
+        }
+        return web.json_response({"choices": [{"message": {"content": json.dumps(briefing)}}]})
+
+    def routes(self, app):
+        app.router.add_post("/chat/completions", self.chat)
+
+
+class SerperStandIn(StandIn):
+    def __init__(self, profile, images_url, image_side):
+        super().__init__(profile)
+        self.images_url = images_url
+        self.image_side = image_side
+
+    async def images(self, request):
+        await request.read()
+        failure = await self.delay_or_fail()
+        if failure:
+            return failure
+        return web.json_response({"images": [
+            {"imageUrl": f"{self.images_url}/img/{random.getrandbits(32):08x}.jpg",
+             "imageWidth": self.image_side, "imageHeight": self.image_side * 5 // 8}
+            for _ in range(self.profile.payload or 10)
+        ]})
+
+    def routes(self, app):
+        app.router.add_post("/images", self.images)
+
+
+class ImageHostStandIn(StandIn):
+    async def image(self, request):
+        failure = await self.delay_or_fail()
+        if failure:
+            return failure
+        side = self.profile.payload or 1600
+        return web.Response(body=make_jpeg(side, side * 5 // 8), content_type="image/jpeg")
+
+    def routes(self, app):
+        app.router.add_get("/img/{name}", self.image)
+
+
+# --- 5. ALL TOGETHER ---
+def build_apps(profiles, urls):
+    images_side = profiles["images"].payload or 1600
+    linkedin = profiles["linkedin"]
+    return {
+        "telegram": BotAPIStandIn(profiles["telegram"], images_side).app(),
+        "gemini": GeminiStandIn(profiles["gemini"], profiles["gemini_image"]).app(),
+        "groq": GroqStandIn(profiles["groq"]).app(),
+        "perplexity": PerplexityStandIn(profiles["perplexity"]).app(),
+        "serper": SerperStandIn(profiles["serper"], urls["images"], images_side).app(),
+        "images": ImageHostStandIn(profiles["images"]).app(),
+        "linkedin": LinkedInStandIn(fail_rate=linkedin.error_rate, fail_status=linkedin.error_status,
+                                    latency=linkedin.sample).app(),
+    }
+
+async def serve(profiles, host, base_port):
+    urls = stand_in_urls(host, base_port)
+    runners = []
+    for name, app in build_apps(profiles, urls).items():
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, base_port + PROVIDERS.index(name)).start()
+        runners.append(runner)
+    print("🧪 Stand-ins up: " + ", ".join(f"{name} {url}" for name, url in urls.items()), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8800)
+    parser.add_argument("--profile")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.profile, args.latency_scale)
+    try:
+        asyncio.run(serve(profiles, args.host, args.base_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/startup.py
+"""
+Measures bot startup: from `python main.py` to the first reply on a /start update.
+
+    python -m benchmarks.startup --runs 5 --target 2.0
+
+The bot runs in polling mode against the Bot API stand-in from benchmarks/stand_ins.py (TELEGRAM_API_BASE),
+with throwaway databases and the briefing prefetch switched off, so nothing leaves the host.
+
+`import aiogram` alone (it builds every Bot API model) is a floor no bot code can go under, and
+its cost depends heavily on the machine. So the floor is timed in a bare interpreter too, and the
+gate is on what the bot adds on top of it: exits with status 1 when the median time-to-first-update
+minus the median floor is above --target seconds.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from aiohttp import web
+from benchmarks.stand_ins import BotAPIStandIn, Profile
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_TOKEN = "123456:STARTUP-BENCHMARK"
+CHAT_ID = 424242
+
+
+def start_update():
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": CHAT_ID, "type": "private"},
+            "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Bench"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def measure_once(port, workdir, timeout):
+    # Startup is what's measured, so the Bot API itself answers instantly.
+    api = BotAPIStandIn(Profile(p50=0, p95=0))
+    api.updates.append(start_update())
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    env = {
+        **os.environ,
+        "TELEGRAM_BOT_TOKEN": FAKE_TOKEN,
+        "TELEGRAM_API_BASE": f"http://127.0.0.1:{port}",
+        "BOT_MODE": "polling",
+        "FSM_STORAGE": "memory",
+        "CREDENTIALS_DB": os.path.join(workdir, "user_secrets.db"),
+        "LLM_CACHE_DB": os.path.join(workdir, "llm_cache.db"),
+        "BRIEFING_POOL_SIZE": "0",
+    }
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", cwd=BOT_DIR, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(api.polled.wait(), timeout)
+        first_poll = time.perf_counter() - started
+        await asyncio.wait_for(api.replied.wait(), timeout)
+        first_reply = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        await proc.wait()
+        await runner.cleanup()
+    return first_poll, first_reply
+
+
+async def import_floor():
+    """Seconds for a fresh interpreter to import aiogram and exit."""
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(sys.executable, "-c", "import aiogram", cwd=BOT_DIR)
+    await proc.wait()
+    return time.perf_counter() - started
+
+
+async def run(runs, port, timeout):
+    polls, replies, floors = [], [], []
+    for i in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            first_poll, first_reply = await measure_once(port, workdir, timeout)
+        floor = await import_floor()
+        polls.append(first_poll)
+        replies.append(first_reply)
+        floors.append(floor)
+        print(f"   run {i + 1}: polling after {first_poll:.2f}s, first reply after {first_reply:.2f}s "
+              f"(import aiogram {floor:.2f}s)")
+    return polls, replies, floors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--target", type=float, default=float(os.getenv("STARTUP_TARGET_SECONDS", "2.0")),
+                        help="seconds the bot may add on top of the `import aiogram` floor")
+    args = parser.parse_args()
+
+    polls, replies, floors = asyncio.run(run(args.runs, args.port, args.timeout))
+    median = statistics.median(replies)
+    floor = statistics.median(floors)
+    overhead = median - floor
+    print(f"🚀 time-to-first-update: median {median:.2f}s | max {max(replies):.2f}s "
+          f"| polling ready (median) {statistics.median(polls):.2f}s")
+    print(f"   import aiogram floor {floor:.2f}s | bot on top {overhead:.2f}s | target {args.target:.2f}s")
+    if overhead > args.target:
+        print("❌ Startup is over target.")
+        sys.exit(1)
+    print("✅ Startup within target.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,15 @@
 # config.py
+from dotenv import load_dotenv
+
+# The only .env read in the process: every service imports config before its os.getenv calls.
+load_dotenv()
+
+# --- LINKEDIN APP ---
+CLIENT_ID = "77xglo1er8egl1"
+CLIENT_SECRET = "WPL_AP1.qw2F0pe2mviztN8r.cVBC7g=="
+REDIRECT_URI = "https://www.google.com" # We use a dummy URL to catch the code
+
+# --- LENSES ---
 
 LENS_MAPPING = {
     "lens_principle": {
@@ -21,4 +32,19 @@ LENS_MAPPING = {
         "name": "Controversial Ad",
         "search_context": "Focus on a breakdown of a famous controversial ad campaign. Look for campaigns that polarized the audience but ultimately drove sales or brand awareness. Analyze why it was controversial and why it worked (or failed)."
     }
-}
\ No newline at end of file
+}
+
+# --- MODELS ---
+# One place to swap a model. Each entry can be overridden with MODEL_<ROLE> in .env.
+MODEL_DEFAULTS = {
+    "essay": "gemini-3-flash-preview",      # voice/text -> essay draft
+    "writer": "gemini-2.0-flash",           # research-backed viral post
+    "fused": "gemini-3-flash-preview",      # fast mode: draft + refine in one call
+    "cleaner": "gemini-3-flash-preview",    # anti-slop refinement pass
+    "angle": "gemini-2.5-flash",            # research angle generation
+    "image_query": "gemini-2.5-flash",      # web image search keyword
+    "director": "gemini-2.0-flash-exp",     # AI image concept
+    "artist": "gemini-2.5-flash-image",     # AI image rendering
+    "research": "sonar-pro",                # Perplexity
+    "transcribe": "whisper-large-v3",       # Groq
+}
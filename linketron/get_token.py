@@ -1,12 +1,8 @@
 import requests
 import urllib.parse
 
-# --- PASTE YOUR KEYS HERE ---
-CLIENT_ID = "77xglo1er8egl1"
-CLIENT_SECRET = "WPL_AP1.qw2F0pe2mviztN8r.cVBC7g=="
-# ----------------------------
-
-REDIRECT_URI = "https://www.google.com" # We use a dummy URL to catch the code
+# Keys live in config.py (the bot imports them from there without pulling in `requests`).
+from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
 
 def get_access_token():
     # 1. Build the Authorization URL
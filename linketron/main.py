@@ -1,36 +1,74 @@
 import asyncio
 import logging
 import os
-import json
+import multiprocessing
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types, F
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from dotenv import load_dotenv
-import requests
 import urllib.parse
-import requests
-from get_token import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
-from services.voice_processor import process_voice_note, process_text_note
 
-# 1. LOAD ENV
-load_dotenv()
+# 1. LOAD ENV (once, inside config) + APP KEYS
+from config import LENS_MAPPING, CLIENT_ID, CLIENT_SECRET, REDIRECT_URI
 
-# 2. IMPORTS
+# 2. IMPORTS (cheap: the Gemini SDKs load on first use, see services/models.py)
+from services.voice_processor import stream_voice_note, stream_text_note, new_voice_spool, VOICE_MAX_BYTES, PIPELINE_MODES, resolve_pipeline_mode
 from services.researcher import search_perplexity, format_card_text 
-from services.voice_processor import process_voice_note
 from services.image_finder import get_image_from_web
 from services.image_generator import generate_ai_image
-from services.linkedin_publisher import publish_to_linkedin 
-from config import LENS_MAPPING
+from services.linkedin_publisher import LINKEDIN_API_BASE
+from services.publish_queue import PublishQueue, idempotency_key, ACTIVE_STATUSES
+from services.scheduler import PublishScheduler, parse_when, format_when
+from services.media_processor import normalize_image
+from services.asset_uploads import pending_uploads
+from services import media_processor
+from services.credential_store import build_credential_store
+from services import http_client
+from services.stages import stage, StageBusy, format_stage_stats
+from services.llm_cache import format_cache_stats
+from services.slop_linter import format_slop_stats
+from services.media_workspace import workspace, new_draft_id
+from services.live_status import LiveStatus
+from services.briefing_pool import briefing_pool
+from services.fsm_storage import build_fsm_storage
+from services import models
+from services.tracing import TracingMiddleware, start_metrics_server, METRICS_PORT
+from services.concurrency import SingleFlightMiddleware, Cancelled
+from services.pipeline_jobs import pipeline_jobs
+from aiogram.fsm.storage.memory import MemoryStorage
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-DATA_FILE = "user_secrets.json"
+ADMIN_USER_IDS = {uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+
+# Run mode: "polling" (one process) or "webhook" (aiohttp server, N worker processes)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")          # public https://host, used for setWebhook
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))    # cancel + double-tap dedup are per worker (see run_webhook)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE")        # e.g. a local Bot API stand-in for load tests
 
 logging.basicConfig(level=logging.INFO)
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+if TELEGRAM_API_BASE:
+    bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_BASE)))
+else:
+    bot = Bot(token=BOT_TOKEN)
+# Durable FSM: drafts and research context survive restarts (see services/fsm_storage.py)
+fsm_storage = build_fsm_storage()
+dp = Dispatcher(storage=fsm_storage)
+# One root span per update; service calls nest under it (see services/tracing.py)
+dp.update.outer_middleware(TracingMiddleware())
+# Double taps on expensive buttons join the run already in flight (per user, draft and button)
+callback_flights = SingleFlightMiddleware(actions=("visual_", "action_publish", "schedule_in_"))
+dp.callback_query.middleware(callback_flights)
+metrics_runner = None
 
 # --- STATE MACHINE ---
 class BotState(StatesGroup):
@@ -40,31 +78,180 @@ class BotState(StatesGroup):
     waiting_for_custom_topic = State()
     waiting_for_visual_choice = State()
     waiting_for_user_upload = State() 
+    waiting_for_schedule_time = State()
 
 # --- 1. THE VAULT ---
-def load_all_secrets():
-    if not os.path.exists(DATA_FILE): return {}
-    try:
-        with open(DATA_FILE, "r") as f: return json.load(f)
-    except: return {}
+# Keyed SQLite store with an in-process LRU (see services/credential_store.py).
+credential_store = build_credential_store()
 
 def save_user_credentials(user_id, token, urn): # Renamed for clarity
-    data = load_all_secrets()
-    data[str(user_id)] = {
-        "access_token": token,
-        "user_urn": urn
-    }
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    credential_store.save(user_id, token, urn)
 
 def get_user_credentials(user_id): # Renamed for clarity
-    return load_all_secrets().get(str(user_id))
+    return credential_store.get(user_id)
 
 def delete_user_secret(user_id):
-    data = load_all_secrets()
-    if str(user_id) in data:
-        del data[str(user_id)]
-        with open(DATA_FILE, "w") as f: json.dump(data, f, indent=2)
+    credential_store.delete(user_id)
+
+# --- 1A. PUBLISH QUEUE ---
+# Durable SQLite jobs with retries and one post per draft (see services/publish_queue.py).
+async def notify_publish_status(job, text):
+    """Edits the job's status message; falls back to a new message if it is gone."""
+    if job.get("status_message_id"):
+        try:
+            await bot.edit_message_text(text, chat_id=job["chat_id"], message_id=job["status_message_id"])
+            return
+        except Exception:
+            pass
+    await bot.send_message(job["chat_id"], text)
+
+publish_queue = PublishQueue(get_credentials=get_user_credentials, notify=notify_publish_status)
+# Scheduled posts: one heap-driven coroutine releases them into the queue when due (services/scheduler.py)
+publish_scheduler = PublishScheduler(publish_queue)
+
+def draft_key(user_id, draft_id):
+    # Drafts from before per-draft IDs existed get a one-off key (no dedupe, but never blocked).
+    return idempotency_key(user_id, draft_id or new_draft_id())
+
+def publish_block_reason(key):
+    """Why this draft can't be queued again, or None."""
+    existing = publish_queue.get(key)
+    if not existing:
+        return None
+    if existing["status"] == "done":
+        return "✅ Already published."
+    if existing["status"] == "scheduled":
+        return "🕒 Already scheduled. See /scheduled."
+    if existing["status"] in ACTIVE_STATUSES:
+        return "⏳ Already publishing..."
+    return None
+
+async def submit_draft(key, user_id, chat_id, data, creds, status_msg, run_at=None):
+    """Hands the current draft to the publish queue, now or at `run_at`. Returns (job, created)."""
+    draft_id = data.get("draft_id")
+    if run_at:
+        # It may run days from now: upload at publish time rather than hold an early asset.
+        pending_uploads.abandon(user_id, draft_id)
+        asset_urn = None
+    else:
+        # Normally the asset is already on LinkedIn (uploaded while the preview was shown)
+        asset_urn = await pending_uploads.take(user_id, draft_id, creds['access_token'])
+    image_bytes = None if asset_urn else await load_draft_image(user_id, data)
+    image_mime = None
+    if image_bytes:
+        # Feed-sized, re-encoded, metadata-free: smaller uploads, done off the event loop
+        async with stage("media").slot(on_wait=queue_notifier(status_msg)):
+            image_bytes, image_mime = await normalize_image(image_bytes)
+
+    job, created = publish_queue.enqueue(
+        key, user_id, chat_id, data["final_post"]['text'],
+        image=image_bytes, image_mime=image_mime, asset_urn=asset_urn,
+        status_message_id=status_msg.message_id, run_at=run_at
+    )
+    if created:
+        # The bytes now live in the job row
+        workspace.discard(user_id, draft_id)
+        if run_at:
+            publish_scheduler.add(key, run_at)
+    return job, created
+
+async def schedule_current_draft(message, user_id, state, run_at):
+    creds = get_user_credentials(user_id)
+    if not creds:
+        await message.answer("❌ Ошибка: Ваши данные не найдены. Пожалуйста, авторизуйтесь снова через /start.")
+        return
+    data = await state.get_data()
+    if not data.get("final_post"):
+        await message.answer("⚠️ No draft to schedule.")
+        return
+
+    key = draft_key(user_id, data.get("draft_id"))
+    blocked = publish_block_reason(key)
+    if blocked:
+        await message.answer(blocked)
+        return
+
+    status_msg = await message.answer("🕒 **Scheduling...**")
+    try:
+        _, created = await submit_draft(key, user_id, message.chat.id, data, creds, status_msg, run_at=run_at)
+        if not created:
+            await status_msg.edit_text("⏳ **This draft is already queued.**")
+            return
+        await status_msg.edit_text(f"🕒 **Scheduled for {format_when(run_at)}.**\nSee /scheduled to review or cancel.")
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e))
+    except Exception as e:
+        await status_msg.edit_text(f"⚠️ Scheduling failed: {str(e)}")
+
+# --- 1B. STAGE QUEUE FEEDBACK ---
+def busy_text(e):
+    return (
+        f"🚦 **Busy, you're #{e.position} in queue.**\n"
+        f"The {e.stage_name} stage is at capacity right now. Please try again in a minute."
+    )
+
+async def show_cancelled(status_msg):
+    """A superseded job says so instead of writing its result; the status message may already be gone."""
+    try:
+        await status_msg.edit_text("🛑 **Cancelled.**")
+    except Exception:
+        pass
+
+def queue_notifier(status_msg):
+    """Tells the user their place in line while a stage slot frees up."""
+    async def on_wait(position):
+        try:
+            await status_msg.edit_text(f"⏳ **Busy, you're #{position} in queue...**")
+        except Exception:
+            pass
+    return on_wait
+
+# --- 1C. LIVE DRAFT PROGRESS ---
+STAGE_LABELS = {
+    "transcribe": "🎧 Transcribing...",
+    "draft": "✍️ Drafting...",
+    "clean": "🧹 Polishing...",
+}
+
+async def run_with_live_status(status_msg, events):
+    """Consumes pipeline events and mirrors progress + partial text into the status message."""
+    live = LiveStatus(status_msg)
+    post_data = None
+    try:
+        async for event in events:
+            label = STAGE_LABELS.get(event.get("stage"), "⏳ Working...")
+            if event["type"] == "stage":
+                await live.update(label)
+            elif event["type"] == "partial":
+                await live.update(f"{label}\n\n{event['text']}")
+            elif event["type"] == "done":
+                post_data = event["post"]
+    finally:
+        live.close()
+    return post_data
+
+# --- 1D. DRAFT IMAGES ---
+# Bytes live in this process's media workspace. The Telegram file_id of the shown photo
+# goes into FSM data so any webhook worker can still fetch the image on publish.
+# While the user reads the preview, the image is already being uploaded to LinkedIn.
+async def remember_draft_image(state, user_id, draft_id, image_bytes, content_type, source, file_id):
+    workspace.put(user_id, draft_id, image_bytes, content_type, source=source)
+    await state.update_data(image_file_id=file_id)
+    creds = get_user_credentials(user_id)
+    if creds:
+        pending_uploads.start(user_id, draft_id, image_bytes, creds['access_token'], creds['user_urn'])
+
+async def forget_draft_image(state, user_id, draft_id):
+    workspace.discard(user_id, draft_id)
+    pending_uploads.abandon(user_id, draft_id)
+    await state.update_data(image_file_id=None)
+
+async def load_draft_image(user_id, data):
+    image_bytes = workspace.get_bytes(user_id, data.get("draft_id"))
+    if image_bytes is None and data.get("image_file_id"):
+        file_info = await bot.get_file(data["image_file_id"])
+        image_bytes = (await bot.download_file(file_info.file_path)).getvalue()
+    return image_bytes
 
 # --- 2. MENUS ---
 
@@ -96,9 +283,21 @@ def get_login_menu():
 def get_publish_menu():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🚀 Publish to LinkedIn", callback_data="action_publish")],
+        [InlineKeyboardButton(text="🕒 Schedule for later", callback_data="action_schedule")],
         [InlineKeyboardButton(text="❌ Done (Cancel)", callback_data="action_cancel")]
     ])
 
+def get_schedule_menu():
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="In 1h", callback_data="schedule_in_1h"),
+            InlineKeyboardButton(text="In 3h", callback_data="schedule_in_3h"),
+            InlineKeyboardButton(text="In 24h", callback_data="schedule_in_24h"),
+        ],
+        [InlineKeyboardButton(text="✍️ Pick a time", callback_data="schedule_custom")],
+        [InlineKeyboardButton(text="⬅️ Back", callback_data="schedule_back")]
+    ])
+
 def get_language_menu(mode):
     """Simple toggle for English/Russian before starting the session."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -110,6 +309,7 @@ def get_language_menu(mode):
 
 @dp.message(Command("start"))
 async def start_command(message: types.Message, state: FSMContext):
+    pipeline_jobs.cancel(message.from_user.id, "cancelled by /start")
     await state.clear()
     user_id = message.from_user.id
     
@@ -132,11 +332,56 @@ async def start_command(message: types.Message, state: FSMContext):
             reply_markup=get_login_menu(), parse_mode="Markdown"
         )
 
+@dp.message(Command("stats"))
+async def stats_command(message: types.Message):
+    if str(message.from_user.id) not in ADMIN_USER_IDS:
+        return
+    await message.answer(
+        f"{format_stage_stats()}\n\n{format_cache_stats()}\n{format_slop_stats()}\n\n"
+        f"📮 **Publish Queue:** {publish_queue.stats() or 'empty'} | scheduler {publish_scheduler.stats()}\n"
+        f"🔁 **Single-flight:** {callback_flights.flights.stats()} | 🛑 jobs {pipeline_jobs.stats()}"
+    )
+
+@dp.message(Command("mode"))
+async def mode_command(message: types.Message, state: FSMContext):
+    """/mode fast | /mode quality: one fused LLM call vs. draft + Cleaner."""
+    user_id = message.from_user.id
+    parts = (message.text or "").split()
+    if len(parts) > 1 and parts[1].lower() in PIPELINE_MODES:
+        credential_store.set_setting(user_id, "pipeline_mode", parts[1].lower())
+
+    state_data = await state.get_data()
+    current = resolve_pipeline_mode(
+        state_data.get("language", "English"),
+        credential_store.get_setting(user_id, "pipeline_mode")
+    )
+    await message.answer(
+        f"⚙️ **Pipeline mode:** {current}\n"
+        "⚡ `/mode fast`: one call (faster, cheaper)\n"
+        "💎 `/mode quality`: draft + proofreading pass",
+        parse_mode="Markdown"
+    )
+
+@dp.message(Command("scheduled"))
+async def scheduled_command(message: types.Message):
+    jobs = publish_queue.scheduled(message.from_user.id)
+    if not jobs:
+        await message.answer("🕒 **Nothing scheduled.**")
+        return
+    for job in jobs[:10]:
+        await message.answer(
+            f"🕒 **{format_when(job['run_at'])}**\n{job['text'][:200]}...",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="🗑️ Cancel", callback_data=f"unschedule_{job['id']}")]
+            ])
+        )
+
 # --- A. NAVIGATION HANDLERS ---
 
 @dp.callback_query(F.data == "mode_generator")
 async def enter_generator_mode(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
+    pipeline_jobs.cancel(callback.from_user.id, "cancelled by mode switch")
     await state.clear()
     await callback.message.edit_text(
         "🧠 **Generator Mode Active**\n\n👇 **Choose a Lens to research:**",
@@ -162,6 +407,7 @@ async def start_capture(callback: types.CallbackQuery, state: FSMContext):
 @dp.callback_query(F.data == "back_to_root")
 async def back_to_root(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
+    pipeline_jobs.cancel(callback.from_user.id, "cancelled by Back")
     await state.clear()
     await callback.message.edit_text(
         "👇 **How do you want to create today?**",
@@ -222,13 +468,15 @@ async def process_auth_code(message: types.Message, state: FSMContext):
     
     try:
         # 2. EXCHANGE CODE FOR TOKEN
-        response = requests.post(token_url, data=data)
+        # An authorization code works once: a retry after a lost response would only hide the
+        # real outcome behind invalid_grant, so this call is never repeated.
+        response = await http_client.post(token_url, data=data, max_retries=0)
         if response.status_code == 200:
             token = response.json().get("access_token")
             
             # 3. FETCH USER URN (Required for posting)
             headers = {"Authorization": f"Bearer {token}"}
-            user_response = requests.get("https://api.linkedin.com/v2/userinfo", headers=headers)
+            user_response = await http_client.get(f"{LINKEDIN_API_BASE}/v2/userinfo", headers=headers)
             
             if user_response.status_code == 200:
                 user_info = user_response.json()
@@ -264,18 +512,28 @@ async def process_lens_click(callback: types.CallbackQuery, state: FSMContext):
 
     # 2. Handle Standard Lenses
     await callback.answer()
-    await run_briefing_sequence(callback.message, state, lens_key, custom_topic=None)
+    await run_briefing_sequence(callback.message, state, lens_key, callback.from_user.id, custom_topic=None)
 
 # --- C. CUSTOM TOPIC HANDLER ---
 @dp.message(BotState.waiting_for_custom_topic)
 async def process_custom_topic(message: types.Message, state: FSMContext):
     user_topic = message.text
-    await run_briefing_sequence(message, state, "lens_custom", custom_topic=user_topic)
+    await run_briefing_sequence(message, state, "lens_custom", message.from_user.id, custom_topic=user_topic)
+
+# --- C2. SCHEDULE TIME INPUT (before the F.text catch-all) ---
+@dp.message(BotState.waiting_for_schedule_time, F.text)
+async def process_schedule_time(message: types.Message, state: FSMContext):
+    run_at = parse_when(message.text)
+    if not run_at:
+        await message.answer("⚠️ I couldn't read that time. Try `in 90m`, `18:30` or `2026-03-01 09:00` (UTC).", parse_mode="Markdown")
+        return
+    await state.set_state(None)
+    await schedule_current_draft(message, message.from_user.id, state, run_at)
 
 # --- D. BRIEFING SEQUENCE ---
-async def run_briefing_sequence(message_obj, state, lens_key, custom_topic=None):
+async def run_briefing_sequence(message_obj, state, lens_key, user_id, custom_topic=None):
     """
-    1. Searches Perplexity.
+    1. Takes a warm briefing from the prefetch pool, or searches Perplexity.
     2. Formats a Briefing Card.
     3. Waits for User Voice Reaction.
     """
@@ -285,14 +543,26 @@ async def run_briefing_sequence(message_obj, state, lens_key, custom_topic=None)
         parse_mode="Markdown"
     )
 
-    loop = asyncio.get_event_loop()
-    
     # 1. Research (The Infinite Investigator)
+    research_data = None if custom_topic else briefing_pool.take(lens_key, user_id)
+    # A newer lens tap (or Cancel/Back) supersedes this search
+    cancel = pipeline_jobs.start(user_id, "research")
     try:
-        research_data = await loop.run_in_executor(None, search_perplexity, lens_key, custom_topic)
+        if research_data is None:
+            async with stage("research").slot(on_wait=queue_notifier(status_msg)):
+                research_data = await search_perplexity(lens_key, custom_topic, cancel=cancel)
+            briefing_pool.mark_seen(user_id, research_data)
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e))
+        return
+    except Cancelled:
+        await show_cancelled(status_msg)
+        return
     except Exception as e:
         await status_msg.edit_text(f"❌ **Search Error:** {str(e)}")
         return
+    finally:
+        pipeline_jobs.finish(user_id, cancel)
     
     # 2. Format the Card (The Briefing)
     card_text = format_card_text(research_data)
@@ -321,13 +591,12 @@ async def process_voice_message(message: types.Message, state: FSMContext):
     current_state = await state.get_state()
     print(f"🎤 Voice Received. Current State: {current_state}") # Debug print
 
-    # 2. HANDLE "LOST" USERS (Restart Amnesia)
+    # 2. HANDLE USERS WHO AREN'T IN A MODE (state now survives restarts)
     valid_states = [BotState.waiting_for_voice, BotState.waiting_for_reaction]
     
     if current_state not in valid_states:
         await message.reply(
             "⚠️ **I received your voice, but I wasn't ready.**\n\n"
-            "This happens if the bot was restarted.\n"
             "👇 **Please click a mode to start:**",
             reply_markup=get_root_menu()
         )
@@ -336,11 +605,13 @@ async def process_voice_message(message: types.Message, state: FSMContext):
     # 3. IF VALID, PROCEED NORMALLY
     status_msg = await message.reply("✅ **Voice received.** Transcribing...", parse_mode="Markdown")
     
-    # 4. Download Audio
-    file_id = message.voice.file_id
-    file = await bot.get_file(file_id)
-    file_path = f"voice_{file_id}.ogg"
-    await bot.download_file(file.file_path, file_path)
+    # 4. Stream Audio into a bounded spool (memory first, anonymous temp file past the limit)
+    file = await bot.get_file(message.voice.file_id)
+    if file.file_size and file.file_size > VOICE_MAX_BYTES:
+        await status_msg.edit_text("❌ **Voice note is too large.** Please keep it under 25 MB.")
+        return
+
+    audio = new_voice_spool()
     
 # 5. Check Context & Language (FIXED)
     state_data = await state.get_data()
@@ -351,23 +622,35 @@ async def process_voice_message(message: types.Message, state: FSMContext):
         research_context = state_data.get("research_context")
     
     # 6. Run Processing (FIXED: Added 'language' argument)
-    loop = asyncio.get_event_loop()
+    cancel = pipeline_jobs.start(message.from_user.id, "voice")
     try:
+        await bot.download_file(file.file_path, audio)
         # Pass language here so the logic knows what prompt to use
-        post_data = await loop.run_in_executor(None, process_voice_note, file_path, language, research_context)
+        post_data = await run_with_live_status(status_msg, stream_voice_note(
+            audio, language, research_context,
+            duration=message.voice.duration,
+            mode=credential_store.get_setting(message.from_user.id, "pipeline_mode"),
+            cancel=cancel
+        ))
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e))
+        return
+    except Cancelled:
+        await show_cancelled(status_msg)
+        return
     except Exception as e:
         await status_msg.edit_text(f"❌ **System Error:** {str(e)}")
-        if os.path.exists(file_path): os.remove(file_path)
         return
-    
-    # 7. Cleanup & Success
-    if os.path.exists(file_path): os.remove(file_path)
+    finally:
+        # 7. Cleanup (a crash leaves nothing behind: the spool is never a named file)
+        audio.close()
+        pipeline_jobs.finish(message.from_user.id, cancel)
 
     if post_data.get("title") == "Error":
         await status_msg.edit_text(f"❌ **Writer Error:** {post_data.get('text')}")
         return
 
-    await state.update_data(final_post=post_data)
+    await state.update_data(final_post=post_data, draft_id=new_draft_id())
     await state.set_state(BotState.waiting_for_visual_choice)
     await status_msg.delete()
     
@@ -405,18 +688,30 @@ async def process_text_draft_message(message: types.Message, state: FSMContext):
     if current_state == BotState.waiting_for_reaction:
         research_context = state_data.get("research_context")
     
-    loop = asyncio.get_event_loop()
+    cancel = pipeline_jobs.start(message.from_user.id, "text")
     try:
-        post_data = await loop.run_in_executor(None, process_text_note, message.text, language, research_context)
+        post_data = await run_with_live_status(status_msg, stream_text_note(
+            message.text, language, research_context,
+            mode=credential_store.get_setting(message.from_user.id, "pipeline_mode"),
+            cancel=cancel
+        ))
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e))
+        return
+    except Cancelled:
+        await show_cancelled(status_msg)
+        return
     except Exception as e:
         await status_msg.edit_text(f"❌ **System Error:** {str(e)}")
         return
+    finally:
+        pipeline_jobs.finish(message.from_user.id, cancel)
     
     if post_data.get("title") == "Error":
         await status_msg.edit_text(f"❌ **Writer Error:** {post_data.get('text')}")
         return
 
-    await state.update_data(final_post=post_data)
+    await state.update_data(final_post=post_data, draft_id=new_draft_id())
     await state.set_state(BotState.waiting_for_visual_choice)
     await status_msg.delete()
     
@@ -441,11 +736,17 @@ async def process_visual_web(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
     status_msg = await callback.message.edit_text("🌍 **Searching & Downloading...**")
     
+    user_id = callback.from_user.id
     data = await state.get_data()
     draft_post = data.get("final_post")
+    draft_id = data.get("draft_id")
     
-    loop = asyncio.get_event_loop()
-    image_url, query_used = await loop.run_in_executor(None, get_image_from_web, draft_post['text'])
+    try:
+        async with stage("image").slot(on_wait=queue_notifier(status_msg)):
+            image_bytes, mime_type, query_used = await get_image_from_web(draft_post['text'])
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e), reply_markup=callback.message.reply_markup)
+        return
     
     full_text_message = (
         f"🚀 **{draft_post['title']}**\n\n"
@@ -454,7 +755,8 @@ async def process_visual_web(callback: types.CallbackQuery, state: FSMContext):
         f"📷 *Image Source:* {query_used}"
     )
 
-    if not image_url:
+    if not image_bytes:
+        await forget_draft_image(state, user_id, draft_id)
         await callback.message.answer(
             f"⚠️ **No Image Found.** Sending text only.\n\n{full_text_message}",
             reply_markup=get_publish_menu()
@@ -463,18 +765,16 @@ async def process_visual_web(callback: types.CallbackQuery, state: FSMContext):
         return
 
     try:
-        img_response = await loop.run_in_executor(None, requests.get, image_url)
-        img_response.raise_for_status()
-        
-        local_path = "temp_generated_image.png"
-        with open(local_path, "wb") as f:
-            f.write(img_response.content)
-
-        image_file = FSInputFile(local_path)
-        await callback.message.answer_photo(photo=image_file)
+        # Already downloaded and checked by the image finder
+        image_file = BufferedInputFile(image_bytes, filename="image.jpg")
+        sent = await callback.message.answer_photo(photo=image_file)
+        await remember_draft_image(
+            state, user_id, draft_id, image_bytes, mime_type, "web", sent.photo[-1].file_id
+        )
         await callback.message.answer(text=full_text_message, parse_mode="Markdown", reply_markup=get_publish_menu())
         
     except Exception as e:
+        await forget_draft_image(state, user_id, draft_id)
         await callback.message.answer(
             f"⚠️ **Image Error.** Text below:\n\n{full_text_message}",
             reply_markup=get_publish_menu()
@@ -487,16 +787,23 @@ async def process_visual_ai(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
     status_msg = await callback.message.edit_text("🎨 **Director is thinking...**")
     
-    user_id = callback.from_user.id  # <--- 1. Get User ID
+    user_id = callback.from_user.id
     data = await state.get_data()
     draft_post = data.get("final_post")
+    draft_id = data.get("draft_id")
     
-    loop = asyncio.get_event_loop()
-    
-    # <--- 2. Pass user_id to the generator
-    image_path, subject_used = await loop.run_in_executor(
-        None, generate_ai_image, draft_post['text'], user_id
-    )
+    cancel = pipeline_jobs.start(user_id, "image")
+    try:
+        async with stage("image").slot(on_wait=queue_notifier(status_msg)):
+            image_bytes, mime_type, subject_used = await generate_ai_image(draft_post['text'], cancel=cancel)
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e), reply_markup=callback.message.reply_markup)
+        return
+    except Cancelled:
+        await show_cancelled(status_msg)
+        return
+    finally:
+        pipeline_jobs.finish(user_id, cancel)
     
     full_text_message = (
         f"🚀 **{draft_post['title']}**\n\n"
@@ -505,11 +812,13 @@ async def process_visual_ai(callback: types.CallbackQuery, state: FSMContext):
         f"🎨 *AI Concept:* {subject_used}"
     )
 
-    if image_path and os.path.exists(image_path):
-        photo_file = FSInputFile(image_path)
-        await callback.message.answer_photo(photo=photo_file)
+    if image_bytes:
+        photo_file = BufferedInputFile(image_bytes, filename="image.png")
+        sent = await callback.message.answer_photo(photo=photo_file)
+        await remember_draft_image(state, user_id, draft_id, image_bytes, mime_type, "ai", sent.photo[-1].file_id)
         await callback.message.answer(text=full_text_message, parse_mode="Markdown", reply_markup=get_publish_menu())
     else:
+        await forget_draft_image(state, user_id, draft_id)
         await callback.message.answer(
             f"⚠️ **Generation Failed:** {subject_used}\n\n{full_text_message}",
             reply_markup=get_publish_menu()
@@ -521,6 +830,7 @@ async def process_visual_skip(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
     draft_post = data.get("final_post")
+    await forget_draft_image(state, callback.from_user.id, data.get("draft_id"))
     
     await callback.message.edit_text(
         f"🚀 **{draft_post['title']}**\n\n"
@@ -548,8 +858,10 @@ async def process_user_photo(message: types.Message, state: FSMContext):
     
     photo = message.photo[-1]
     file_info = await bot.get_file(photo.file_id)
-    local_path = "temp_generated_image.png"
-    await bot.download_file(file_info.file_path, local_path)
+    buffer = await bot.download_file(file_info.file_path)
+    await remember_draft_image(
+        state, message.from_user.id, data.get("draft_id"), buffer.getvalue(), "image/jpeg", "upload", photo.file_id
+    )
     
     full_text_message = (
         f"🚀 **{draft_post['title']}**\n\n"
@@ -575,42 +887,77 @@ async def process_publish(callback: types.CallbackQuery, state: FSMContext):
         await callback.message.answer("❌ Ошибка: Ваши данные не найдены. Пожалуйста, авторизуйтесь снова через /start.")
         return
 
-    status_msg = await callback.message.answer("⏳ **Публикация в LinkedIn...**")
-    
-    # 3. Собираем данные поста из состояния бота
+    # 3. Собираем данные поста из состояния бота (текст + изображение этого черновика)
     data = await state.get_data()
-    draft_post = data.get("final_post")
-    
-    # Проверяем наличие сгенерированного изображения
-    image_path = "temp_generated_image.png" if os.path.exists("temp_generated_image.png") else None
+
+    # Один черновик = один пост: повторное нажатие не создает дубликат
+    key = draft_key(user_id, data.get("draft_id"))
+    blocked = publish_block_reason(key)
+    if blocked:
+        await callback.answer(blocked)
+        return
+    await callback.answer()
+
+    status_msg = await callback.message.answer("⏳ **Публикация в LinkedIn...**")
     
     try:
-        # 4. Запускаем публикацию, передавая токен и URN именно этого пользователя
-        loop = asyncio.get_event_loop()
-        result_text = await loop.run_in_executor(
-            None, 
-            publish_to_linkedin, 
-            draft_post['text'], 
-            image_path,
-            creds['access_token'], # Токен пользователя
-            creds['user_urn']     # URN пользователя
-        )
-        
-        await status_msg.edit_text(result_text)
-        
-        # Очистка временных файлов после публикации
-        if image_path and os.path.exists(image_path):
-            os.remove(image_path)
+        # 4. Ставим в очередь: воркеры публикуют с повторами и сообщают статус в этот чат
+        _, created = await submit_draft(key, user_id, callback.message.chat.id, data, creds, status_msg)
+        if not created:
+            await status_msg.edit_text("⏳ **Already publishing this draft.**")
+            return
+        await status_msg.edit_text("📮 **Queued for LinkedIn...**")
             
+    except StageBusy as e:
+        await status_msg.edit_text(busy_text(e))
     except Exception as e:
         await status_msg.edit_text(f"⚠️ Ошибка при публикации: {str(e)}")
-        
+
+# --- H. SCHEDULED PUBLISHING ---
+@dp.callback_query(F.data == "action_schedule")
+async def process_schedule_click(callback: types.CallbackQuery):
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=get_schedule_menu())
+
+@dp.callback_query(F.data == "schedule_back")
+async def process_schedule_back(callback: types.CallbackQuery):
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=get_publish_menu())
+
+@dp.callback_query(F.data.startswith("schedule_in_"))
+async def process_schedule_preset(callback: types.CallbackQuery, state: FSMContext):
+    await callback.answer()
+    run_at = parse_when(callback.data.removeprefix("schedule_in_"))
+    await schedule_current_draft(callback.message, callback.from_user.id, state, run_at)
+
+@dp.callback_query(F.data == "schedule_custom")
+async def process_schedule_custom(callback: types.CallbackQuery, state: FSMContext):
+    await callback.answer()
+    await state.set_state(BotState.waiting_for_schedule_time)
+    await callback.message.answer(
+        "🕒 **When should it go out?** (UTC)\n"
+        "`in 90m`, `in 3h`, `18:30` or `2026-03-01 09:00`",
+        parse_mode="Markdown"
+    )
+
+@dp.callback_query(F.data.startswith("unschedule_"))
+async def process_unschedule(callback: types.CallbackQuery):
+    job_id = int(callback.data.removeprefix("unschedule_"))
+    if publish_queue.cancel_scheduled(job_id, callback.from_user.id):
+        await callback.answer("🗑️ Scheduled post cancelled.")
+        await callback.message.edit_text("🗑️ **Scheduled post cancelled.**")
+    else:
+        await callback.answer("It is no longer scheduled.")
 
 @dp.callback_query(F.data == "action_cancel")
 async def process_cancel(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
+    pipeline_jobs.cancel(callback.from_user.id, "cancelled by user")
     await callback.message.edit_reply_markup(reply_markup=None)
     await callback.message.answer("✅ **Action Cancelled.**")
+    data = await state.get_data()
+    workspace.discard(callback.from_user.id, data.get("draft_id"))
+    pending_uploads.abandon(callback.from_user.id, data.get("draft_id"))
     await state.clear()
 
 @dp.callback_query(F.data == "logout")
@@ -618,10 +965,94 @@ async def logout(callback: types.CallbackQuery):
     delete_user_secret(callback.from_user.id)
     await callback.message.edit_text("🔌 **Disconnected.**", reply_markup=get_login_menu())
 
+async def on_startup(worker_index=0):
+    """
+    Per-process housekeeping runs in every webhook worker. The shared background loops
+    (publishing, scheduling, briefing prefetch, model warm-up) run in worker #0 only, so their
+    cost doesn't grow with WEBHOOK_WORKERS; the other workers enqueue into the same SQLite file
+    and worker #0 picks their jobs up on its next poll / resync.
+    """
+    asyncio.create_task(workspace.run_gc())
+    # Every worker normalizes the images its own users send, so each warms its own pool.
+    asyncio.create_task(media_processor.warm())
+    if hasattr(fsm_storage, "run_purge"):
+        asyncio.create_task(fsm_storage.run_purge())
+    if worker_index == 0:
+        # Polling starts right away; the Gemini SDKs finish importing in a worker thread meanwhile.
+        asyncio.create_task(asyncio.to_thread(models.warm))
+        asyncio.create_task(publish_queue.run())
+        asyncio.create_task(publish_scheduler.run())
+        asyncio.create_task(briefing_pool.run())
+    global metrics_runner
+    if METRICS_PORT:
+        # Each webhook worker serves /metrics on METRICS_PORT + its index
+        metrics_runner = await start_metrics_server(METRICS_PORT + worker_index)
+
+async def on_shutdown():
+    await http_client.close_session()
+    credential_store.close()
+    publish_queue.close()
+    media_processor.shutdown()
+    if metrics_runner:
+        await metrics_runner.cleanup()
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
 async def main():
     print("🤖 Linketron Full-Stack is running...")
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
 
+# --- WEBHOOK MODE ---
+async def register_webhook(bot: Bot):
+    await bot.set_webhook(
+        f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    print(f"🔗 Webhook registered at {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+
+def run_webhook_worker(worker_index=0):
+    """
+    One aiohttp server process. With several workers they all bind the same port
+    (SO_REUSEPORT) and share state through the persistent FSM and credential stores.
+    """
+    if worker_index == 0 and WEBHOOK_BASE_URL:
+        dp.startup.register(register_webhook)
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot, worker_index=worker_index)
+
+    print(f"🤖 Linketron webhook worker #{worker_index} listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT, reuse_port=WEBHOOK_WORKERS > 1, print=None)
+
+def run_webhook():
+    if not WEBHOOK_SECRET:
+        raise SystemExit("❌ WEBHOOK_SECRET is required in webhook mode.")
+    if WEBHOOK_WORKERS > 1 and isinstance(fsm_storage, MemoryStorage):
+        raise SystemExit("❌ Multiple webhook workers need a shared FSM_STORAGE (sqlite or redis).")
+
+    if WEBHOOK_WORKERS <= 1:
+        run_webhook_worker(0)
+        return
+
+    # Cancel tokens (pipeline_jobs) and double-tap dedup (callback_flights) live in process
+    # memory, and SO_REUSEPORT spreads a user's updates across workers.
+    print(f"⚠️ {WEBHOOK_WORKERS} webhook workers: Cancel/Back and double-tap dedup only reach jobs "
+          f"running in the worker that received the tap. Use WEBHOOK_WORKERS=1 if you rely on them.")
+
+    # "spawn" so each worker opens its own SQLite connections and HTTP session.
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=run_webhook_worker, args=(i,)) for i in range(WEBHOOK_WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,95 @@
+# services/asset_uploads.py
+import os
+import time
+import asyncio
+import config  # noqa: F401  (loads .env once)
+from services.media_processor import normalize_image
+from services.linkedin_publisher import upload_image
+
+# --- CONFIGURATION ---
+# How long publish waits for a still-running early upload before doing its own.
+ASSET_UPLOAD_WAIT = float(os.getenv("ASSET_UPLOAD_WAIT", "60"))
+# Handles for drafts that never get published are dropped after this long.
+ASSET_HANDLE_TTL = float(os.getenv("ASSET_HANDLE_TTL", os.getenv("MEDIA_TTL_SECONDS", "3600")))
+
+
+def _swallow_result(task):
+    # Nobody may ever await an abandoned or expired upload; don't let its error go unretrieved.
+    if not task.cancelled():
+        task.exception()
+
+
+class PendingUploads:
+    """
+    Starts the LinkedIn register + upload for a draft's image as soon as the user sees it,
+    so tapping Publish only has to create the post.
+    Handles are keyed by (user_id, draft_id) and live in this process only:
+    a publish that lands on another webhook worker simply uploads the usual way.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.started = 0
+        self.used = 0
+        self.abandoned = 0
+
+    def start(self, user_id, draft_id, image_bytes, token, urn):
+        """Begins the upload in the background. A newer image for the same draft replaces the old job."""
+        self.abandon(user_id, draft_id)
+        self._expire()
+        task = asyncio.create_task(self._upload(image_bytes, token, urn))
+        task.add_done_callback(_swallow_result)
+        self._tasks[(str(user_id), draft_id)] = (token, task, time.monotonic() + ASSET_HANDLE_TTL)
+        self.started += 1
+        return task
+
+    async def _upload(self, image_bytes, token, urn):
+        started = time.perf_counter()
+        image_bytes, image_mime = await normalize_image(image_bytes)
+        asset_urn = await upload_image(image_bytes, token, urn, image_mime)
+        print(f"📤 Early Upload: {asset_urn} ready in {time.perf_counter() - started:.1f}s")
+        return asset_urn
+
+    async def take(self, user_id, draft_id, token, timeout=ASSET_UPLOAD_WAIT):
+        """
+        Returns the uploaded asset URN, waiting for it if needed.
+        None when there is no handle, it was made with another token, or the upload failed,
+        in which case the caller uploads the image itself.
+        """
+        entry = self._tasks.pop((str(user_id), draft_id), None)
+        if entry is None:
+            return None
+        upload_token, task, _ = entry
+        if upload_token != token:
+            task.cancel()
+            return None
+        try:
+            asset_urn = await asyncio.wait_for(task, timeout)
+        except Exception as e:
+            print(f"❌ Early Upload Error: {e}")
+            return None
+        self.used += 1
+        return asset_urn
+
+    def abandon(self, user_id, draft_id):
+        """Cancels a pending upload (cancelled draft, replaced or removed image)."""
+        entry = self._tasks.pop((str(user_id), draft_id), None)
+        if entry:
+            entry[1].cancel()
+            self.abandoned += 1
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (_, _, expires_at) in self._tasks.items() if expires_at < now]:
+            self._tasks.pop(key)[1].cancel()
+
+    def stats(self):
+        return {
+            "pending": len(self._tasks),
+            "started": self.started,
+            "used": self.used,
+            "abandoned": self.abandoned,
+        }
+
+
+pending_uploads = PendingUploads()
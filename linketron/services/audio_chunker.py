@@ -0,0 +1,115 @@
+# services/audio_chunker.py
+import os
+import re
+import shutil
+import asyncio
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+CHUNK_TARGET_SECONDS = float(os.getenv("CHUNK_TARGET_SECONDS", "60"))
+CHUNK_MAX_SECONDS = float(os.getenv("CHUNK_MAX_SECONDS", "90"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "1.5"))
+SILENCE_NOISE_DB = os.getenv("SILENCE_NOISE_DB", "-35dB")
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", "0.4"))
+
+_SILENCE_START = re.compile(r"silence_start:\s*([\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*([\d.]+)")
+_WORD = re.compile(r"[\w']+", re.UNICODE)
+
+
+def ffmpeg_available():
+    return shutil.which(FFMPEG_BIN) is not None
+
+async def _run_ffmpeg(args, audio_bytes):
+    proc = await asyncio.create_subprocess_exec(
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "info", *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate(audio_bytes)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr.decode(errors='replace')[-300:]}")
+    return stdout, stderr.decode(errors="replace")
+
+
+# --- 1. SILENCE DETECTION ---
+async def find_silences(audio_bytes):
+    """Returns a list of (start, end) silent spans in seconds."""
+    _, log = await _run_ffmpeg(
+        ["-i", "pipe:0", "-af", f"silencedetect=noise={SILENCE_NOISE_DB}:d={SILENCE_MIN_SECONDS}", "-f", "null", "-"],
+        audio_bytes
+    )
+    starts = [float(x) for x in _SILENCE_START.findall(log)]
+    ends = [float(x) for x in _SILENCE_END.findall(log)]
+    return list(zip(starts, ends))
+
+
+# --- 2. CHUNK PLANNING ---
+def plan_chunks(duration, silences, target=CHUNK_TARGET_SECONDS, max_len=CHUNK_MAX_SECONDS,
+                overlap=CHUNK_OVERLAP_SECONDS):
+    """
+    Picks cut points in the middle of silences near every `target` seconds.
+    When no silence falls inside the window, it hard-cuts at `max_len`.
+    Each chunk is padded by `overlap` on both sides so no word is lost at a cut.
+    """
+    pauses = [(s + e) / 2 for s, e in silences]
+    cuts = [0.0]
+    while duration - cuts[-1] > max_len:
+        last = cuts[-1]
+        window = [p for p in pauses if last + target / 2 <= p <= last + max_len]
+        if window:
+            cut = min(window, key=lambda p: abs(p - (last + target)))
+        else:
+            cut = last + max_len
+        cuts.append(cut)
+    cuts.append(duration)
+
+    return [
+        (max(0.0, start - overlap), min(duration, end + overlap))
+        for start, end in zip(cuts, cuts[1:])
+    ]
+
+
+# --- 3. EXTRACTION ---
+async def extract_chunk(audio_bytes, start, end):
+    """Cuts [start, end) and re-encodes it to 16 kHz mono FLAC, which Whisper takes natively."""
+    stdout, _ = await _run_ffmpeg(
+        ["-i", "pipe:0", "-ss", f"{start:.2f}", "-to", f"{end:.2f}",
+         "-ac", "1", "-ar", "16000", "-c:a", "flac", "-f", "flac", "pipe:1"],
+        audio_bytes
+    )
+    return stdout
+
+
+# --- 4. STITCHING ---
+def merge_transcripts(parts, max_overlap_words=25):
+    """
+    Joins chunk transcripts in order.
+    The overlap padding means the end of one chunk repeats at the start of the next;
+    the longest matching word run is dropped from the later chunk.
+    """
+    merged = ""
+    for part in parts:
+        part = (part or "").strip()
+        if not part:
+            continue
+        if not merged:
+            merged = part
+            continue
+
+        tail = [w.lower() for w in _WORD.findall(merged)[-max_overlap_words:]]
+        head_matches = list(_WORD.finditer(part))[:max_overlap_words]
+        head = [m.group(0).lower() for m in head_matches]
+
+        skip_chars = 0
+        for k in range(min(len(tail), len(head)), 0, -1):
+            if tail[-k:] == head[:k]:
+                skip_chars = head_matches[k - 1].end()
+                break
+
+        remainder = part[skip_chars:].lstrip(" ,.;:")
+        if remainder:
+            merged = f"{merged} {remainder}"
+    return merged
@@ -0,0 +1,136 @@
+# services/briefing_pool.py
+import os
+import time
+import asyncio
+from functools import partial
+from collections import deque
+import config  # noqa: F401  (loads .env once)
+from services.researcher import search_perplexity, BUCKET_DEFINITIONS
+
+# --- CONFIGURATION ---
+BRIEFING_POOL_SIZE = int(os.getenv("BRIEFING_POOL_SIZE", "2"))
+BRIEFING_TTL_SECONDS = float(os.getenv("BRIEFING_TTL_SECONDS", "1800"))
+BRIEFING_PREFETCH_CONCURRENCY = int(os.getenv("BRIEFING_PREFETCH_CONCURRENCY", "2"))
+BRIEFING_DEMAND_WINDOW = float(os.getenv("BRIEFING_DEMAND_WINDOW", "3600"))  # idle lenses stop refilling after this
+BRIEFING_SEEN_PER_USER = 200
+
+
+def is_valid_briefing(data):
+    return bool(data) and data.get("headline_fact") != "Error" and data.get("subject_name") != "System Error"
+
+def _subject(data):
+    return (data.get("subject_name") or "").strip().lower()
+
+
+class BriefingPool:
+    """
+    Keeps a few ready-made briefings per lens so a lens click answers instantly.
+    - Entries expire after `ttl` seconds.
+    - A user never gets the same subject_name twice.
+    - Every take triggers a background refill; expired entries are only replaced for lenses
+      someone asked for within `demand_window` seconds, so an idle bot stops paying for searches.
+    """
+
+    # Prefetch isn't latency-bound, so it skips the multi-candidate fan-out (one search per entry).
+    def __init__(self, fetch=partial(search_perplexity, fanout=1), lens_keys=tuple(BUCKET_DEFINITIONS),
+                 size=BRIEFING_POOL_SIZE, ttl=BRIEFING_TTL_SECONDS, demand_window=BRIEFING_DEMAND_WINDOW):
+        self.fetch = fetch
+        self.lens_keys = lens_keys
+        self.size = size
+        self.ttl = ttl
+        self.demand_window = demand_window
+        self._last_demand = {}
+        self._pools = {lens: deque() for lens in lens_keys}
+        self._in_flight = {lens: 0 for lens in lens_keys}
+        self._seen = {}
+        self._tasks = set()
+        self._limit = asyncio.Semaphore(BRIEFING_PREFETCH_CONCURRENCY)
+        self.hits = 0
+        self.misses = 0
+
+    # --- READ SIDE ---
+    def take(self, lens_key, user_id):
+        """Returns a fresh, unseen briefing for this user, or None (caller then searches live)."""
+        pool = self._pools.get(lens_key)
+        if pool is None:
+            return None
+        self._last_demand[lens_key] = time.monotonic()
+        self._drop_expired(lens_key)
+
+        seen = self._seen.get(str(user_id), ())
+        for i, (_, data) in enumerate(pool):
+            if _subject(data) not in seen:
+                del pool[i]
+                self.mark_seen(user_id, data)
+                self.hits += 1
+                self._refill(lens_key)
+                return data
+
+        self.misses += 1
+        self._refill(lens_key)
+        return None
+
+    def mark_seen(self, user_id, data):
+        if not is_valid_briefing(data):
+            return
+        subjects = self._seen.setdefault(str(user_id), deque(maxlen=BRIEFING_SEEN_PER_USER))
+        subject = _subject(data)
+        if subject and subject not in subjects:
+            subjects.append(subject)
+
+    # --- WRITE SIDE ---
+    def _drop_expired(self, lens_key):
+        pool = self._pools[lens_key]
+        now = time.monotonic()
+        while pool and pool[0][0] < now:
+            pool.popleft()
+
+    def _refill(self, lens_key):
+        missing = self.size - len(self._pools[lens_key]) - self._in_flight[lens_key]
+        for _ in range(max(0, missing)):
+            self._in_flight[lens_key] += 1
+            task = asyncio.create_task(self._fetch_one(lens_key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_one(self, lens_key):
+        try:
+            async with self._limit:
+                data = await self.fetch(lens_key)
+            pool = self._pools[lens_key]
+            if is_valid_briefing(data) and all(_subject(d) != _subject(data) for _, d in pool):
+                pool.append((time.monotonic() + self.ttl, data))
+        except Exception as e:
+            print(f"❌ Briefing Prefetch Error ({lens_key}): {e}")
+        finally:
+            self._in_flight[lens_key] -= 1
+
+    def warm(self):
+        for lens_key in self.lens_keys:
+            self._refill(lens_key)
+
+    def _in_demand(self, lens_key):
+        last = self._last_demand.get(lens_key)
+        return last is not None and time.monotonic() - last < self.demand_window
+
+    async def run(self, interval=None):
+        """Warms every lens once, then keeps the lenses in demand topped up as entries age out."""
+        interval = interval or max(30.0, self.ttl / 4)
+        self.warm()
+        while True:
+            await asyncio.sleep(interval)
+            for lens_key in self.lens_keys:
+                self._drop_expired(lens_key)
+                if self._in_demand(lens_key):
+                    self._refill(lens_key)
+
+    def stats(self):
+        return {
+            "ready": {lens: len(pool) for lens, pool in self._pools.items()},
+            "in_demand": sum(self._in_demand(lens) for lens in self.lens_keys),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+briefing_pool = BriefingPool()
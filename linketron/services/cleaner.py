@@ -1,11 +1,9 @@
 # services/cleaner.py
-import os
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services.llm import generate_text
+from services.models import get_model
 
 
 REFINE_PROMPT = """
@@ -63,7 +61,8 @@ REFINE_PROMPT_RU = """
 }}
 """
 
-def clean_ai_slop(text_to_clean, language):
+@traced("clean.refine")
+async def clean_ai_slop(text_to_clean, language, on_partial=None):
     print(f"🧹 Refinement Layer: Cleaning text in {language}...")
     
     if not text_to_clean:
@@ -77,14 +76,16 @@ def clean_ai_slop(text_to_clean, language):
     print(f"DEBUG: Final Prompt Start: {formatted_prompt[:200]}...")
 
     try:
-        # Initializing Gemini 3 model as requested
-        model = genai.GenerativeModel('gemini-3-flash-preview') 
-        response = model.generate_content(
+        response_text = await generate_text(
+            get_model("cleaner"),
             formatted_prompt,
-            generation_config={"response_mime_type": "application/json"}
+            generation_config={"response_mime_type": "application/json"},
+            on_partial=on_partial,
+            cache=True,
+            validate=json.loads
         )
         
-        parsed = json.loads(response.text.strip())
+        parsed = json.loads(response_text.strip())
         
         # INSURANCE: If AI returns a list, take the first item
         if isinstance(parsed, list):
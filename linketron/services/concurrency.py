@@ -0,0 +1,126 @@
+# services/concurrency.py
+import asyncio
+
+
+async def first_successful(tasks):
+    """
+    Returns the result of the first task that finishes without raising and cancels the others.
+    If every task fails, the last error is re-raised.
+    """
+    errors = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except Exception as e:
+                errors.append(e)
+    finally:
+        for task in tasks:
+            task.cancel()
+    raise errors[-1]
+
+
+class SingleFlight:
+    """
+    Identical concurrent calls share one execution. The first caller for a key starts it;
+    callers arriving while it runs await the same task and get the same result (or error).
+    Per process: webhook workers each have their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.joined = 0
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    async def do(self, key, func, *args, **kwargs):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            self.started += 1
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.joined += 1
+        # Shielded: one caller giving up (cancelled) doesn't cancel the others' result.
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an abandoned failure isn't logged as unhandled
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "started": self.started, "joined": self.joined}
+
+
+class SingleFlightMiddleware:
+    """
+    Inner callback_query middleware: repeated taps on the same button for the same draft
+    attach to the handler run already in flight instead of starting another pipeline.
+    `actions` are callback_data prefixes (e.g. "visual_", "action_publish").
+    """
+
+    def __init__(self, actions):
+        self.actions = tuple(actions)
+        self.flights = SingleFlight()
+
+    async def __call__(self, handler, event, data):
+        if not (event.data or "").startswith(self.actions):
+            return await handler(event, data)
+        state = data.get("state")
+        draft_id = (await state.get_data()).get("draft_id") if state else None
+        key = (event.from_user.id, draft_id, event.data)
+        if self.flights.in_flight(key):
+            try:
+                await event.answer("⏳ Already on it...")
+            except Exception:
+                pass
+        return await self.flights.do(key, handler, event, data)
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint of a job whose CancelToken was cancelled."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one pipeline job. The job calls check() between stages
+    (and may guard() one long wait); whoever supersedes the job calls cancel().
+    Raising at a checkpoint inside `stage(...).slot()` hands the slot straight back.
+    """
+
+    def __init__(self, kind="job"):
+        self.kind = kind
+        self.reason = None
+        self._event = asyncio.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        if not self.cancelled:
+            self.reason = reason
+            self._event.set()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled(f"{self.kind} {self.reason}")
+
+    async def guard(self, awaitable):
+        """Awaits `awaitable`, abandoning (cancelling) it as soon as the token is cancelled."""
+        self.check()
+        work = asyncio.ensure_future(awaitable)
+        waiter = asyncio.ensure_future(self._event.wait())
+        try:
+            await asyncio.wait({work, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            if not work.done():
+                work.cancel()
+        self.check()
+        return work.result()
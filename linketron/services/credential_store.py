@@ -0,0 +1,210 @@
+# services/credential_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+CREDENTIAL_BACKEND = os.getenv("CREDENTIAL_BACKEND", "sqlite")
+CREDENTIALS_DB = os.getenv("CREDENTIALS_DB", "user_secrets.db")
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "4096"))
+CREDENTIAL_CACHE_TTL = float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+LEGACY_JSON_FILE = "user_secrets.json"
+
+
+# --- 1. SQLITE BACKEND (WAL) ---
+class SQLiteCredentialStore:
+    """
+    Keyed vault: one record per Telegram user ID.
+    Records look like {"access_token": ..., "user_urn": ...}; small per-user preferences
+    (e.g. pipeline_mode) live next to them in user_settings.
+    Primary-key lookups instead of re-parsing a whole JSON file on every click.
+    """
+
+    def __init__(self, db_path=CREDENTIALS_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS credentials ("
+            " user_id TEXT PRIMARY KEY,"
+            " access_token TEXT NOT NULL,"
+            " user_urn TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_settings ("
+            " user_id TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT,"
+            " PRIMARY KEY (user_id, key))"
+        )
+
+    def get(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT access_token, user_urn FROM credentials WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchone()
+        if not row:
+            return None
+        return {"access_token": row[0], "user_urn": row[1]}
+
+    def save(self, user_id, token, urn):
+        self.save_many({user_id: {"access_token": token, "user_urn": urn}})
+
+    def save_many(self, records):
+        # One transaction per batch: either every row lands or none does.
+        now = time.time()
+        rows = [
+            (str(user_id), rec.get("access_token"), rec.get("user_urn"), now)
+            for user_id, rec in records.items()
+            if rec and rec.get("access_token")
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO credentials (user_id, access_token, user_urn, updated_at) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET "
+                    "access_token = excluded.access_token, "
+                    "user_urn = excluded.user_urn, "
+                    "updated_at = excluded.updated_at",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, user_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM credentials WHERE user_id = ?", (str(user_id),))
+
+    def get_setting(self, user_id, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM user_settings WHERE user_id = ? AND key = ?",
+                (str(user_id), key)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, user_id, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO user_settings (user_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, key) DO UPDATE SET value = excluded.value",
+                (str(user_id), key, value)
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM credentials").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- 2. READ-THROUGH LRU CACHE ---
+_MISSING = object()
+
+class CachedCredentialStore:
+    """
+    Wraps a backend (same methods as SQLiteCredentialStore) with an in-process LRU.
+    Reads fill the cache, writes go to the backend first and then update it.
+    Entries expire after `ttl` seconds so other bot processes' writes are picked up.
+    """
+
+    def __init__(self, backend, max_size=CREDENTIAL_CACHE_SIZE, ttl=CREDENTIAL_CACHE_TTL):
+        self.backend = backend
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._cache.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._cache.move_to_end(key)
+                    return dict(value) if value else None
+                del self._cache[key]
+
+        value = self.backend.get(key)
+        self._remember(key, value)
+        return dict(value) if value else None
+
+    def save(self, user_id, token, urn):
+        self.backend.save(user_id, token, urn)
+        self._remember(str(user_id), {"access_token": token, "user_urn": urn})
+
+    def save_many(self, records):
+        self.backend.save_many(records)
+        with self._lock:
+            for user_id in records:
+                self._cache.pop(str(user_id), None)
+
+    def delete(self, user_id):
+        self.backend.delete(user_id)
+        self._remember(str(user_id), None)
+
+    def get_setting(self, user_id, key, default=None):
+        return self.backend.get_setting(user_id, key, default)
+
+    def set_setting(self, user_id, key, value):
+        self.backend.set_setting(user_id, key, value)
+
+    def close(self):
+        self.backend.close()
+
+
+# --- 3. ONE-SHOT MIGRATION ---
+def migrate_from_json(store, json_path=LEGACY_JSON_FILE):
+    """
+    Imports the old user_secrets.json vault in a single transaction,
+    then renames it so the import never runs twice.
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, "r") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"❌ Vault Migration Error: could not read {json_path}: {e}")
+        return 0
+
+    store.save_many(data)
+    os.replace(json_path, json_path + ".migrated")
+    print(f"🔐 Vault Migration: moved {len(data)} users from {json_path}.")
+    return len(data)
+
+
+BACKENDS = {
+    "sqlite": lambda: SQLiteCredentialStore(CREDENTIALS_DB),
+}
+
+def build_credential_store(backend=CREDENTIAL_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown CREDENTIAL_BACKEND: {backend}")
+    store = CachedCredentialStore(BACKENDS[backend]())
+    migrate_from_json(store)
+    return store
@@ -1,17 +1,8 @@
-import os
 import json
-import logging
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Configure Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    logging.error("❌ GEMINI_API_KEY is missing in .env")
-else:
-    genai.configure(api_key=api_key)
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services.llm import generate_text
+from services.models import get_model
 
 # --- SOPHISTICATED VIRAL PROMPT ---
 WRITER_PROMPT = """
@@ -113,7 +104,86 @@ WRITER_PROMPT_RU = """
 }}
 """
 
-def generate_viral_post(research_json, user_transcript, language):
+# --- FUSED PROMPTS (fast mode: draft + refine in one call) ---
+FUSED_PROMPT = """
+### ROLE
+You are a Senior Professional Editor and an uncompromising proofreader in one pass. Turn the raw input into a polished, human-written LinkedIn post that already reads as clean, final copy.
+
+### INPUT RESEARCH DATA (optional factual source, do NOT invent new facts)
+{research_data}
+
+### RAW AUTHOR INPUT (transcript or notes; this is the angle and the voice)
+"{transcript}"
+
+### OBJECTIVE
+Fix grammar, remove filler words (um, uh, like, you know) and organize the thoughts into a logical flow. Keep the first-person ("I") perspective and the author's own phrases. If research data is present, use it for facts and the author input for the opinion; if they disagree, write a contrarian post.
+
+### CRITICAL CONSTRAINTS
+1. **LANGUAGE**: Write the entire output (title and text) in {language}.
+2. **DENSE PROSE**: Use 3-5 sentence paragraphs. No one-sentence lines, no broetry.
+3. **NO DASHES OR HYPHENS TO CONNECT IDEAS**: Never use a dash (—, –, -) between thoughts. Use a verb (is, means, consists of, allows) and a full sentence.
+4. **NO CONTRASTIVE NEGATION**: Never write "not X, but Y" or "it's not about X, it's about Y". State facts directly.
+5. **NO COMPARATIVES**: Avoid "more than", "less than", "better", "worse". State the current reality.
+6. **NO DRAMA**: No chaos, war, battle, struggle, shattered, panic unless the author said it.
+7. **BANNED WORDS**: unlock, unleash, elevate, delve, dive, humbled, thrilled, tapestry, game-changer, foster, harness, potential, journey, transformation, unique, key to success, in today's landscape.
+8. **NO PREACHY OUTROS**: No "Remember," or "In conclusion,". End on the punchline or a question.
+
+### OUTPUT FORMAT (JSON ONLY)
+{{
+  "title": "A short, professional headline (<80 chars)",
+  "text": "The final post text..."
+}}
+"""
+
+FUSED_PROMPT_RU = """
+### РОЛЬ
+Вы — старший редактор и бескомпромиссный корректор в одном проходе. Превратите сырой текст в отполированный, человеческий пост для LinkedIn, который уже является чистовиком.
+
+### ДАННЫЕ ИССЛЕДОВАНИЯ (необязательный источник фактов, НЕ придумывайте новых фактов)
+{research_data}
+
+### СЫРОЙ ТЕКСТ АВТОРА (транскрипт или заметки; это угол зрения и голос)
+"{transcript}"
+
+### ЦЕЛЬ
+Исправьте грамматику, удалите слова-паразиты и выстройте мысли в логичную структуру. Сохраняйте повествование от первого лица («Я») и оригинальные фразы автора. Если есть данные исследования, берите из них факты, а из текста автора мнение.
+
+### КРИТИЧЕСКИЕ ПРАВИЛА
+1. **ЯЗЫК**: Пишите строго на РУССКОМ языке.
+2. **ПЛОТНАЯ ПРОЗА**: Абзацы по 3-5 предложений. Никаких однострочных предложений.
+3. **НИКАКИХ ТИРЕ**: Не используйте тире (—, –) для связи мыслей. Заменяйте их глаголом (является, означает, заключается в, позволяет).
+4. **БЕЗ КОНТРАСТНЫХ ОТРИЦАНИЙ**: Запрещена структура «не Х, а Y». Утверждайте факты прямо.
+5. **БЕЗ СРАВНЕНИЙ**: Не используйте «более чем», «менее чем», «лучше/хуже».
+6. **НИКАКОЙ ДРАМЫ**: Никаких «битв», «хаоса», «разбитых надежд», если их не было в исходнике.
+7. **БЕЗ AI-ШТАМПОВ**: Запрещены слова «раскрыть», «погрузиться», «уникальный», «трансформация», «путешествие», «потенциал», «ключ к успеху».
+
+### ФОРМАТ ВЫВОДА (JSON ONLY)
+{{
+  "title": "Краткий заголовок",
+  "text": "Финальный текст поста..."
+}}
+"""
+
+POST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "text": {"type": "string"},
+    },
+    "required": ["title", "text"],
+}
+
+def _parse_post_json(response_text):
+    """The writer sometimes wraps its JSON in a ```json fence."""
+    clean_text = response_text.strip()
+    if clean_text.startswith("```json"):
+        clean_text = clean_text[7:]
+    if clean_text.endswith("```"):
+        clean_text = clean_text[:-3]
+    return json.loads(clean_text)
+
+@traced("draft.viral_post")
+async def generate_viral_post(research_json, user_transcript, language, on_partial=None):
     """
     Выбирает нужный промпт в зависимости от языка и генерирует пост.
     """
@@ -127,30 +197,59 @@ def generate_viral_post(research_json, user_transcript, language):
         # 2. Выбор промпта (Router)
         selected_prompt = WRITER_PROMPT_RU if language == "Russian" else WRITER_PROMPT
         
-        # 3. Выбор модели
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # 4. Вызов API
-        response = model.generate_content(
+        # 3. Вызов API (модель берется из общего реестра)
+        response_text = await generate_text(
+            get_model("writer"),
             selected_prompt.format(
                 research_data=research_text, 
-                user_transcript=clean_transcript
+                user_transcript=clean_transcript,
+                language=language
             ),
-            generation_config={"response_mime_type": "application/json"}
+            generation_config={"response_mime_type": "application/json"},
+            on_partial=on_partial
         )
         
         # 5. Парсинг ответа
-        clean_text = response.text.strip()
-        if clean_text.startswith("```json"):
-            clean_text = clean_text[7:]
-        if clean_text.endswith("```"):
-            clean_text = clean_text[:-3]
-            
-        return json.loads(clean_text)
+        return _parse_post_json(response_text)
 
     except Exception as e:
         print(f"❌ Editor Error: {e}")
         return {
             "title": "Error Generating Post",
             "text": f"An error occurred while writing: {e}"
-        }
\ No newline at end of file
+        }
+
+@traced("draft.fused")
+async def generate_fused_post(raw_text, language, research_json=None, on_partial=None):
+    """
+    Fast mode: one structured-output call that drafts and refines at once,
+    replacing the draft + clean_ai_slop round-trips.
+    """
+    print(f"⚡ Editor: Fused draft+refine in {language}...")
+
+    try:
+        research_text = json.dumps(research_json, indent=2) if research_json else "None."
+        selected_prompt = FUSED_PROMPT_RU if language in ["Russian", "ru"] else FUSED_PROMPT
+
+        response_text = await generate_text(
+            get_model("fused"),
+            selected_prompt.format(
+                research_data=research_text,
+                transcript=raw_text or "Focus on technical facts and professional insight.",
+                language=language
+            ),
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": POST_SCHEMA,
+            },
+            on_partial=on_partial
+        )
+
+        parsed = json.loads(response_text.strip())
+        if isinstance(parsed, list):
+            parsed = parsed[0]
+        return parsed
+
+    except Exception as e:
+        print(f"❌ Fused Editor Error: {e}")
+        return {"title": "Error", "text": f"Drafting Error: {str(e)}"}
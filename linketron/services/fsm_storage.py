@@ -0,0 +1,110 @@
+# services/fsm_storage.py
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")          # sqlite | redis | memory
+FSM_DB = os.getenv("FSM_DB", "fsm_state.db")
+FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+FSM_TTL_SECONDS = int(os.getenv("FSM_TTL_SECONDS", str(7 * 24 * 3600)))
+FSM_PURGE_INTERVAL = float(os.getenv("FSM_PURGE_INTERVAL", "3600"))
+
+
+def _storage_key(key):
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+def _dumps(data):
+    # Compact: no whitespace, UTF-8 kept as-is (Russian drafts would triple in size with \u escapes).
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Durable aiogram FSM storage. Drafts, research context and language survive restarts,
+    and every bot process on the host shares the same file (WAL mode).
+    Rows expire `ttl` seconds after their last write.
+    """
+
+    def __init__(self, db_path=FSM_DB, ttl=FSM_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fsm_expires ON fsm (expires_at)")
+
+    def _read(self, column, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {column} FROM fsm WHERE key = ? AND expires_at > ?",
+                (_storage_key(key), time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, column, key, value):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO fsm (key, {column}, expires_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, expires_at = excluded.expires_at",
+                (_storage_key(key), value, time.time() + self.ttl)
+            )
+
+    async def set_state(self, key, state=None):
+        value = state.state if isinstance(state, State) else state
+        self._write("state", key, value)
+
+    async def get_state(self, key):
+        return self._read("state", key)
+
+    async def set_data(self, key, data):
+        self._write("data", key, _dumps(dict(data)) if data else None)
+
+    async def get_data(self, key):
+        raw = self._read("data", key)
+        return json.loads(raw) if raw else {}
+
+    def purge_expired(self):
+        with self._lock:
+            return self._conn.execute("DELETE FROM fsm WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    async def run_purge(self, interval=FSM_PURGE_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.purge_expired()
+            if removed:
+                print(f"🧹 FSM Storage: expired {removed} stale sessions.")
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_fsm_storage(backend=FSM_STORAGE):
+    """
+    sqlite: one host, any number of bot processes.
+    redis: any Redis-compatible server, shared across nodes (needs `pip install redis`).
+    """
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(FSM_REDIS_URL, state_ttl=FSM_TTL_SECONDS, data_ttl=FSM_TTL_SECONDS)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown FSM_STORAGE: {backend}")
@@ -0,0 +1,246 @@
+# services/http_client.py
+import io
+import os
+import json
+import random
+import asyncio
+from urllib.parse import urlsplit
+import aiohttp
+import config  # noqa: F401  (loads .env once)
+from services.tracing import span
+
+# --- CONFIGURATION ---
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Provider label for latency metrics; anything else (e.g. image hosts) is "web".
+PROVIDER_HOSTS = {
+    "api.groq.com": "groq",
+    "api.perplexity.ai": "perplexity",
+    "google.serper.dev": "serper",
+    "api.linkedin.com": "linkedin",
+    "www.linkedin.com": "linkedin",
+}
+# Base URLs that may point at local stand-ins (see benchmarks/harness.py) keep their provider label.
+PROVIDER_BASE_ENV = {
+    "GROQ_API_BASE": "groq",
+    "PERPLEXITY_API_BASE": "perplexity",
+    "SERPER_API_BASE": "serper",
+    "LINKEDIN_API_BASE": "linkedin",
+}
+
+_session = None
+_host_limits = {}
+
+
+class HTTPError(Exception):
+    def __init__(self, response):
+        self.response = response
+        super().__init__(f"HTTP {response.status_code} for {response.url}: {response.text[:300]}")
+
+
+class HTTPResponse:
+    """Fully-read response. Mirrors the bits of `requests.Response` the services use."""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(self)
+
+
+# --- 1. SHARED SESSION ---
+def get_session():
+    """One pooled keep-alive session for the whole process."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _session
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _host_limits.clear()
+
+def provider_for(url):
+    host = urlsplit(url).netloc
+    if host in PROVIDER_HOSTS:
+        return PROVIDER_HOSTS[host]
+    for env_name, provider in PROVIDER_BASE_ENV.items():
+        base = os.getenv(env_name)
+        if base and urlsplit(base).netloc == host:
+            return provider
+    # LinkedIn upload hosts
+    return "linkedin" if "linkedin" in host else "web"
+
+def _payload_size(data, json_body):
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    if json_body is not None:
+        return len(json.dumps(json_body, default=str))
+    return None
+
+def _mark_status(s, status_code):
+    s.set(status_code=status_code)
+    if status_code >= 400:
+        s.fail(f"http_{status_code // 100}xx")
+
+def _host_limit(url):
+    host = urlsplit(url).netloc
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return _host_limits[host]
+
+
+# --- 2. REQUEST WITH RETRIES ---
+class _BorrowedStream(io.RawIOBase):
+    """
+    aiohttp closes file payloads once they are sent. This wrapper streams the
+    caller's file in chunks while leaving it open, so a retry can rewind it.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._raw.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+def _build_form(data, files):
+    """Multipart bodies are single-use in aiohttp, so a fresh one is built per attempt."""
+    form = aiohttp.FormData()
+    for key, value in (data or {}).items():
+        form.add_field(key, str(value))
+    for key, (filename, payload, content_type) in files.items():
+        if hasattr(payload, "read"):
+            payload.seek(0)
+            payload = _BorrowedStream(payload)
+        form.add_field(key, payload, filename=filename, content_type=content_type)
+    return form
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = HTTP_BACKOFF_BASE * (2 ** attempt)
+    return min(delay, HTTP_BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+async def request(method, url, *, headers=None, params=None, json=None, data=None, files=None,
+                  timeout=None, max_retries=HTTP_MAX_RETRIES, retry_statuses=RETRY_STATUSES):
+    """
+    Sends a request through the shared session.
+    Retries on connection errors, timeouts and `retry_statuses` with jittered exponential backoff.
+    Connection errors and timeouts are retried whatever `retry_statuses` is, so calls that must not
+    be repeated once the server may have seen them need `max_retries=0`.
+    """
+    session = get_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+
+    attempt = 0
+    while True:
+        body = _build_form(data, files) if files else data
+        try:
+            with span(f"http.{method.lower()}", provider=provider_for(url), host=urlsplit(url).netloc,
+                      attempt=attempt, bytes_out=_payload_size(data, json)) as s:
+                async with _host_limit(url):
+                    async with session.request(
+                        method, url, headers=headers, params=params, json=json, data=body,
+                        timeout=client_timeout
+                    ) as resp:
+                        content = await resp.read()
+                        response = HTTPResponse(str(resp.url), resp.status, resp.headers, content)
+                s.set(bytes_in=len(content))
+                _mark_status(s, response.status_code)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt >= max_retries:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"🔁 HTTP {method} {urlsplit(url).netloc}: {type(e).__name__}, retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in retry_statuses or attempt >= max_retries:
+                return response
+            delay = _backoff_delay(attempt, response.headers.get("Retry-After"))
+            print(f"🔁 HTTP {method} {urlsplit(url).netloc}: {response.status_code}, retrying in {delay:.1f}s")
+
+        attempt += 1
+        await asyncio.sleep(delay)
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
+
+async def put(url, **kwargs):
+    return await request("PUT", url, **kwargs)
+
+
+# --- 3. CAPPED DOWNLOADS ---
+class DownloadRejected(Exception):
+    pass
+
+async def download(url, *, max_bytes, timeout, headers=None, inspect=None, chunk_size=16 * 1024):
+    """
+    Single-attempt streaming GET for untrusted hosts (no retries: callers race several of these).
+    - Gives up after `timeout` seconds or once the body passes `max_bytes`.
+    - `inspect(head)` runs on the bytes received so far until it returns something other than None;
+      it may raise to reject the body early. Its result is returned next to the response.
+    """
+    session = get_session()
+    with span("http.download", provider=provider_for(url), host=urlsplit(url).netloc) as s:
+        return await _download(session, url, max_bytes, timeout, headers, inspect, chunk_size, s)
+
+async def _download(session, url, max_bytes, timeout, headers, inspect, chunk_size, s):
+    async with _host_limit(url):
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            s.set(status_code=resp.status)
+            if resp.status >= 400:
+                raise DownloadRejected(f"HTTP {resp.status}")
+            if resp.content_length and resp.content_length > max_bytes:
+                raise DownloadRejected(f"{resp.content_length} bytes is over the {max_bytes} byte cap")
+
+            body = bytearray()
+            info = None
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                body.extend(chunk)
+                if len(body) > max_bytes:
+                    raise DownloadRejected(f"Body is over the {max_bytes} byte cap")
+                if inspect and info is None:
+                    info = inspect(bytes(body))
+            s.set(bytes_in=len(body))
+            return HTTPResponse(str(resp.url), resp.status, resp.headers, bytes(body)), info
@@ -1,27 +1,68 @@
 import os
-import requests
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services import http_client
+from services.concurrency import first_successful
+from services.image_probe import probe
+from services.llm import generate_text
+from services.models import get_model
 
 SERPER_KEY = os.getenv("SERPER_API_KEY")
-GEMINI_KEY = os.getenv("GEMINI_API_KEY")
+SERPER_API_BASE = os.getenv("SERPER_API_BASE", "https://google.serper.dev").rstrip("/")
+IMAGE_CANDIDATES = int(os.getenv("IMAGE_CANDIDATES", "5"))                  # top K Serper results raced
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "8"))    # per candidate, seconds
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(8 * 1024 * 1024)))   # Telegram photos cap at 10 MB
+IMAGE_MIN_SIDE = int(os.getenv("IMAGE_MIN_SIDE", "400"))
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "8000"))
+# Some hosts refuse clients without a browser-ish User-Agent
+DOWNLOAD_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; LinketronBot/1.0)"}
+
+
+def _check_image(head):
+    """Streaming check for http_client.download: type + dimensions from the header bytes only."""
+    info = probe(head)
+    if info:
+        _, width, height = info
+        if min(width, height) < IMAGE_MIN_SIDE or max(width, height) > IMAGE_MAX_SIDE:
+            raise ValueError(f"{width}x{height} is outside {IMAGE_MIN_SIDE}-{IMAGE_MAX_SIDE}px")
+    return info
+
+def _listed_too_small(item):
+    # Serper reports dimensions; skip obvious thumbnails before spending a download on them.
+    width, height = item.get("imageWidth") or 0, item.get("imageHeight") or 0
+    return bool(width and height) and min(width, height) < IMAGE_MIN_SIDE
+
+@traced("image.download_candidate")
+async def _download_candidate(image_url):
+    response, info = await http_client.download(
+        image_url, max_bytes=IMAGE_MAX_BYTES, timeout=IMAGE_DOWNLOAD_TIMEOUT,
+        headers=DOWNLOAD_HEADERS, inspect=_check_image
+    )
+    if info is None:
+        raise ValueError("Not a recognisable image")
+    mime_type, width, height = info
+    print(f"🖼️ Image Finder: {width}x{height} {mime_type} from {image_url[:80]}")
+    return response.content, mime_type
 
-genai.configure(api_key=GEMINI_KEY)
+async def download_first_valid(image_urls):
+    """Races the downloads; the first image that passes every check wins, the rest are cancelled."""
+    tasks = [asyncio.create_task(_download_candidate(u)) for u in image_urls]
+    return await first_successful(tasks)
 
-def get_image_from_web(post_text):
+@traced("image.web_search")
+async def get_image_from_web(post_text):
     """
     1. Asks Gemini for a search keyword based on the post.
     2. Searches Google Images via Serper.
-    3. Returns the Image URL.
+    3. Downloads the top candidates in parallel.
+    Returns (image_bytes, mime_type, search_query), or (None, None, search_query).
     """
     print("🌍 Image Finder: Analyzing post for visuals...")
 
     # --- SUB-STEP 1: GET THE SEARCH TERM ---
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash') # Or 2.5/1.5
         prompt = (
             f"Read this LinkedIn post and give me ONE distinct, concrete, physical object "
             f"that represents the concept. Output ONLY the search query. "
@@ -29,8 +70,8 @@ def get_image_from_web(post_text):
             f"Example: 'Server room blue lighting' or 'Handshake business close up'.\n\n"
             f"POST: {post_text[:500]}"
         )
-        response = model.generate_content(prompt)
-        search_query = response.text.strip()
+        response_text = await generate_text(get_model("image_query"), prompt, cache=True)
+        search_query = response_text.strip()
         print(f"🔍 Search Query: '{search_query}'")
 
     except Exception as e:
@@ -38,7 +79,7 @@ def get_image_from_web(post_text):
         search_query = "Business technology professional" # Fallback
 
     # --- SUB-STEP 2: GOOGLE SEARCH ---
-    url = "https://google.serper.dev/images"
+    url = f"{SERPER_API_BASE}/images"
     payload = json.dumps({"q": search_query})
     headers = {
         'X-API-KEY': SERPER_KEY,
@@ -46,16 +87,21 @@ def get_image_from_web(post_text):
     }
 
     try:
-        response = requests.post(url, headers=headers, data=payload)
+        response = await http_client.post(url, headers=headers, data=payload)
         results = response.json()
-        
-        # Grab the first image
-        if "images" in results and len(results["images"]) > 0:
-            image_url = results["images"][0]["imageUrl"]
-            return image_url, search_query
-        else:
-            return None, search_query
-
     except Exception as e:
         print(f"❌ Search Error: {e}")
-        return None, search_query
\ No newline at end of file
+        return None, None, search_query
+
+    # --- SUB-STEP 3: RACE THE TOP CANDIDATES ---
+    items = [i for i in results.get("images", []) if i.get("imageUrl") and not _listed_too_small(i)]
+    image_urls = [i["imageUrl"] for i in items[:IMAGE_CANDIDATES]]
+    if not image_urls:
+        return None, None, search_query
+
+    try:
+        image_bytes, mime_type = await download_first_valid(image_urls)
+        return image_bytes, mime_type, search_query
+    except Exception as e:
+        print(f"❌ Image Download Error: all {len(image_urls)} candidates failed, last: {e}")
+        return None, None, search_query
\ No newline at end of file
@@ -1,14 +1,9 @@
-import os
-from google import genai
-from google.genai import types
-from PIL import Image
-from io import BytesIO
-from dotenv import load_dotenv
+import config  # noqa: F401  (loads .env once)
+from services.llm import generate_genai_text
+from services.models import get_client, model_name
+from services.tracing import span, traced
+from services.concurrency import Cancelled, CancelToken
 
-load_dotenv()
-
-GEMINI_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_KEY)
 
 # --- 1. THE DIRECTOR (Logic) ---
 DIRECTOR_PROMPT = """
@@ -37,54 +32,61 @@ BACKGROUND: Deep matte black with a very subtle, faint technical grid pattern.
 COMPOSITION: High contrast, sleek, minimalist. No text.
 """
 
-# ... (imports remain the same)
-
-# UPDATE THE FUNCTION SIGNATURE to accept user_id
-def generate_ai_image(post_text, user_id):
+@traced("image.generate")
+async def generate_ai_image(post_text, cancel=None):
+    """
+    Returns (image_bytes, mime_type, subject) on success, (None, None, reason) on failure.
+    The bytes go straight into the caller's media workspace; nothing touches the disk.
+    Raises Cancelled when `cancel` fires: before the Director, before the Artist, or mid-render.
+    """
     print("🎨 AI Artist: Starting generation pipeline...")
+    cancel = cancel or CancelToken()
 
     try:
+        cancel.check()
         # --- PHASE 1: THE DIRECTOR ---
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=DIRECTOR_PROMPT.format(post_text=post_text[:1000])
+        director_text = await generate_genai_text(
+            get_client(),
+            model_name("director"),
+            DIRECTOR_PROMPT.format(post_text=post_text[:1000]),
+            cache=True
         )
-        object_description = response.text.strip()
+        object_description = director_text.strip()
         print(f"🎨 Director Selected: '{object_description}'")
 
         # --- PHASE 2: THE ARTIST ---
+        cancel.check()
         final_prompt = ARTIST_PROMPT_TEMPLATE.format(subject_desc=object_description)
+        from google.genai import types  # loaded with the client, not at bot startup
         
-        image_response = client.models.generate_content(
-            model='gemini-2.5-flash-image', 
-            contents=final_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["IMAGE"],
-                safety_settings=[
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        threshold="BLOCK_ONLY_HIGH"
-                    )
-                ]
-            )
-        )
+        with span("gemini.image", provider="gemini", model=model_name("artist"), prompt_chars=len(final_prompt)):
+            image_response = await cancel.guard(get_client().aio.models.generate_content(
+                model=model_name("artist"), 
+                contents=final_prompt,
+                config=types.GenerateContentConfig(
+                    response_modalities=["IMAGE"],
+                    safety_settings=[
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                            threshold="BLOCK_ONLY_HIGH"
+                        )
+                    ]
+                )
+            ))
 
         for part in image_response.candidates[0].content.parts:
             if part.inline_data:
                 image_bytes = part.inline_data.data
+                mime_type = part.inline_data.mime_type or "image/png"
                 
-                # FIX: Use dynamic filename based on user_id
-                image_path = f"temp_image_{user_id}.png"
-                
-                image = Image.open(BytesIO(image_bytes))
-                image.save(image_path)
-                
-                print(f"✅ Image Generated and Saved to {image_path}.")
-                return image_path, object_description
+                print(f"✅ Image Generated ({len(image_bytes)} bytes, {mime_type}).")
+                return image_bytes, mime_type, object_description
 
         print("❌ No image data found in response.")
-        return None, "Model refused to generate image."
+        return None, None, "Model refused to generate image."
 
+    except Cancelled:
+        raise
     except Exception as e:
         print(f"❌ Generation Error: {e}")
-        return None, str(e)
\ No newline at end of file
+        return None, None, str(e)
\ No newline at end of file
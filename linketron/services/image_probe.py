@@ -0,0 +1,77 @@
+# services/image_probe.py
+import struct
+
+
+class NotAnImage(ValueError):
+    pass
+
+
+def _png(head):
+    if len(head) < 24:
+        return None
+    width, height = struct.unpack(">II", head[16:24])
+    return "image/png", width, height
+
+def _gif(head):
+    if len(head) < 10:
+        return None
+    width, height = struct.unpack("<HH", head[6:10])
+    return "image/gif", width, height
+
+def _webp(head):
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return "image/webp", width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return "image/webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return "image/webp", width, height
+    raise NotAnImage(f"Unknown WebP chunk {chunk!r}")
+
+# Start-of-frame markers carry the dimensions (C4, C8 and CC are not frames).
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def _jpeg(head):
+    # Walk the marker segments (EXIF, ICC...) until a start-of-frame shows up.
+    i = 2
+    while i + 4 <= len(head):
+        if head[i] != 0xFF:
+            raise NotAnImage("Corrupt JPEG marker")
+        marker = head[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        length = struct.unpack(">H", head[i + 2:i + 4])[0]
+        if marker in _JPEG_SOF:
+            if i + 9 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[i + 5:i + 9])
+            return "image/jpeg", width, height
+        i += 2 + length
+    return None
+
+
+def probe(head):
+    """
+    Reads the image type and dimensions from the first bytes of a file, without decoding pixels.
+    Covers what Serper usually returns: JPEG, PNG, GIF and WebP.
+    Returns (mime_type, width, height) once `head` is long enough, None if more bytes are needed.
+    Raises NotAnImage when the bytes clearly aren't a supported image (HTML error pages, SVG...).
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _png(head)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return _gif(head)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _webp(head)
+    if head[:3] == b"\xff\xd8\xff":
+        return _jpeg(head)
+    if len(head) >= 12:
+        raise NotAnImage("Unrecognised image signature")
+    return None
@@ -1,12 +1,39 @@
 import os
-import requests
 import json
-from dotenv import load_dotenv
+import asyncio
+import aiohttp
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services import http_client
 
-load_dotenv()
+# Point at a local stand-in for load/failure tests (see benchmarks/linkedin_stand_in.py)
+LINKEDIN_API_BASE = os.getenv("LINKEDIN_API_BASE", "https://api.linkedin.com").rstrip("/")
 
 # REMOVED: Global ACCESS_TOKEN and USER_URN variables as they are now user-specific
 
+class LinkedInError(Exception):
+    """A failed LinkedIn step ("register", "upload" or "create"). `status_code` is None for network errors."""
+
+    def __init__(self, step, status_code, message):
+        self.step = step
+        self.status_code = status_code
+        super().__init__(f"{step} failed ({status_code or 'network'}): {message[:300]}")
+
+    @property
+    def retryable(self):
+        if self.status_code == 429:
+            return True
+        # A 5xx or dropped connection on create may already have made the post: never repeat it.
+        if self.step == "create":
+            return False
+        return self.status_code is None or self.status_code >= 500
+
+async def _send(step, method, url, **kwargs):
+    try:
+        return await http_client.request(method, url, **kwargs)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise LinkedInError(step, None, f"{type(e).__name__}: {e}")
+
 def get_headers(token):
     """Generates headers using the specific user's token."""
     return {
@@ -15,12 +42,12 @@ def get_headers(token):
         "X-Restli-Protocol-Version": "2.0.0"
     }
 
-def register_upload(token, urn):
+async def register_upload(token, urn):
     """
     Step 1: Ask LinkedIn for permission to upload an image using user-specific credentials.
     Returns: upload_url (where to send bytes) and asset_urn (the ID of the image).
     """
-    url = "https://api.linkedin.com/v2/assets?action=registerUpload"
+    url = f"{LINKEDIN_API_BASE}/v2/assets?action=registerUpload"
     
     payload = {
         "registerUploadRequest": {
@@ -33,78 +60,81 @@ def register_upload(token, urn):
         }
     }
     
-    response = requests.post(url, headers=get_headers(token), json=payload)
+    response = await _send("register", "POST", url, headers=get_headers(token), json=payload)
     
     if response.status_code != 200:
-        raise Exception(f"Register Upload Failed: {response.text}")
+        raise LinkedInError("register", response.status_code, response.text)
     
     data = response.json()
     upload_url = data['value']['uploadMechanism']['com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest']['uploadUrl']
     asset = data['value']['asset']
     return upload_url, asset
 
-def publish_to_linkedin(text, image_path, token, urn):
-    """
-    The Official Way:
-    1. If Image: Register -> Upload -> Post with Media
-    2. If Text: Post Text Only
-    Uses token and urn provided for the specific user.
-    """
-    if not token or not urn:
-        return "❌ Error: Missing authentication for this user."
-
-    try:
-        media_category = "NONE"
-        media_content = []
+@traced("linkedin.upload_image")
+async def upload_image(image_bytes, token, urn, image_mime=None):
+    """Register -> Upload. Returns the asset URN to reference in a post."""
+    # 1. Register with user credentials
+    upload_url, asset_urn = await register_upload(token, urn)
+    
+    # 2. Upload Bytes
+    # Use user's token for binary upload authorization
+    headers_upload = {"Authorization": f"Bearer {token}"}
+    if image_mime:
+        headers_upload["Content-Type"] = image_mime
+    response = await _send("upload", "PUT", upload_url, headers=headers_upload, data=image_bytes)
+    if response.status_code >= 400:
+        raise LinkedInError("upload", response.status_code, response.text)
+    return asset_urn
 
-        # --- A. HANDLE IMAGE (3-Step Process) ---
-        if image_path:
-            print(f"📤 Starting Official Image Upload...")
-            
-            # 1. Register with user credentials
-            upload_url, asset_urn = register_upload(token, urn)
-            
-            # 2. Upload Bytes
-            with open(image_path, "rb") as f:
-                # Use user's token for binary upload authorization
-                headers_upload = {"Authorization": f"Bearer {token}"}
-                requests.put(upload_url, headers=headers_upload, data=f)
-            
-            # 3. Prepare Post Data
-            media_category = "IMAGE"
-            media_content = [{
-                "media": asset_urn,
-                "status": "READY",
-                "title": {"attributes": [], "text": "Image"},
-                "description": {"attributes": [], "text": "Uploaded via Linketron"}
-            }]
+@traced("linkedin.create_post")
+async def create_post(text, token, urn, asset_urn=None):
+    """Step 3: the ugcPosts create. Returns the new post's ID."""
+    media_category = "NONE"
+    media_content = []
+    if asset_urn:
+        media_category = "IMAGE"
+        media_content = [{
+            "media": asset_urn,
+            "status": "READY",
+            "title": {"attributes": [], "text": "Image"},
+            "description": {"attributes": [], "text": "Uploaded via Linketron"}
+        }]
 
-        # --- B. CREATE POST (UGC API) ---
-        post_url = "https://api.linkedin.com/v2/ugcPosts"
-        
-        payload = {
-            "author": f"urn:li:person:{urn}",
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": media_category,
-                    "media": media_content
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC" 
+    post_url = f"{LINKEDIN_API_BASE}/v2/ugcPosts"
+    
+    payload = {
+        "author": f"urn:li:person:{urn}",
+        "lifecycleState": "PUBLISHED",
+        "specificContent": {
+            "com.linkedin.ugc.ShareContent": {
+                "shareCommentary": {"text": text},
+                "shareMediaCategory": media_category,
+                "media": media_content
             }
+        },
+        "visibility": {
+            "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC" 
         }
+    }
 
-        print("🚀 Sending Post to LinkedIn...")
-        response = requests.post(post_url, headers=get_headers(token), json=payload)
-        
-        if response.status_code == 201:
-            post_id = response.json().get("id", "Unknown")
-            return f"✅ **Published Successfully!**\nID: {post_id}"
-        else:
-            return f"❌ LinkedIn API Error: {response.text}"
+    print("🚀 Sending Post to LinkedIn...")
+    # A 5xx, timeout or dropped connection here may already have created the post, so this call
+    # is never repeated in place; a 429 comes back as a retryable LinkedInError for the queue's backoff.
+    response = await _send("create", "POST", post_url, headers=get_headers(token), json=payload, max_retries=0)
+    
+    if response.status_code != 201:
+        raise LinkedInError("create", response.status_code, response.text)
+    return response.json().get("id", "Unknown")
 
-    except Exception as e:
-        return f"⚠️ Publish Failed: {str(e)}"
\ No newline at end of file
+async def publish_post(text, image_bytes, token, urn, image_mime=None, asset_urn=None):
+    """
+    The Official Way:
+    1. If Image: Register -> Upload -> Post with Media
+       (skipped when `asset_urn` was already uploaded ahead of time, see services/asset_uploads.py)
+    2. If Text: Post Text Only
+    Returns the post ID, raises LinkedInError.
+    """
+    if image_bytes and not asset_urn:
+        print(f"📤 Starting Official Image Upload...")
+        asset_urn = await upload_image(image_bytes, token, urn, image_mime)
+    return await create_post(text, token, urn, asset_urn)
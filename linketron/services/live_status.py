@@ -0,0 +1,63 @@
+# services/live_status.py
+import os
+import time
+import asyncio
+import aiohttp
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramRetryAfter
+import config  # noqa: F401  (loads .env once)
+
+# Telegram allows roughly one edit per second per chat; stay under it.
+EDIT_MIN_INTERVAL = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "1.5"))
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+class LiveStatus:
+    """
+    Progressive `edit_text` on one status message.
+    Updates arriving faster than EDIT_MIN_INTERVAL are coalesced: only the latest text is sent.
+    """
+
+    def __init__(self, message, min_interval=EDIT_MIN_INTERVAL):
+        self.message = message
+        self.min_interval = min_interval
+        self._pending = None
+        self._sent = None
+        self._last_edit = 0.0
+        self._flush_task = None
+
+    async def update(self, text):
+        self._pending = text[:TELEGRAM_TEXT_LIMIT]
+        if self._flush_task and not self._flush_task.done():
+            return
+        wait = self._last_edit + self.min_interval - time.monotonic()
+        if wait <= 0:
+            await self._flush()
+        else:
+            self._flush_task = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, delay):
+        await asyncio.sleep(delay)
+        await self._flush()
+
+    async def _flush(self):
+        text = self._pending
+        if not text or text == self._sent:
+            return
+        try:
+            await self.message.edit_text(text)
+            self._sent = text
+        except TelegramRetryAfter as e:
+            # Flood control: push the next edit past the window Telegram asked for.
+            self._last_edit = time.monotonic() + e.retry_after
+            return
+        except TelegramBadRequest:
+            # "message is not modified" or the message was deleted meanwhile
+            pass
+        except (TelegramAPIError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Progress is best-effort: a failed edit must never abort the draft itself.
+            print(f"⚠️ Live Status: edit failed ({type(e).__name__}: {e}), continuing.")
+        self._last_edit = time.monotonic()
+
+    def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
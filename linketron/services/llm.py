@@ -0,0 +1,119 @@
+# services/llm.py
+import json
+import re
+from services.llm_cache import get_cache, cache_key
+from services.tracing import span
+from services.concurrency import SingleFlight
+
+# Cached calls with the same key that are already running (keys are cache keys, so cache=True only)
+_inflight = SingleFlight()
+
+
+def _usable(text, validate):
+    """Only responses the caller can use are cached (or served from the cache)."""
+    if not text:
+        return False
+    if validate is None:
+        return True
+    try:
+        validate(text)
+        return True
+    except Exception as e:
+        print(f"🗃️ LLM Cache: skipping an unusable response ({type(e).__name__}: {e})")
+        return False
+
+async def _call_model(model, prompt, generation_config, on_partial):
+    if on_partial is None:
+        response = await model.generate_content_async(prompt, generation_config=generation_config)
+        return response.text
+
+    response = await model.generate_content_async(prompt, generation_config=generation_config, stream=True)
+    text = ""
+    async for chunk in response:
+        try:
+            piece = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety metadata)
+            continue
+        text += piece
+        on_partial(text)
+    return text
+
+async def _generate(model, prompt, generation_config, on_partial, store, key, validate):
+    with span("gemini.generate", provider="gemini", model=model.model_name,
+              prompt_chars=len(prompt), stream=on_partial is not None) as s:
+        text = await _call_model(model, prompt, generation_config, on_partial)
+        s.set(response_chars=len(text or ""))
+    if store and _usable(text, validate):
+        store.set(key, text)
+    return text
+
+async def generate_text(model, prompt, generation_config=None, on_partial=None, cache=False, validate=None):
+    """
+    One Gemini call through google.generativeai.
+    With `on_partial`, the response is streamed and `on_partial(text_so_far)` fires on every chunk.
+    With `cache=True`, identical (model, prompt, config) calls are answered from the LLM cache,
+    and identical calls still in flight (e.g. a double-tapped button) share one request.
+    Only for calls whose answer should not change between runs (Cleaner, image query, Director):
+    the drafting calls sample, and a cached draft would come back on every regenerate.
+    `validate(text)` should raise for a response the caller can't parse (e.g. `json.loads`);
+    such responses are returned but never cached, so a retry asks the model again.
+    """
+    store = get_cache() if cache else None
+    key = cache_key(model.model_name, prompt, generation_config) if store else None
+    if not store:
+        return await _generate(model, prompt, generation_config, on_partial, None, None, validate)
+
+    hit = store.get(key)
+    if hit is not None and _usable(hit, validate):
+        if on_partial:
+            on_partial(hit)
+        return hit
+
+    joined = _inflight.in_flight(key)
+    text = await _inflight.do(key, _generate, model, prompt, generation_config, on_partial, store, key, validate)
+    if joined and on_partial and text:
+        # The stream went to the first caller; this one sees the finished text.
+        on_partial(text)
+    return text
+
+async def _generate_genai(client, model_name, contents, config, store, key, validate):
+    with span("gemini.generate", provider="gemini", model=model_name, prompt_chars=len(str(contents))) as s:
+        response = await client.aio.models.generate_content(model=model_name, contents=contents, config=config)
+        text = response.text
+        s.set(response_chars=len(text or ""))
+    if store and _usable(text, validate):
+        store.set(key, text)
+    return text
+
+async def generate_genai_text(client, model_name, contents, config=None, cache=False, validate=None):
+    """Same as generate_text, for text calls made through the google.genai client."""
+    store = get_cache() if cache else None
+    key = cache_key(model_name, contents, config) if store else None
+    if not store:
+        return await _generate_genai(client, model_name, contents, config, None, None, validate)
+
+    hit = store.get(key)
+    if hit is not None and _usable(hit, validate):
+        return hit
+    return await _inflight.do(key, _generate_genai, client, model_name, contents, config, store, key, validate)
+
+
+# --- PARTIAL JSON PREVIEW ---
+_TEXT_FIELD = re.compile(r'"text"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+
+def partial_json_field(raw, pattern=_TEXT_FIELD):
+    """
+    Pulls the (possibly unfinished) "text" value out of a streaming JSON object
+    so users can watch the post being written.
+    """
+    match = pattern.search(raw)
+    if not match:
+        return ""
+    value = match.group(1)
+    if value.endswith("\\"):
+        value = value[:-1]
+    try:
+        return json.loads(f'"{value}"')
+    except ValueError:
+        return value.replace("\\n", "\n").replace('\\"', '"')
@@ -0,0 +1,134 @@
+# services/llm_cache.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512"))
+LLM_CACHE_DISK_ITEMS = int(os.getenv("LLM_CACHE_DISK_ITEMS", "20000"))
+
+
+def cache_key(model_name, prompt, config=None):
+    """Content address: same model + prompt + generation config = same key."""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "config": config},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two tiers:
+    - memory: LRU of the hottest responses,
+    - disk: SQLite table that survives restarts, trimmed by last access.
+    Both honour the same TTL.
+    """
+
+    def __init__(self, db_path=LLM_CACHE_DB, ttl=LLM_CACHE_TTL,
+                 memory_items=LLM_CACHE_MEMORY_ITEMS, disk_items=LLM_CACHE_DISK_ITEMS):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache (last_access)")
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if not row:
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self.counters["disk_hits"] += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            self.counters["stores"] += 1
+            if self.counters["stores"] % 100 == 0:
+                self._trim_disk(now)
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _trim_disk(self, now):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_items,)
+        )
+
+    def stats(self):
+        c = self.counters
+        lookups = c["memory_hits"] + c["disk_hits"] + c["misses"]
+        hit_rate = (c["memory_hits"] + c["disk_hits"]) / lookups if lookups else 0.0
+        return {**c, "memory_size": len(self._memory), "hit_rate": hit_rate}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+
+def get_cache():
+    """Shared cache, opened on first use. None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if _cache is None and LLM_CACHE_ENABLED:
+        _cache = LLMCache()
+    return _cache
+
+def format_cache_stats():
+    cache = get_cache()
+    if not cache:
+        return "🗃️ **LLM Cache:** disabled"
+    st = cache.stats()
+    return (
+        f"🗃️ **LLM Cache:** {st['hit_rate']:.0%} hit rate "
+        f"({st['memory_hits']} memory, {st['disk_hits']} disk, {st['misses']} misses, "
+        f"{st['memory_size']} hot entries)"
+    )
@@ -0,0 +1,149 @@
+# services/media_processor.py
+import io
+import os
+import asyncio
+from multiprocessing import context, forkserver, popen_forkserver, reduction, spawn, util
+from concurrent.futures import ProcessPoolExecutor
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+
+# --- CONFIGURATION ---
+# LinkedIn's feed renders images at most 1200px wide; 1200x1500 keeps 4:5 portraits intact.
+MEDIA_MAX_WIDTH = int(os.getenv("MEDIA_MAX_WIDTH", "1200"))
+MEDIA_MAX_HEIGHT = int(os.getenv("MEDIA_MAX_HEIGHT", "1500"))
+MEDIA_FORMAT = os.getenv("MEDIA_FORMAT", "JPEG").upper()         # JPEG | WEBP
+MEDIA_QUALITY = int(os.getenv("MEDIA_QUALITY", "85"))
+MEDIA_MIN_QUALITY = int(os.getenv("MEDIA_MIN_QUALITY", "60"))
+MEDIA_TARGET_BYTES = int(os.getenv("MEDIA_TARGET_BYTES", str(1024 * 1024)))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+_pool = None
+
+
+# --- 1. THE ENCODER (runs inside the worker processes) ---
+def _encode(image_bytes, max_width, max_height, fmt, quality, min_quality, target_bytes):
+    """
+    Decode -> upright (EXIF orientation) -> flatten alpha onto white -> fit the feed box -> re-encode.
+    Nothing from the source's EXIF/ICC/XMP is copied over, so metadata is stripped.
+    Quality steps down by 5 until the file fits `target_bytes` (or hits `min_quality`).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as src:
+        if getattr(src, "is_animated", False):
+            return None
+        img = ImageOps.exif_transpose(src)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_width, max_height), Image.LANCZOS)
+
+        options = {"optimize": True, "progressive": True} if fmt == "JPEG" else {"method": 4}
+        while True:
+            out = io.BytesIO()
+            img.save(out, format=fmt, quality=quality, **options)
+            if out.tell() <= target_bytes or quality <= min_quality:
+                return out.getvalue(), img.size
+            quality -= 5
+
+
+def _ready():
+    return os.getpid()
+
+
+# --- 2. THE WORKER PROCESSES ---
+class _LeanPopen(popen_forkserver.Popen):
+    """
+    popen_forkserver.Popen._launch without the parent's __main__ in the preparation data.
+    The stock one makes every child re-run main.py as __mp_main__ (aiogram import, Bot, SQLite stores)
+    just to unpickle `_encode`, which lives here and is imported by name anyway.
+    """
+    def _launch(self, process_obj):
+        prep_data = spawn.get_preparation_data(process_obj._name)
+        prep_data.pop("init_main_from_name", None)
+        prep_data.pop("init_main_from_path", None)
+        buf = io.BytesIO()
+        context.set_spawning_popen(self)
+        try:
+            reduction.dump(prep_data, buf)
+            reduction.dump(process_obj, buf)
+        finally:
+            context.set_spawning_popen(None)
+
+        self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+        _parent_w = os.dup(w)
+        self.finalizer = util.Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+        with open(w, "wb", closefd=True) as f:
+            f.write(buf.getbuffer())
+        self.pid = forkserver.read_signed(self.sentinel)
+
+
+class _LeanProcess(context.ForkServerProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        return _LeanPopen(process_obj)
+
+
+class _LeanContext(context.ForkServerContext):
+    Process = _LeanProcess
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Workers are forked from a forkserver that has only this module and Pillow loaded:
+        # no inherited sockets, SQLite handles or threads, and no copy of the bot.
+        ctx = _LeanContext()
+        ctx.set_forkserver_preload(["services.media_processor", "PIL.Image", "PIL.ImageOps"])
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=ctx)
+    return _pool
+
+async def warm():
+    """Starts every worker up front, so the first image doesn't wait for a process to boot."""
+    if MEDIA_FORMAT not in MIME_TYPES:
+        return
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(MEDIA_WORKERS)))
+    except Exception as e:
+        print(f"⚠️ Media Processor warm-up failed: {e}")
+
+
+# --- 3. THE STAGE ---
+
+@traced("media.normalize")
+async def normalize_image(image_bytes, mime_type=None):
+    """
+    Returns (bytes, mime_type) ready for LinkedIn. On any failure (or for animated GIFs)
+    the original bytes come back untouched, so publishing never breaks because of this step.
+    """
+    if MEDIA_FORMAT not in MIME_TYPES:
+        return image_bytes, mime_type
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            _get_pool(), _encode, image_bytes, MEDIA_MAX_WIDTH, MEDIA_MAX_HEIGHT,
+            MEDIA_FORMAT, MEDIA_QUALITY, MEDIA_MIN_QUALITY, MEDIA_TARGET_BYTES
+        )
+    except Exception as e:
+        print(f"❌ Media Processor Error: {e}")
+        return image_bytes, mime_type
+
+    if result is None:
+        return image_bytes, mime_type
+    encoded, (width, height) = result
+    print(f"🗜️ Media Processor: {len(image_bytes) // 1024} KB -> {len(encoded) // 1024} KB ({width}x{height} {MEDIA_FORMAT})")
+    return encoded, MIME_TYPES[MEDIA_FORMAT]
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,100 @@
+# services/media_workspace.py
+import os
+import time
+import uuid
+import asyncio
+import threading
+import tempfile
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+MEDIA_TTL_SECONDS = float(os.getenv("MEDIA_TTL_SECONDS", "3600"))
+MEDIA_SPOOL_MAX_BYTES = int(os.getenv("MEDIA_SPOOL_MAX_BYTES", str(2 * 1024 * 1024)))
+MEDIA_GC_INTERVAL = float(os.getenv("MEDIA_GC_INTERVAL", "60"))
+
+
+def new_draft_id():
+    """Every draft gets its own ID so its media never mixes with another draft's."""
+    return uuid.uuid4().hex[:12]
+
+
+class MediaItem:
+    """
+    One image attached to one draft.
+    Small images stay in memory; big ones roll over to a private temp file.
+    """
+
+    def __init__(self, data, content_type, source):
+        self.content_type = content_type
+        self.source = source
+        self.size = len(data)
+        self.expires_at = time.monotonic() + MEDIA_TTL_SECONDS
+        self._spool = tempfile.SpooledTemporaryFile(max_size=MEDIA_SPOOL_MAX_BYTES)
+        self._spool.write(data)
+
+    def read(self):
+        self._spool.seek(0)
+        return self._spool.read()
+
+    def close(self):
+        self._spool.close()
+
+
+class MediaWorkspace:
+    """Media keyed by (user_id, draft_id), garbage-collected on a TTL."""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def put(self, user_id, draft_id, data, content_type="image/png", source=""):
+        item = MediaItem(data, content_type, source)
+        with self._lock:
+            old = self._items.pop((str(user_id), draft_id), None)
+            self._items[(str(user_id), draft_id)] = item
+        if old:
+            old.close()
+        return item
+
+    def get(self, user_id, draft_id):
+        with self._lock:
+            item = self._items.get((str(user_id), draft_id))
+        if not item or item.expires_at < time.monotonic():
+            return None
+        return item
+
+    def get_bytes(self, user_id, draft_id):
+        item = self.get(user_id, draft_id)
+        return item.read() if item else None
+
+    def discard(self, user_id, draft_id):
+        with self._lock:
+            item = self._items.pop((str(user_id), draft_id), None)
+        if item:
+            item.close()
+
+    def discard_user(self, user_id):
+        with self._lock:
+            keys = [key for key in self._items if key[0] == str(user_id)]
+            items = [self._items.pop(key) for key in keys]
+        for item in items:
+            item.close()
+
+    def gc(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, item in self._items.items() if item.expires_at < now]
+            items = [self._items.pop(key) for key in expired]
+        for item in items:
+            item.close()
+        return len(items)
+
+    async def run_gc(self, interval=MEDIA_GC_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.gc()
+            if removed:
+                print(f"🧹 Media Workspace: expired {removed} draft images.")
+
+
+workspace = MediaWorkspace()
@@ -0,0 +1,62 @@
+# services/models.py
+import os
+import time
+from config import MODEL_DEFAULTS
+
+# The Gemini SDKs are slow to import, so nothing here touches them until a model
+# is actually needed (or warm() preloads them in the background after startup).
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if not GEMINI_API_KEY:
+    print("❌ CRITICAL ERROR: GEMINI_API_KEY not found in .env file!")
+
+# Resolved once: MODEL_<ROLE> from .env wins over config.MODEL_DEFAULTS.
+MODEL_NAMES = {role: os.getenv(f"MODEL_{role.upper()}", name) for role, name in MODEL_DEFAULTS.items()}
+
+_configured = False
+_models = {}
+_client = None
+_model_factory = None
+
+
+def model_name(role):
+    return MODEL_NAMES[role]
+
+def get_model(role):
+    """Shared google.generativeai model for a role, built on first use and reused afterwards."""
+    global _configured
+    if role not in _models and _model_factory is not None:
+        _models[role] = _model_factory(MODEL_NAMES[role])
+    if role not in _models:
+        import google.generativeai as legacy_genai
+        if not _configured:
+            legacy_genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
+        _models[role] = legacy_genai.GenerativeModel(MODEL_NAMES[role])
+    return _models[role]
+
+def get_client():
+    """Shared google.genai client (image Director/Artist)."""
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+def use_backend(model_factory, client):
+    """
+    Swaps both SDKs for objects with the same call surface: `model_factory(name)` stands in for
+    GenerativeModel, `client` for genai.Client. benchmarks/harness.py points them at local stand-ins.
+    """
+    global _model_factory, _client
+    _model_factory = model_factory
+    _client = client
+    _models.clear()
+
+def warm(roles=("essay", "cleaner", "fused")):
+    """Imports both SDKs and builds the hot-path models. Blocking: run it in a thread."""
+    started = time.perf_counter()
+    for role in roles:
+        get_model(role)
+    get_client()
+    print(f"🔥 Models: SDKs warmed in {time.perf_counter() - started:.2f}s.")
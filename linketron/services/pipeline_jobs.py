@@ -0,0 +1,40 @@
+# services/pipeline_jobs.py
+from services.concurrency import CancelToken
+
+
+class PipelineJobs:
+    """
+    At most one live pipeline job (voice/text draft, research, AI image) per user.
+    Starting a new job, or tapping Cancel / Back / /start, cancels the previous token,
+    so a superseded job stops at its next checkpoint instead of paying for every
+    remaining Gemini/Groq call and writing its result into stale FSM state.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self.cancelled = 0
+
+    def start(self, user_id, kind):
+        self.cancel(user_id, reason=f"superseded by {kind}")
+        token = CancelToken(kind)
+        self._tokens[user_id] = token
+        return token
+
+    def finish(self, user_id, token):
+        if self._tokens.get(user_id) is token:
+            del self._tokens[user_id]
+
+    def cancel(self, user_id, reason="cancelled"):
+        token = self._tokens.pop(user_id, None)
+        if token is None or token.cancelled:
+            return False
+        token.cancel(reason)
+        self.cancelled += 1
+        print(f"🛑 Pipeline Jobs: {token.kind} for {user_id} {reason}.")
+        return True
+
+    def stats(self):
+        return {"running": len(self._tokens), "cancelled": self.cancelled}
+
+
+pipeline_jobs = PipelineJobs()
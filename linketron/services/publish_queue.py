@@ -0,0 +1,320 @@
+# services/publish_queue.py
+import os
+import time
+import random
+import secrets
+import sqlite3
+import asyncio
+import threading
+import config  # noqa: F401  (loads .env once)
+from services.stages import stage, StageBusy
+from services.linkedin_publisher import LinkedInError, upload_image, create_post
+
+# --- CONFIGURATION ---
+PUBLISH_DB = os.getenv("PUBLISH_DB", "publish_queue.db")
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "4"))
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "6"))
+PUBLISH_BACKOFF_BASE = float(os.getenv("PUBLISH_BACKOFF_BASE", "5"))
+PUBLISH_BACKOFF_MAX = float(os.getenv("PUBLISH_BACKOFF_MAX", "600"))
+PUBLISH_LEASE_SECONDS = float(os.getenv("PUBLISH_LEASE_SECONDS", "300"))
+PUBLISH_POLL_INTERVAL = float(os.getenv("PUBLISH_POLL_INTERVAL", "2"))
+
+# [scheduled ->] queued -> running -> done | retry (-> running ...) | failed;  scheduled -> cancelled
+ACTIVE_STATUSES = ("scheduled", "queued", "running", "retry")
+
+_COLUMNS = (
+    "id", "idempotency_key", "user_id", "chat_id", "status_message_id", "text",
+    "image", "image_mime", "asset_urn", "status", "attempts", "result", "create_sent_at", "lease_owner"
+)
+
+
+def idempotency_key(user_id, draft_id):
+    """One LinkedIn post per draft, however many times Publish is tapped."""
+    return f"{user_id}:{draft_id}"
+
+def backoff_delay(attempts):
+    delay = min(PUBLISH_BACKOFF_BASE * (2 ** (attempts - 1)), PUBLISH_BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+
+class LeaseLost(Exception):
+    """The job's lease ran out and another worker may have claimed it: stop touching it."""
+
+
+class PublishQueue:
+    """
+    Durable publish jobs in SQLite (WAL), shared by every bot process on the host.
+    - A job is claimed with a lease, so a crashed worker's job is picked up again later.
+      The lease is renewed between steps, and every write that moves the job forward checks
+      `lease_owner`, so a worker that lost its lease stops instead of posting twice.
+    - The uploaded asset URN is saved before the post is created: retries never re-upload.
+    - `create_sent_at` is saved before the create call. A job whose lease runs out after that
+      may already be on LinkedIn, so it fails with a "check your feed" note instead of re-running.
+    - `notify(job, text)` reports progress back to the chat.
+    """
+
+    def __init__(self, db_path=PUBLISH_DB, get_credentials=None, notify=None):
+        self.get_credentials = get_credentials
+        self.notify = notify
+        self._wakeup = asyncio.Event()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS publish_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " idempotency_key TEXT NOT NULL UNIQUE,"
+            " user_id TEXT NOT NULL,"
+            " chat_id INTEGER NOT NULL,"
+            " status_message_id INTEGER,"
+            " text TEXT NOT NULL,"
+            " image BLOB,"
+            " image_mime TEXT,"
+            " asset_urn TEXT,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " lease_until REAL,"
+            " lease_owner TEXT,"
+            " result TEXT,"
+            " create_sent_at REAL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(publish_jobs)")}
+        if "create_sent_at" not in columns:
+            self._conn.execute("ALTER TABLE publish_jobs ADD COLUMN create_sent_at REAL")
+        if "lease_owner" not in columns:
+            self._conn.execute("ALTER TABLE publish_jobs ADD COLUMN lease_owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS publish_jobs_due ON publish_jobs (status, next_attempt_at)")
+
+    # --- 1. PRODUCER SIDE ---
+    def enqueue(self, key, user_id, chat_id, text, image=None, image_mime=None, asset_urn=None,
+                status_message_id=None, run_at=None):
+        """
+        Returns (job, created). A second tap on the same draft gets the existing job back
+        (created=False) unless that job failed or was cancelled, in which case it is re-armed.
+        With a future `run_at` the job waits as "scheduled" until the scheduler releases it.
+        """
+        now = time.time()
+        status = "scheduled" if run_at and run_at > now else "queued"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._get_by_key(key)
+                if existing and existing["status"] not in ("failed", "cancelled"):
+                    self._conn.execute("COMMIT")
+                    return existing, False
+                self._conn.execute(
+                    "INSERT INTO publish_jobs (idempotency_key, user_id, chat_id, status_message_id, text,"
+                    " image, image_mime, asset_urn, status, attempts, next_attempt_at, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)"
+                    " ON CONFLICT(idempotency_key) DO UPDATE SET"
+                    " chat_id = excluded.chat_id, status_message_id = excluded.status_message_id,"
+                    " text = excluded.text, image = excluded.image, image_mime = excluded.image_mime,"
+                    " asset_urn = excluded.asset_urn, status = excluded.status, attempts = 0, result = NULL,"
+                    " create_sent_at = NULL, lease_until = NULL, lease_owner = NULL, next_attempt_at = excluded.next_attempt_at,"
+                    " updated_at = excluded.updated_at",
+                    (key, str(user_id), chat_id, status_message_id, text, image, image_mime, asset_urn,
+                     status, run_at or now, now, now)
+                )
+                job = self._get_by_key(key)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if status == "queued":
+            self._wakeup.set()
+        return job, True
+
+    # --- 1B. SCHEDULED JOBS ---
+    def release(self, key, now=None):
+        """Moves a due scheduled job into the queue. False if it was cancelled, re-timed or already released."""
+        now = now or time.time()
+        with self._lock:
+            released = self._conn.execute(
+                "UPDATE publish_jobs SET status = 'queued', updated_at = ?"
+                " WHERE idempotency_key = ? AND status = 'scheduled' AND next_attempt_at <= ?",
+                (now, key, now)
+            ).rowcount
+        if released:
+            self._wakeup.set()
+        return bool(released)
+
+    def cancel_scheduled(self, job_id, user_id):
+        with self._lock:
+            return bool(self._conn.execute(
+                "UPDATE publish_jobs SET status = 'cancelled', image = NULL, updated_at = ?"
+                " WHERE id = ? AND user_id = ? AND status = 'scheduled'",
+                (time.time(), job_id, str(user_id))
+            ).rowcount)
+
+    def scheduled(self, user_id=None):
+        """Pending scheduled jobs as dicts (id, idempotency_key, run_at, text), soonest first."""
+        query = ("SELECT id, idempotency_key, next_attempt_at, text FROM publish_jobs"
+                 " WHERE status = 'scheduled'")
+        params = []
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(str(user_id))
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY next_attempt_at", params).fetchall()
+        return [dict(zip(("id", "idempotency_key", "run_at", "text"), row)) for row in rows]
+
+    def get(self, key):
+        with self._lock:
+            return self._get_by_key(key)
+
+    def _get_by_key(self, key):
+        row = self._conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM publish_jobs WHERE idempotency_key = ?", (key,)
+        ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    # --- 2. WORKER SIDE ---
+    def _claim(self):
+        """
+        Atomically leases the next due job (also across processes). None when nothing is due.
+        An expired lease whose create call was already sent is failed here instead (job["orphaned"]).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM publish_jobs"
+                    " WHERE (status IN ('queued', 'retry') AND next_attempt_at <= ?)"
+                    " OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY next_attempt_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                job = dict(zip(_COLUMNS, row)) if row else None
+                if job and job["status"] == "running" and job["create_sent_at"]:
+                    job["orphaned"] = True
+                    self._conn.execute(
+                        "UPDATE publish_jobs SET status = 'failed', result = ?, lease_until = NULL, image = NULL,"
+                        " updated_at = ? WHERE id = ?",
+                        ("Interrupted after the create call was sent", now, job["id"])
+                    )
+                elif job:
+                    job["lease_owner"] = secrets.token_hex(8)
+                    self._conn.execute(
+                        "UPDATE publish_jobs SET status = 'running', attempts = attempts + 1,"
+                        " lease_until = ?, lease_owner = ?, updated_at = ? WHERE id = ?",
+                        (now + PUBLISH_LEASE_SECONDS, job["lease_owner"], now, job["id"])
+                    )
+                    job["attempts"] += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE publish_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _renew(self, job, **fields):
+        """
+        Extends the lease (and writes `fields`) only while this worker still holds it.
+        Raises LeaseLost otherwise: the job may already be running somewhere else.
+        """
+        now = time.time()
+        fields.update(lease_until=now + PUBLISH_LEASE_SECONDS, updated_at=now)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            renewed = self._conn.execute(
+                f"UPDATE publish_jobs SET {assignments} WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (*fields.values(), job["id"], job["lease_owner"])
+            ).rowcount
+        if not renewed:
+            raise LeaseLost(f"Lease on publish job {job['id']} was lost")
+
+    async def _notify(self, job, text):
+        if self.notify:
+            try:
+                await self.notify(job, text)
+            except Exception as e:
+                print(f"❌ Publish Queue Notify Error: {e}")
+
+    async def _run_job(self, job):
+        creds = self.get_credentials(job["user_id"]) if self.get_credentials else None
+        if not creds:
+            self._update(job["id"], status="failed", result="No LinkedIn credentials", lease_until=None)
+            await self._notify(job, "❌ **Publish failed:** LinkedIn is not connected. Log in again via /start.")
+            return
+
+        try:
+            async with stage("publish").slot():
+                # The wait for a slot counts against the lease too.
+                self._renew(job)
+                if job["image"] and not job["asset_urn"]:
+                    job["asset_urn"] = await upload_image(
+                        job["image"], creds["access_token"], creds["user_urn"], job["image_mime"]
+                    )
+                    # Saved before the create call: a retry goes straight to the post.
+                    self._renew(job, asset_urn=job["asset_urn"], image=None)
+                # From here on the post may exist even if this worker never hears back.
+                self._renew(job, create_sent_at=time.time())
+                post_id = await create_post(job["text"], creds["access_token"], creds["user_urn"], job["asset_urn"])
+        except LeaseLost as e:
+            print(f"⚠️ Publish Queue: {e}, leaving it to its new owner.")
+            return
+        except Exception as e:
+            retryable = isinstance(e, StageBusy) or (isinstance(e, LinkedInError) and e.retryable)
+            if retryable and job["attempts"] < PUBLISH_MAX_ATTEMPTS:
+                delay = backoff_delay(job["attempts"])
+                # Retryable means the publish stage was full, LinkedIn answered (429)
+                # or the create was never reached.
+                self._update(job["id"], status="retry", result=str(e), lease_until=None, create_sent_at=None,
+                             next_attempt_at=time.time() + delay)
+                busy = "Publishing" if isinstance(e, StageBusy) else "LinkedIn"
+                await self._notify(job, f"⏳ **{busy} is busy.** Retrying in {delay:.0f}s (attempt {job['attempts']}/{PUBLISH_MAX_ATTEMPTS})...")
+            else:
+                self._update(job["id"], status="failed", result=str(e), lease_until=None)
+                hint = "\nThe post may still have gone through, check your feed before retrying." \
+                    if isinstance(e, LinkedInError) and e.step == "create" and not e.retryable else ""
+                await self._notify(job, f"❌ **Publish failed:** {e}{hint}")
+            return
+
+        self._update(job["id"], status="done", result=post_id, lease_until=None, image=None)
+        await self._notify(job, f"✅ **Published Successfully!**\nID: {post_id}")
+
+    async def worker(self, index):
+        while not self._closed:
+            job = self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), PUBLISH_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if job.get("orphaned"):
+                await self._notify(job, "❌ **Publish interrupted** after the post was sent to LinkedIn.\n"
+                                        "It has probably gone through: check your feed before publishing again.")
+                continue
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                print(f"❌ Publish Worker #{index} Error: {e}")
+
+    async def run(self, workers=PUBLISH_WORKERS):
+        await asyncio.gather(*(self.worker(i) for i in range(workers)))
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM publish_jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Idle workers exit on their next poll; a job still in flight is re-claimed after its lease."""
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+        self._wakeup.set()
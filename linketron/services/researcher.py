@@ -1,20 +1,21 @@
 import os
-import requests
 import json
 import re  # <--- NEW: For robust JSON cleaning
 import logging
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services import http_client
+from services.concurrency import first_successful, Cancelled, CancelToken
+from services.llm import generate_text
+from services.models import get_model, model_name
 
 # --- CONFIGURATION ---
 PERPLEXITY_KEY = os.getenv("PERPLEXITY_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
-
-genai.configure(api_key=GEMINI_API_KEY)
-# Using Flash for speed on the "Angle Generation"
-model = genai.GenerativeModel('gemini-2.5-flash') 
+PERPLEXITY_API_BASE = os.getenv("PERPLEXITY_API_BASE", "https://api.perplexity.ai").rstrip("/")
+# Parallel angle -> search chains per briefing ("first" = fastest valid wins, "rank" = best of all)
+RESEARCH_FANOUT = int(os.getenv("RESEARCH_FANOUT", "3"))
+RESEARCH_STRATEGY = os.getenv("RESEARCH_STRATEGY", "first")
 
 # --- 1. DEFINITIONS ---
 BUCKET_DEFINITIONS = {
@@ -49,19 +50,98 @@ OUTPUT FORMAT (JSON ONLY):
 
 # --- 3. HELPER FUNCTIONS ---
 
-def generate_search_angle(base_topic):
-    prompt = f"Give me a specific, unique, non-obvious search angle for: '{base_topic}'. Output just the angle phrase."
+# Each fan-out slot asks for a different kind of angle so parallel candidates don't collapse into one.
+ANGLE_FLAVOURS = [
+    "non-obvious",
+    "contrarian",
+    "data-driven",
+    "recent-news",
+    "historical",
+]
+
+REQUIRED_FIELDS = ("headline_fact", "subject_name", "viral_angle")
+
+
+@traced("research.angle")
+async def generate_search_angle(base_topic, flavour="non-obvious"):
+    prompt = f"Give me a specific, unique, {flavour} search angle for: '{base_topic}'. Output just the angle phrase."
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        # Not cached on purpose: every click should find a new angle.
+        response_text = await generate_text(get_model("angle"), prompt)
+        return response_text.strip()
     except:
         return "focus on recent trends"
 
-def search_perplexity(lens_key, custom_topic=None):
+def is_well_formed(data):
+    """A briefing the card can actually show: every headline field present and non-empty."""
+    return isinstance(data, dict) and all(isinstance(data.get(f), str) and data[f].strip() for f in REQUIRED_FIELDS)
+
+def score_briefing(data):
+    """Rough richness score used by the "rank" strategy: filled fields, proof points, hard numbers."""
+    filled = sum(1 for v in data.values() if v)
+    proofs = len(data.get("proof_points") or [])
+    numbers = len(re.findall(r"\d", data.get("headline_fact", "")))
+    return filled + proofs + min(numbers, 5)
+
+@traced("research.candidate")
+async def _research_candidate(lens_name, base_context, flavour):
+    """One fan-out slot: its own angle, then its own Perplexity search. Raises on any failure."""
+    angle = await generate_search_angle(base_context, flavour)
+    full_context = f"{base_context}. {angle}."
+
+    url = f"{PERPLEXITY_API_BASE}/chat/completions"
+    formatted_prompt = RESEARCH_PROMPT_TEMPLATE.format(lens_name=lens_name, lens_context=full_context)
+    
+    payload = {
+        "model": model_name("research"), 
+        "messages": [
+            {"role": "system", "content": "You are a helpful research assistant. You answer ONLY in valid JSON format."},
+            {"role": "user", "content": formatted_prompt}
+        ],
+        "temperature": 0.2
+    }
+    headers = {"Authorization": f"Bearer {PERPLEXITY_KEY}", "Content-Type": "application/json"}
+
+    response = await http_client.post(url, json=payload, headers=headers)
+    response.raise_for_status()
+    
+    # Cleanup JSON with Regex (Fixes the "None" issue)
+    raw_content = response.json()['choices'][0]['message']['content']
+    
+    # Use regex to find the first '{' and the last '}'
+    json_match = re.search(r'\{.*\}', raw_content, re.DOTALL)
+    if not json_match:
+        raise ValueError("No JSON found in response")
+    parsed_data = json.loads(json_match.group(0))
+    if not is_well_formed(parsed_data):
+        raise ValueError(f"Incomplete briefing (needs {', '.join(REQUIRED_FIELDS)})")
+
+    # Add metadata for the bot
+    parsed_data["meta_lens"] = lens_name
+    parsed_data["meta_angle"] = angle
+    return parsed_data
+
+async def _best_ranked(tasks):
+    """Waits for every candidate and returns the richest valid one."""
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    valid = [r for r in results if not isinstance(r, BaseException)]
+    if not valid:
+        raise results[-1]
+    return max(valid, key=score_briefing)
+
+@traced("research.search")
+async def search_perplexity(lens_key, custom_topic=None, fanout=RESEARCH_FANOUT, strategy=RESEARCH_STRATEGY,
+                            cancel=None):
     """
     The Core Researcher.
+    Fans out `fanout` angle -> search chains at once; each search starts as soon as its own
+    angle is ready. strategy="first" keeps the first well-formed briefing and cancels the rest,
+    strategy="rank" waits for all of them and keeps the richest.
+    A cancelled `cancel` token stops the whole fan-out and raises Cancelled.
     """
-    print(f"🔍 Researcher: Initiating search for '{lens_key}'...")
+    cancel = cancel or CancelToken()
+    cancel.check()
+    print(f"🔍 Researcher: Initiating search for '{lens_key}' ({fanout} candidates, {strategy})...")
 
     # A. Determine Context
     if lens_key == "lens_custom" and custom_topic:
@@ -71,44 +151,18 @@ def search_perplexity(lens_key, custom_topic=None):
         base_context = BUCKET_DEFINITIONS.get(lens_key, "business trends")
         lens_name = lens_key.replace("lens_", "").title().replace("_", " ")
 
-    # B. Generate Infinite Angle
-    angle = generate_search_angle(base_context)
-    full_context = f"{base_context}. {angle}."
-    
-    # C. Prepare Request
-    url = "https://api.perplexity.ai/chat/completions"
-    formatted_prompt = RESEARCH_PROMPT_TEMPLATE.format(lens_name=lens_name, lens_context=full_context)
-    
-    payload = {
-        "model": "sonar-pro", 
-        "messages": [
-            {"role": "system", "content": "You are a helpful research assistant. You answer ONLY in valid JSON format."},
-            {"role": "user", "content": formatted_prompt}
-        ],
-        "temperature": 0.2
-    }
-    headers = {"Authorization": f"Bearer {PERPLEXITY_KEY}", "Content-Type": "application/json"}
+    # B. Fan out: one angle + one search per slot
+    flavours = [ANGLE_FLAVOURS[i % len(ANGLE_FLAVOURS)] for i in range(max(1, fanout))]
+    tasks = [asyncio.create_task(_research_candidate(lens_name, base_context, f)) for f in flavours]
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        # Cleanup JSON with Regex (Fixes the "None" issue)
-        raw_content = response.json()['choices'][0]['message']['content']
-        
-        # Use regex to find the first '{' and the last '}'
-        json_match = re.search(r'\{.*\}', raw_content, re.DOTALL)
-        if json_match:
-            clean_json_text = json_match.group(0)
-            parsed_data = json.loads(clean_json_text)
-        else:
-            raise ValueError("No JSON found in response")
-        
-        # Add metadata for the bot
-        parsed_data["meta_lens"] = lens_name
-        parsed_data["meta_angle"] = angle
-        return parsed_data
-
+        if strategy == "rank":
+            return await cancel.guard(_best_ranked(tasks))
+        return await cancel.guard(first_successful(tasks))
+    except Cancelled:
+        for task in tasks:
+            task.cancel()
+        raise
     except Exception as e:
         print(f"❌ Research Error: {e}")
         return {"headline_fact": "Error", "subject_name": "System Error", "origin_story": str(e), "viral_angle": "N/A"}
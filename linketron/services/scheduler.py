@@ -0,0 +1,107 @@
+# services/scheduler.py
+import os
+import time
+import heapq
+import calendar
+import asyncio
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+# Other bot processes schedule into the same SQLite file; re-read it this often to see their jobs.
+SCHEDULER_RESYNC_SECONDS = float(os.getenv("SCHEDULER_RESYNC_SECONDS", "60"))
+
+
+class PublishScheduler:
+    """
+    One coroutine for every scheduled post: a min-heap of (run_at, key).
+    Adding a job is O(log n), and the loop only wakes for the earliest one (or a new, earlier job).
+    The schedule itself lives in the publish queue's SQLite table, so it survives restarts;
+    due jobs are released into that queue, whose workers publish with bounded concurrency.
+    """
+
+    def __init__(self, queue, resync_interval=SCHEDULER_RESYNC_SECONDS):
+        self.queue = queue
+        self.resync_interval = resync_interval
+        self._heap = []
+        self._due = {}           # key -> run_at of its latest heap entry
+        self._wakeup = asyncio.Event()
+        self.released = 0
+
+    def add(self, key, run_at):
+        self._due[key] = run_at
+        heapq.heappush(self._heap, (run_at, key))
+        if self._heap[0][1] == key:
+            self._wakeup.set()
+
+    def load(self):
+        """Rebuilds the heap from the store (startup and periodic resync)."""
+        for job in self.queue.scheduled():
+            if self._due.get(job["idempotency_key"]) != job["run_at"]:
+                self.add(job["idempotency_key"], job["run_at"])
+        # Entries whose job was cancelled or re-timed are skipped when they surface.
+
+    async def run(self):
+        self.load()
+        last_sync = time.monotonic()
+        while True:
+            if time.monotonic() - last_sync > self.resync_interval:
+                self.load()
+                last_sync = time.monotonic()
+
+            now = time.time()
+            if self._heap and self._heap[0][0] <= now:
+                run_at, key = heapq.heappop(self._heap)
+                if self._due.get(key) == run_at:
+                    del self._due[key]
+                    if self.queue.release(key, now):
+                        self.released += 1
+                continue
+
+            timeout = self.resync_interval
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - now)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {"pending": len(self._due), "released": self.released}
+
+
+# --- WHEN PARSING (all times UTC) ---
+_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+def parse_when(text, now=None):
+    """
+    "in 90m" / "2h" / "1d", "18:30" (next occurrence, UTC) or "2026-03-01 09:00" (UTC).
+    Returns a Unix timestamp in the future, or None if the text isn't understood.
+    """
+    now = now or time.time()
+    raw = (text or "").strip().lower()
+    if raw.startswith("in "):
+        raw = raw[3:].strip()
+
+    if raw[-1:] in _UNITS and raw[:-1].strip().isdigit():
+        amount = int(raw[:-1])
+        return now + amount * _UNITS[raw[-1]] if amount > 0 else None
+
+    for fmt in ("%Y-%m-%d %H:%M", "%H:%M"):
+        try:
+            parsed = time.strptime(raw, fmt)
+        except ValueError:
+            continue
+        if fmt == "%H:%M":
+            today = time.gmtime(now)
+            ts = _timegm(today.tm_year, today.tm_mon, today.tm_mday, parsed.tm_hour, parsed.tm_min)
+            return ts if ts > now else ts + 86400
+        ts = _timegm(parsed.tm_year, parsed.tm_mon, parsed.tm_mday, parsed.tm_hour, parsed.tm_min)
+        return ts if ts > now else None
+    return None
+
+def _timegm(year, month, day, hour, minute):
+    return calendar.timegm((year, month, day, hour, minute, 0, 0, 0, 0))
+
+def format_when(ts):
+    return time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(ts))
@@ -0,0 +1,216 @@
+# services/slop_linter.py
+import os
+import re
+import threading
+import config  # noqa: F401  (loads .env once)
+
+# --- CONFIGURATION ---
+SLOP_PREPASS = os.getenv("SLOP_PREPASS", "1") == "1"
+SLOP_MAX_SCORE = int(os.getenv("SLOP_MAX_SCORE", "0"))      # residual score that still skips the Cleaner
+SLOP_BROETRY_RUN = int(os.getenv("SLOP_BROETRY_RUN", "3"))  # consecutive one-sentence lines that count as broetry
+
+# The Cleaner prompt's mechanically checkable rules, scored per violation.
+RULE_WEIGHTS = {"banned_word": 3, "contrastive": 3, "dash": 2, "broetry": 2}
+
+# "*" = any ending, so stems also catch inflected Russian forms.
+BANNED_WORDS = {
+    "en": [
+        "unlock*", "unleash*", "elevate*", "delve*", "delving", "dive", "dives", "diving", "deep dive*",
+        "humbled", "thrilled", "tapestr*", "game-changer*", "game changer*", "foster*", "harness*",
+        "potential", "journey*", "transformation*", "unique*", "key to success", "in today's landscape",
+        "in conclusion", "chaos", "chaotic", "shattered", "panic*", "battle*", "war",
+    ],
+    "ru": [
+        "раскры*", "раскрыть", "погрузи*", "погруж*", "уникальн*", "трансформаци*", "путешестви*",
+        "потенциал*", "ключ к успеху", "битв*", "хаос*", "разбит* надежд*",
+    ],
+}
+
+# Plain replacements that can't change the meaning (EN only: Russian inflection makes these unsafe).
+REPLACEMENTS = {
+    "en": {
+        "delve into": "look at", "delves into": "looks at", "delved into": "looked at", "delving into": "looking at",
+        "deep dive into": "close look at", "deep dive": "close look",
+        "game-changer": "big shift", "game changer": "big shift",
+        "in today's landscape": "today", "key to success": "what worked",
+        "thrilled": "glad", "humbled": "grateful",
+    },
+    "ru": {},
+}
+
+CONTRASTIVE = {
+    "en": [
+        r"\bnot (?:just |only |merely |simply )?[^.,;:!?\n]{1,60},? but\b",
+        r"\b(?:it's|it is|this is|that's|that is) not (?:about )?[^.!?\n]{1,60}[.,;]\s*(?:it's|it is|this is)\b",
+        r"\b(?:better|worse) than\b",
+    ],
+    "ru": [
+        r"(?<!\w)не (?:просто |только )?[^.,;:!?\n]{1,60}, а(?!\w)",
+        r"(?<!\w)(?:лучше|хуже),? чем(?!\w)",
+        r"(?<!\w)(?:более|менее),? чем(?!\w)(?!\s+\d)",
+    ],
+}
+
+# Em/en dash unless it's a numeric range (2019–2020); spaced hyphen inside a line (not a bullet).
+DASH = re.compile(r"(?<!\d)[—–]|[—–](?!\d)|(?<=\S)[ \t]+-[ \t]+(?=\S)")
+LIST_ITEM = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s")
+SENTENCE_END = re.compile(r"[.!?…]+(?=\s|$)")
+SHORT_LINE_CHARS = 140
+
+
+def _language_key(language):
+    return "ru" if language in ("Russian", "ru") else "en"
+
+def _word_pattern(word):
+    """'разбит* надежд*' matches any endings of both words, across any whitespace."""
+    return r"\s+".join(re.escape(t.rstrip("*")) + (r"\w*" if t.endswith("*") else "") for t in word.split())
+
+def _compile_words(words):
+    """One alternation regex; group i+1 matching means words[i] hit (read back via match.lastindex)."""
+    words = sorted(words, key=len, reverse=True)
+    alternatives = "|".join(f"({_word_pattern(w)})" for w in words)
+    return re.compile(r"(?<!\w)(?:" + alternatives + r")(?!\w)", re.IGNORECASE), words
+
+_BANNED = {lang: _compile_words(words) for lang, words in BANNED_WORDS.items()}
+_REPLACE = {
+    lang: (re.compile(r"(?<!\w)(" + "|".join(re.escape(p) for p in sorted(m, key=len, reverse=True)) + r")(?!\w)",
+                      re.IGNORECASE), m) if m else (None, m)
+    for lang, m in REPLACEMENTS.items()
+}
+_CONTRASTIVE = {lang: re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+                for lang, patterns in CONTRASTIVE.items()}
+
+
+# --- 1. FIXES ---
+def _is_one_sentence_line(line):
+    stripped = line.strip()
+    if not stripped or LIST_ITEM.match(stripped) or len(stripped) > SHORT_LINE_CHARS:
+        return False
+    return len(SENTENCE_END.findall(stripped)) <= 1
+
+def merge_broetry(text):
+    """Joins runs of SLOP_BROETRY_RUN+ one-sentence lines into one paragraph. Returns (text, runs merged)."""
+    tokens = re.split(r"(\n\s*)", text)       # line, separator, line, separator, ...
+    lines, seps = tokens[0::2], tokens[1::2] + [""]
+    out, run, merged = [], [], 0
+
+    def flush():
+        nonlocal merged
+        if len(run) >= SLOP_BROETRY_RUN:
+            merged += 1
+            out.append((" ".join(lines[i].strip() for i in run), seps[run[-1]]))
+        else:
+            out.extend((lines[i], seps[i]) for i in run)
+        run.clear()
+
+    for i, line in enumerate(lines):
+        if _is_one_sentence_line(line):
+            run.append(i)
+            continue
+        flush()
+        out.append((line, seps[i]))
+    flush()
+    return "".join(line + sep for line, sep in out), merged
+
+def _match_case(original, replacement):
+    return replacement[:1].upper() + replacement[1:] if original[:1].isupper() else replacement
+
+def replace_phrases(text, lang):
+    pattern, mapping = _REPLACE[lang]
+    if pattern is None:
+        return text, 0
+    count = 0
+
+    def swap(match):
+        nonlocal count
+        count += 1
+        return _match_case(match.group(0), mapping[match.group(0).lower()])
+    return pattern.sub(swap, text), count
+
+
+# --- 2. CHECKS ---
+def find_violations(text, lang):
+    violations = []
+    pattern, words = _BANNED[lang]
+    for match in pattern.finditer(text):
+        violations.append(("banned_word", words[match.lastindex - 1].replace("*", "")))
+    for match in _CONTRASTIVE[lang].finditer(text):
+        violations.append(("contrastive", match.group(0)))
+    for match in DASH.finditer(text):
+        violations.append(("dash", text[max(0, match.start() - 15):match.end() + 15].strip()))
+    run = 0
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        run = run + 1 if _is_one_sentence_line(line) else 0
+        if run == SLOP_BROETRY_RUN:
+            violations.append(("broetry", line.strip()[:40]))
+    return violations
+
+def lint(text, language="English"):
+    """
+    Applies the safe fixes, then scores what's left.
+    Returns {"text", "score", "violations": [(rule, snippet)], "fixes"}.
+    """
+    lang = _language_key(language)
+    text, merged = merge_broetry(text)
+    text, replaced = replace_phrases(text, lang)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    violations = find_violations(text, lang)
+    return {
+        "text": text,
+        "score": sum(RULE_WEIGHTS[rule] for rule, _ in violations),
+        "violations": violations,
+        "fixes": merged + replaced,
+    }
+
+
+# --- 3. THE PRE-PASS ---
+class SlopLinter:
+    """
+    Deterministic pre-pass for the Cleaner (services/cleaner.py).
+    lint() applies the safe fixes and scores what's left; a draft within SLOP_MAX_SCORE
+    skips the Cleaner's LLM round-trip entirely. The skip rate goes to /stats.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.skipped = 0
+        self.fixes = 0
+        self._lock = threading.Lock()
+
+    def prepass(self, text, language="English"):
+        """Lint report plus "skip": True when the draft can go out without the Cleaner call."""
+        if not SLOP_PREPASS or not text:
+            return {"text": text, "score": None, "violations": [], "fixes": 0, "skip": False}
+        report = lint(text, language)
+        report["skip"] = report["score"] <= SLOP_MAX_SCORE
+        with self._lock:
+            self.checked += 1
+            self.skipped += report["skip"]
+            self.fixes += report["fixes"]
+        rules = sorted({rule for rule, _ in report["violations"]})
+        print(f"🧽 Slop Linter: score {report['score']} ({', '.join(rules) or 'clean'}), "
+              f"{report['fixes']} fixed -> {'Cleaner skipped' if report['skip'] else 'Cleaner'}")
+        return report
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+                "fixes": self.fixes,
+            }
+
+
+slop_linter = SlopLinter()
+
+def format_slop_stats():
+    if not SLOP_PREPASS:
+        return "🧽 **Slop Linter:** disabled"
+    st = slop_linter.stats()
+    return (
+        f"🧽 **Slop Linter:** Cleaner skipped for {st['skip_rate']:.0%} of drafts "
+        f"({st['skipped']}/{st['checked']}, {st['fixes']} local fixes)"
+    )
@@ -0,0 +1,123 @@
+# services/stages.py
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import config  # noqa: F401  (loads .env once)
+from services.tracing import span, STAGE_WAIT_SECONDS
+
+# --- DEFAULT LIMITS: (concurrent jobs, max jobs waiting) ---
+# Override per stage with STAGE_<NAME>_CONCURRENCY / STAGE_<NAME>_QUEUE.
+DEFAULT_LIMITS = {
+    "transcribe": (8, 32),
+    "draft": (8, 32),
+    "clean": (8, 32),
+    "research": (4, 16),
+    "image": (2, 8),
+    "media": (2, 16),
+    "publish": (4, 32),
+}
+
+
+class StageBusy(Exception):
+    """Raised when a stage's wait queue is full. `position` is where the job would have queued."""
+
+    def __init__(self, stage_name, position):
+        self.stage_name = stage_name
+        self.position = position
+        super().__init__(f"Stage '{stage_name}' is busy (queue position #{position})")
+
+
+class Stage:
+    """
+    A named, bounded slot pool for one pipeline stage.
+    A burst in one stage (e.g. Imagen) can no longer starve the others.
+    """
+
+    def __init__(self, name, concurrency, max_queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=500)
+
+    @asynccontextmanager
+    async def slot(self, on_wait=None):
+        """
+        Holds one slot for the duration of the block.
+        `on_wait(position)` is awaited when the job has to queue; a full queue raises StageBusy.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise StageBusy(self.name, self.waiting + 1)
+
+        # The place in the queue is reserved before any await, so jobs arriving while
+        # on_wait() runs see it: the cap holds and every job gets its own position.
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            if on_wait and self._semaphore.locked():
+                await on_wait(self.waiting)
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self._waits.append(waited)
+        STAGE_WAIT_SECONDS.observe(waited, stage=self.name)
+
+        self.running += 1
+        try:
+            with span(f"stage.{self.name}", queued_seconds=round(waited, 3)):
+                yield
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self):
+        waits = sorted(self._waits)
+        p95 = waits[int(len(waits) * 0.95)] if waits else 0.0
+        return {
+            "stage": self.name,
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95": p95,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+def _build_stages():
+    stages = {}
+    for name, (concurrency, max_queue) in DEFAULT_LIMITS.items():
+        prefix = f"STAGE_{name.upper()}"
+        stages[name] = Stage(
+            name,
+            int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+            int(os.getenv(f"{prefix}_QUEUE", max_queue)),
+        )
+    return stages
+
+STAGES = _build_stages()
+
+def stage(name):
+    return STAGES[name]
+
+def format_stage_stats():
+    lines = ["📊 **Pipeline Stages**"]
+    for s in STAGES.values():
+        st = s.stats()
+        lines.append(
+            f"• {st['stage']}: {st['running']}/{st['concurrency']} running, "
+            f"{st['queue_depth']} queued, {st['rejected']} rejected, "
+            f"wait avg {st['wait_avg']:.2f}s / p95 {st['wait_p95']:.2f}s"
+        )
+    return "\n".join(lines)
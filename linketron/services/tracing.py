@@ -0,0 +1,191 @@
+# services/tracing.py
+import os
+import json
+import time
+import random
+import asyncio
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+import config  # noqa: F401  (loads .env once)
+from services.concurrency import Cancelled
+
+# --- CONFIGURATION ---
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"                     # one JSON line (span tree) per finished update
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))   # share of updates whose trees are logged
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))                 # 0 = no metrics server
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+
+# --- 1. METRICS ---
+# Prometheus-style histograms, stdlib only. Every finished span feeds SPAN_SECONDS;
+# outbound calls also feed PROVIDER_SECONDS, stage queueing STAGE_WAIT_SECONDS.
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(l, "")) for l in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                base = ",".join(f'{l}="{_escape(v)}"' for l, v in zip(self.labels, key))
+                sep = "," if base else ""
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{base}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{base}}} {series['count']}")
+        return "\n".join(lines)
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+SPAN_SECONDS = Histogram(
+    "linketron_span_seconds", "Duration of traced operations.", ("span", "status"))
+PROVIDER_SECONDS = Histogram(
+    "linketron_provider_seconds", "Latency of calls to external providers.", ("provider", "operation", "status"))
+STAGE_WAIT_SECONDS = Histogram(
+    "linketron_stage_wait_seconds", "Time jobs spent queued for a pipeline stage slot.", ("stage",))
+
+METRICS = [SPAN_SECONDS, PROVIDER_SECONDS, STAGE_WAIT_SECONDS]
+
+def render_metrics():
+    return "\n".join(h.render() for h in METRICS) + "\n"
+
+
+# --- 2. SPANS ---
+# One root span per Telegram update (TracingMiddleware), a child span for every service call.
+# The current span travels in a contextvar, so asyncio tasks spawned inside inherit it.
+# A task that outlives its parent (a background job started by a handler) gets a root of its own.
+_current = contextvars.ContextVar("linketron_span", default=None)
+
+
+class Span:
+    def __init__(self, name, parent=None, provider=None, **attrs):
+        self.name = name
+        self.provider = provider
+        self.attrs = attrs
+        self.children = []
+        self.status = "ok"
+        self.started = time.perf_counter()
+        self.duration = None
+        if parent is not None:
+            # user_id etc. flow down so every span can be filtered by user
+            for key in ("user_id", "update_id"):
+                if key in parent.attrs and key not in attrs:
+                    self.attrs[key] = parent.attrs[key]
+            if parent.duration is None:
+                parent.children.append(self)
+            else:
+                # The parent's tree is already closed (and logged): start a new one.
+                self.attrs.setdefault("follows", parent.name)
+                parent = None
+        self.parent = parent
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, status="error"):
+        self.status = status
+
+    def to_dict(self):
+        return {
+            "span": self.name,
+            "ms": round((self.duration or 0) * 1000, 1),
+            "status": self.status,
+            **({"provider": self.provider} if self.provider else {}),
+            **self.attrs,
+            **({"children": [c.to_dict() for c in self.children]} if self.children else {}),
+        }
+
+
+def current_span():
+    return _current.get()
+
+@contextmanager
+def span(name, provider=None, **attrs):
+    """
+    Times a block as a child of the current span. Exceptions mark it "error" (or "cancelled")
+    and propagate. `provider="gemini"` etc. also records it as an outbound provider call.
+    """
+    s = Span(name, parent=_current.get(), provider=provider, **attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except (asyncio.CancelledError, Cancelled):
+        s.fail("cancelled")
+        raise
+    except Exception as e:
+        s.fail("error")
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        s.duration = time.perf_counter() - s.started
+        SPAN_SECONDS.observe(s.duration, span=name, status=s.status)
+        if provider:
+            PROVIDER_SECONDS.observe(s.duration, provider=provider, operation=name, status=s.status)
+        if s.parent is None and TRACE_LOG and random.random() < TRACE_SAMPLE_RATE:
+            print(json.dumps(s.to_dict(), ensure_ascii=False, default=str))
+
+def traced(name, provider=None):
+    """Decorator: wraps every call of an async function in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name, provider=provider):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- 3. AIOGRAM MIDDLEWARE + /metrics ---
+def _update_user_id(update):
+    event = update.event if hasattr(update, "event") else None
+    user = getattr(event, "from_user", None)
+    return getattr(user, "id", None)
+
+class TracingMiddleware:
+    """Outer update middleware: one root span per Telegram update."""
+
+    async def __call__(self, handler, event, data):
+        with span("update", update_id=event.update_id, user_id=_update_user_id(event),
+                  update_type=event.event_type):
+            return await handler(event, data)
+
+async def metrics_handler(request):
+    from aiohttp import web
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+async def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves GET /metrics on its own port. Returns the runner (None when METRICS_PORT is unset)."""
+    if not port:
+        return None
+    from aiohttp import web
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return runner
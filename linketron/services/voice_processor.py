@@ -1,27 +1,35 @@
 import os
 import json
-import requests
-import google.generativeai as genai
-from dotenv import load_dotenv
-from services.editor import generate_viral_post  # <--- IMPORT THE GHOST
+import asyncio
+import tempfile
+from io import BytesIO
+import config  # noqa: F401  (loads .env once)
+from services.tracing import traced
+from services import http_client
+from services.stages import stage
+from services.concurrency import CancelToken
+from services import audio_chunker
+from services.llm import generate_text, partial_json_field
+from services.models import get_model, model_name
+from services.editor import generate_viral_post, generate_fused_post  # <--- IMPORT THE GHOST
 from services.cleaner import clean_ai_slop # <--- 1. Import the new layer
-
-load_dotenv()
+from services.slop_linter import slop_linter
 
 # --- CONFIGURATION ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not GEMINI_API_KEY:
-    print("❌ CRITICAL ERROR: GEMINI_API_KEY not found in .env file!")
-
-genai.configure(api_key=GEMINI_API_KEY)
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1").rstrip("/")
+VOICE_SPOOL_MAX_BYTES = int(os.getenv("VOICE_SPOOL_MAX_BYTES", str(4 * 1024 * 1024)))
+VOICE_MAX_BYTES = 25 * 1024 * 1024  # Groq's upload limit
+LONG_AUDIO_SECONDS = float(os.getenv("LONG_AUDIO_SECONDS", "120"))
+LONG_AUDIO_CONCURRENCY = int(os.getenv("LONG_AUDIO_CONCURRENCY", "4"))
 
-# ---------------------------------------------------------
-# CRITICAL FIX: Switched to 'gemini-2.0-flash-exp' 
-# 'gemini-3.0-pro-preview' was causing the infinite hang.
-# ---------------------------------------------------------
-model = genai.GenerativeModel('gemini-3-flash-preview')
+# Pipeline modes: "quality" = draft + Cleaner (two calls), "fast" = one fused call.
+PIPELINE_MODES = ("fast", "quality")
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "quality")
+PIPELINE_MODE_BY_LANGUAGE = {
+    "English": os.getenv("PIPELINE_MODE_EN"),
+    "Russian": os.getenv("PIPELINE_MODE_RU"),
+}
 
 # 1. THE CONSOLIDATED ESSAY PROMPTS
 ESSAY_PROMPT = """
@@ -80,86 +88,216 @@ ESSAY_PROMPT_RU = """
 
 
 
-def transcribe_audio_groq(file_path):
-    """Step 1: The Ear (Groq)"""
+def new_voice_spool():
+    """In-memory buffer for a voice note that rolls over to an anonymous temp file when it grows past the cap."""
+    return tempfile.SpooledTemporaryFile(max_size=VOICE_SPOOL_MAX_BYTES)
+
+@traced("transcribe.groq")
+async def transcribe_audio_groq(audio_file, filename="voice.ogg", content_type="audio/ogg"):
+    """Step 1: The Ear (Groq). `audio_file` is any readable file object; it is streamed into the multipart body."""
     if not GROQ_API_KEY: return "Error: Missing GROQ_API_KEY"
     
-    url = "https://api.groq.com/openai/v1/audio/transcriptions"
+    url = f"{GROQ_API_BASE}/audio/transcriptions"
     headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
     
-    with open(file_path, "rb") as file:
-        files = {"file": (os.path.basename(file_path), file, "audio/ogg")}
-        data = {"model": "whisper-large-v3", "response_format": "json"}
-        
-        try:
-            response = requests.post(url, headers=headers, files=files, data=data)
-            if response.status_code != 200: return f"Groq Error: {response.text}"
-            return response.json().get("text", "")
-        except Exception as e:
-            return f"Transcribe Exception: {str(e)}"
+    files = {"file": (filename, audio_file, content_type)}
+    data = {"model": model_name("transcribe"), "response_format": "json"}
+    
+    try:
+        response = await http_client.post(url, headers=headers, files=files, data=data)
+        if response.status_code != 200: return f"Groq Error: {response.text}"
+        return response.json().get("text", "")
+    except Exception as e:
+        return f"Transcribe Exception: {str(e)}"
         
-def generate_essay_draft(raw_text, language):
+def _is_transcription_error(text):
+    return text.startswith(("Error:", "Groq Error:", "Transcribe Exception:"))
+
+@traced("transcribe.long_audio")
+async def transcribe_long_audio(audio_file, duration):
+    """
+    Long-audio mode: split at silences, transcribe chunks concurrently, stitch in order.
+    Wall time becomes roughly that of the slowest chunk. Falls back to one upload if ffmpeg is missing or a chunk fails.
+    """
+    if not audio_chunker.ffmpeg_available():
+        return await transcribe_audio_groq(audio_file)
+
+    try:
+        audio_file.seek(0)
+        audio_bytes = audio_file.read()
+        silences = await audio_chunker.find_silences(audio_bytes)
+        windows = audio_chunker.plan_chunks(duration, silences)
+        print(f"✂️ Long Audio: {duration:.0f}s split into {len(windows)} chunks.")
+
+        limit = asyncio.Semaphore(LONG_AUDIO_CONCURRENCY)
+
+        async def transcribe_chunk(index, start, end):
+            async with limit:
+                chunk = await audio_chunker.extract_chunk(audio_bytes, start, end)
+                return await transcribe_audio_groq(BytesIO(chunk), f"chunk_{index}.flac", "audio/flac")
+
+        parts = await asyncio.gather(*(
+            transcribe_chunk(i, start, end) for i, (start, end) in enumerate(windows)
+        ))
+    except Exception as e:
+        print(f"❌ Long Audio Error: {e}. Falling back to a single upload.")
+        return await transcribe_audio_groq(audio_file)
+
+    failed = [p for p in parts if _is_transcription_error(p)]
+    if failed:
+        print(f"❌ Long Audio: {len(failed)} chunks failed ({failed[0]}). Falling back to a single upload.")
+        return await transcribe_audio_groq(audio_file)
+
+    return audio_chunker.merge_transcripts(parts)
+
+@traced("draft.essay")
+async def generate_essay_draft(raw_text, language, on_partial=None):
     """Simplified single-path generation."""
     selected_prompt = ESSAY_PROMPT_RU if language in ["Russian", "ru"] else ESSAY_PROMPT
     
     try:
-        response = model.generate_content(
+        response_text = await generate_text(
+            get_model("essay"),
             selected_prompt.format(transcript=raw_text, language=language),
-            generation_config={"response_mime_type": "application/json"}
+            generation_config={"response_mime_type": "application/json"},
+            on_partial=on_partial
         )
-        return json.loads(response.text.strip())
+        return json.loads(response_text.strip())
     except Exception as e:
         return {"title": "Error", "text": f"Drafting Error: {str(e)}"}
 
-def process_voice_note(file_path, language="English", research_context=None):
-    """The simplified pipeline."""
-    # 1. Transcription
-    raw_text = transcribe_audio_groq(file_path)
-    
-    # 2. Drafting (Branches only if research is present)
-    if research_context:
-        # Uses your updated editor.py for research-backed essays
-        initial_draft = generate_viral_post(research_context, raw_text, language)
-    else:
-        # Uses the new single essay logic
-        initial_draft = generate_essay_draft(raw_text, language)
-
-    # 3. Cleanup Logic
+def resolve_pipeline_mode(language, user_mode=None):
+    """Per-user choice wins, then the per-language default, then PIPELINE_MODE."""
+    for mode in (user_mode, PIPELINE_MODE_BY_LANGUAGE.get(language), PIPELINE_MODE):
+        if mode in PIPELINE_MODES:
+            return mode
+    return "quality"
+
+def _no_event(event):
+    pass
+
+def _partial_emitter(on_event, stage_name):
+    """
+    Turns raw streamed JSON into 'partial' events carrying the post text so far.
+    None when nobody listens, so the model call isn't streamed for nothing.
+    """
+    if on_event is _no_event:
+        return None
+
+    def on_partial(raw):
+        text = partial_json_field(raw)
+        if text:
+            on_event({"type": "partial", "stage": stage_name, "text": text})
+    return on_partial
+
+async def write_post(raw_text, language, research_context=None, mode=None, on_event=_no_event, cancel=None):
+    """
+    Turns raw input into the final post.
+    - fast: one fused draft+refine call.
+    - quality: draft (essay or viral writer), then the Cleaner pass, skipped when the
+      local Slop Linter finds nothing left to clean.
+    `on_event` receives stage and partial-text events as they happen.
+    `cancel` (CancelToken) is checked as each stage starts and before the result is returned.
+    """
+    mode = resolve_pipeline_mode(language, mode)
+    cancel = cancel or CancelToken()
+
+    if mode == "fast":
+        async with stage("draft").slot():
+            cancel.check()
+            on_event({"type": "stage", "stage": "draft"})
+            post = await generate_fused_post(
+                raw_text, language, research_context, on_partial=_partial_emitter(on_event, "draft")
+            )
+        cancel.check()
+        return post
+
+    # 1. Drafting (Branches only if research is present)
+    async with stage("draft").slot():
+        cancel.check()
+        on_event({"type": "stage", "stage": "draft"})
+        on_partial = _partial_emitter(on_event, "draft")
+        if research_context:
+            # Uses your updated editor.py for research-backed essays
+            initial_draft = await generate_viral_post(research_context, raw_text, language, on_partial=on_partial)
+        else:
+            # Uses the new single essay logic
+            initial_draft = await generate_essay_draft(raw_text, language, on_partial=on_partial)
+
+    # 2. Extract Draft
     draft_text = initial_draft.get('text') or initial_draft.get('post')
     draft_title = initial_draft.get('title') or "Professional Insight"
-    print(f"DEBUG: Text being sent to CLEANER: {draft_text[:100]}...")
     if not draft_text:
         print("DEBUG ALERT: draft_text is EMPTY before cleaner!")
 
+    # 3. Local pre-pass: safe fixes, and no Cleaner round-trip if nothing is left to clean
+    lint_report = slop_linter.prepass(draft_text, language)
+    if lint_report["skip"]:
+        cancel.check()
+        return {"title": draft_title, "text": lint_report["text"]}
+    draft_text = lint_report["text"] or draft_text
+
     # 4. Final Refinement (Cleaner.py handles the slop)
-    refined_post = clean_ai_slop(draft_text, language)
-    print(f"DEBUG: Cleaner output: {refined_post}")
+    cancel.check()   # before queueing for a clean slot
+    async with stage("clean").slot():
+        cancel.check()
+        on_event({"type": "stage", "stage": "clean"})
+        refined_post = await clean_ai_slop(draft_text, language, on_partial=_partial_emitter(on_event, "clean"))
+    cancel.check()
     
     return {
         "title": refined_post.get("title") or draft_title,
         "text": refined_post.get("text") or draft_text
     }
 
-def process_text_note(raw_text, language="English", research_context=None):
-    """Processes raw text input directly, bypassing audio transcription."""
+async def process_voice_note(audio_file, language="English", research_context=None, duration=None, mode=None,
+                             on_event=_no_event, cancel=None):
+    """The simplified pipeline. `audio_file` is the spooled voice note from Telegram, `duration` its length in seconds."""
+    cancel = cancel or CancelToken()
+    # 1. Transcription
+    async with stage("transcribe").slot():
+        cancel.check()
+        on_event({"type": "stage", "stage": "transcribe"})
+        if duration and duration >= LONG_AUDIO_SECONDS:
+            raw_text = await transcribe_long_audio(audio_file, duration)
+        else:
+            raw_text = await transcribe_audio_groq(audio_file)
+    cancel.check()
     
-    # 1. Drafting (Branches if research is present)
-    if research_context:
-        initial_draft = generate_viral_post(research_context, raw_text, language)
-    else:
-        initial_draft = generate_essay_draft(raw_text, language)
+    # 2. Drafting + Refinement
+    return await write_post(raw_text, language, research_context, mode, on_event, cancel)
 
-    # 2. Extract Draft
-    draft_text = initial_draft.get('text') or initial_draft.get('post')
-    draft_title = initial_draft.get('title') or "Professional Insight"
-    
-    if not draft_text:
-        print("DEBUG ALERT: draft_text is EMPTY before cleaner!")
+async def process_text_note(raw_text, language="English", research_context=None, mode=None, on_event=_no_event,
+                            cancel=None):
+    """Processes raw text input directly, bypassing audio transcription."""
+    return await write_post(raw_text, language, research_context, mode, on_event, cancel)
 
-    # 3. Final Refinement (Cleaner)
-    refined_post = clean_ai_slop(draft_text, language)
-    
-    return {
-        "title": refined_post.get("title") or draft_title,
-        "text": refined_post.get("text") or draft_text
-    }
\ No newline at end of file
+
+# --- STREAMING INTERFACE ---
+async def stream_pipeline(pipeline, *args, **kwargs):
+    """
+    Runs `process_voice_note` / `process_text_note` and yields its events as they happen:
+      {"type": "stage", "stage": ...}, {"type": "partial", "stage": ..., "text": ...}, {"type": "done", "post": {...}}
+    Pipeline exceptions are re-raised to the consumer.
+    """
+    queue = asyncio.Queue()
+    task = asyncio.create_task(pipeline(*args, on_event=queue.put_nowait, **kwargs))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+        yield {"type": "done", "post": task.result()}
+    finally:
+        if not task.done():
+            task.cancel()
+
+def stream_voice_note(audio_file, language="English", research_context=None, duration=None, mode=None, cancel=None):
+    return stream_pipeline(process_voice_note, audio_file, language, research_context, duration=duration, mode=mode,
+                           cancel=cancel)
+
+def stream_text_note(raw_text, language="English", research_context=None, mode=None, cancel=None):
+    return stream_pipeline(process_text_note, raw_text, language, research_context, mode=mode, cancel=cancel)
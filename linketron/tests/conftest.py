@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The bot imports its modules as `services.x` / `config` from linketron/.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+# tests/test_audio_chunker.py
+from services.audio_chunker import plan_chunks, merge_transcripts
+
+
+# --- plan_chunks ---
+def test_short_audio_is_one_chunk():
+    assert plan_chunks(45, [(10, 11)], target=60, max_len=90, overlap=1.5) == [(0.0, 45)]
+
+def test_cuts_in_the_middle_of_silences_near_the_target():
+    windows = plan_chunks(150, [(58, 60), (119, 121)], target=60, max_len=90, overlap=1.5)
+    assert windows == [(0.0, 60.5), (57.5, 121.5), (118.5, 150)]
+
+def test_hard_cuts_at_max_len_without_silence():
+    windows = plan_chunks(200, [], target=60, max_len=90, overlap=1.5)
+    assert windows == [(0.0, 91.5), (88.5, 181.5), (178.5, 200)]
+
+def test_silence_too_early_in_the_window_is_ignored():
+    # A pause at 10s is before target/2, so the cut falls back to max_len.
+    windows = plan_chunks(120, [(9, 11)], target=60, max_len=90, overlap=0)
+    assert windows == [(0.0, 90.0), (90.0, 120)]
+
+def test_neighbouring_chunks_overlap_and_cover_the_whole_note():
+    windows = plan_chunks(600, [(s, s + 1) for s in range(30, 600, 47)], target=60, max_len=90, overlap=1.5)
+    assert windows[0][0] == 0.0 and windows[-1][1] == 600
+    for (_, end), (start, _) in zip(windows, windows[1:]):
+        assert end - start == 3.0
+    assert all(end - start <= 90 + 3.0 for start, end in windows)
+
+
+# --- merge_transcripts ---
+def test_drops_the_repeated_words_at_a_boundary():
+    merged = merge_transcripts(["Hello there, my friend.", "My friend, how are you?"])
+    assert merged == "Hello there, my friend. how are you?"
+
+def test_prefers_the_longest_overlap():
+    merged = merge_transcripts(["we ship it and we ship", "and we ship it fast"])
+    assert merged == "we ship it and we ship it fast"
+
+def test_joins_parts_without_overlap():
+    assert merge_transcripts(["First part.", "Second part."]) == "First part. Second part."
+
+def test_skips_empty_parts():
+    assert merge_transcripts(["one two", None, "", "  ", "three four"]) == "one two three four"
+
+def test_part_fully_inside_the_overlap_adds_nothing():
+    assert merge_transcripts(["so the plan is done", "plan is done"]) == "so the plan is done"
+
+def test_overlap_search_is_bounded():
+    tail = " ".join(f"w{i}" for i in range(10))
+    merged = merge_transcripts([tail, tail + " next"], max_overlap_words=5)
+    assert merged == f"{tail} {tail} next"
@@ -0,0 +1,92 @@
+# tests/test_long_audio.py
+"""
+transcribe_long_audio against a local fake of Groq's /audio/transcriptions.
+ffmpeg is replaced by fixed silences and chunks that carry their own index, so the
+test runs without it; the upload, the parallelism and the fallback are real.
+"""
+import asyncio
+from io import BytesIO
+from aiohttp import web
+from services import audio_chunker, http_client
+from services import voice_processor
+
+CHUNK_TEXTS = [
+    "Last quarter we rebuilt the onboarding flow",
+    "the onboarding flow from scratch and churn dropped",
+    "churn dropped by a third in six weeks",
+]
+FULL_TEXT = "Single upload transcript."
+
+
+class FakeGroq:
+    def __init__(self, delay=0.05, fail_chunk=None):
+        self.delay = delay
+        self.fail_chunk = fail_chunk
+        self.uploads = []
+        self.active = 0
+        self.max_active = 0
+
+    async def transcriptions(self, request):
+        form = await request.post()
+        upload = form["file"]
+        body = upload.file.read()
+        self.uploads.append(upload.filename)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if upload.filename == "voice.ogg":
+            return web.json_response({"text": FULL_TEXT})
+        index = int(body.decode())
+        if index == self.fail_chunk:
+            return web.json_response({"error": {"message": "bad chunk"}}, status=400)
+        return web.json_response({"text": CHUNK_TEXTS[index]})
+
+
+async def _transcribe(monkeypatch, fake):
+    app = web.Application()
+    app.router.add_post("/openai/v1/audio/transcriptions", fake.transcriptions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    windows = [(0.0, 61.5), (58.5, 121.5), (118.5, 150.0)]
+
+    async def find_silences(audio_bytes):
+        return [(59, 61), (119, 121)]
+
+    async def extract_chunk(audio_bytes, start, end):
+        return str(windows.index((start, end))).encode()
+
+    monkeypatch.setattr(voice_processor, "GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(voice_processor, "GROQ_API_BASE", f"http://127.0.0.1:{port}/openai/v1")
+    monkeypatch.setattr(audio_chunker, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(audio_chunker, "find_silences", find_silences)
+    monkeypatch.setattr(audio_chunker, "extract_chunk", extract_chunk)
+    monkeypatch.setattr(audio_chunker, "plan_chunks", lambda duration, silences: windows)
+    try:
+        return await voice_processor.transcribe_long_audio(BytesIO(b"OggS fake voice note"), 150.0)
+    finally:
+        await http_client.close_session()
+        await runner.cleanup()
+
+
+def test_chunks_are_transcribed_in_parallel_and_stitched(monkeypatch):
+    fake = FakeGroq()
+    text = asyncio.run(_transcribe(monkeypatch, fake))
+
+    assert text == "Last quarter we rebuilt the onboarding flow from scratch and churn dropped by a third in six weeks"
+    assert sorted(fake.uploads) == ["chunk_0.flac", "chunk_1.flac", "chunk_2.flac"]
+    assert fake.max_active > 1
+
+def test_failed_chunk_falls_back_to_a_single_upload(monkeypatch):
+    fake = FakeGroq(fail_chunk=1)
+    text = asyncio.run(_transcribe(monkeypatch, fake))
+
+    assert text == FULL_TEXT
+    assert fake.uploads[-1] == "voice.ogg"
+    assert len(fake.uploads) == 4
@@ -0,0 +1,165 @@
+# tests/test_publish_queue.py
+"""
+PublishQueue jobs run one step at a time (_claim + _run_job) against the LinkedIn stand-in
+from benchmarks/linkedin_stand_in.py. HTTP backoff is zeroed so retries don't sleep.
+"""
+import time
+import asyncio
+import pytest
+from aiohttp import web
+from benchmarks.linkedin_stand_in import LinkedInStandIn
+from services import http_client, linkedin_publisher, publish_queue
+from services.publish_queue import PublishQueue, PUBLISH_BACKOFF_BASE
+from services.stages import StageBusy
+
+CREDS = {"access_token": "test-token", "user_urn": "TEST_USER"}
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    async def __call__(self, job, text):
+        self.messages.append(text)
+
+
+def _queue(tmp_path, notify):
+    return PublishQueue(str(tmp_path / "publish_queue.db"), get_credentials=lambda user_id: CREDS, notify=notify)
+
+def _next_attempt_at(queue, job_id):
+    return queue._conn.execute("SELECT next_attempt_at FROM publish_jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+async def _with_stand_in(monkeypatch, stand_in, scenario):
+    runner = web.AppRunner(stand_in.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    monkeypatch.setattr(linkedin_publisher, "LINKEDIN_API_BASE", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_BASE", 0)
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_MAX", 0)
+    try:
+        return await scenario()
+    finally:
+        await http_client.close_session()
+        await runner.cleanup()
+
+
+# --- retries ---
+@pytest.mark.parametrize("step", ["register", "upload"])
+@pytest.mark.parametrize("status", [429, 503])
+def test_busy_register_or_upload_is_retried_with_backoff(monkeypatch, tmp_path, step, status):
+    # One more failure than the HTTP client retries, so the queue has to back off.
+    stand_in = LinkedInStandIn(fail_status=status, fail_first=http_client.HTTP_MAX_RETRIES + 1, fail_steps=[step])
+    notify = Recorder()
+    queue = _queue(tmp_path, notify)
+
+    async def scenario():
+        job, _ = queue.enqueue("u1:d1", "u1", 1, "Post text", image=b"image bytes", image_mime="image/png")
+        started = time.time()
+        await queue._run_job(queue._claim())
+        first = queue.get("u1:d1")
+        assert first["status"] == "retry"
+        assert first["create_sent_at"] is None
+        assert _next_attempt_at(queue, job["id"]) - started >= PUBLISH_BACKOFF_BASE / 2
+        assert queue._claim() is None
+
+        queue._update(job["id"], next_attempt_at=0)
+        await queue._run_job(queue._claim())
+        return first
+
+    asyncio.run(_with_stand_in(monkeypatch, stand_in, scenario))
+    job = queue.get("u1:d1")
+    queue.close()
+
+    assert stand_in.calls[step] == http_client.HTTP_MAX_RETRIES + 2
+    assert job["status"] == "done" and job["attempts"] == 2
+    assert len(stand_in.posts) == 1
+    assert notify.messages[0].startswith("⏳ **LinkedIn is busy.**")
+
+def test_5xx_on_create_is_not_retried(monkeypatch, tmp_path):
+    stand_in = LinkedInStandIn(fail_status=503, fail_first=1, fail_steps=["create"])
+    notify = Recorder()
+    queue = _queue(tmp_path, notify)
+
+    async def scenario():
+        queue.enqueue("u1:d1", "u1", 1, "Post text")
+        await queue._run_job(queue._claim())
+        assert queue._claim() is None
+
+    asyncio.run(_with_stand_in(monkeypatch, stand_in, scenario))
+    job = queue.get("u1:d1")
+    queue.close()
+
+    assert stand_in.calls["create"] == 1
+    assert job["status"] == "failed"
+    assert "check your feed" in notify.messages[-1]
+
+def test_busy_publish_stage_is_rescheduled(monkeypatch, tmp_path):
+    class FullStage:
+        def slot(self):
+            raise StageBusy("publish", 33)
+
+    monkeypatch.setattr(publish_queue, "stage", lambda name: FullStage())
+    notify = Recorder()
+    queue = _queue(tmp_path, notify)
+    job, _ = queue.enqueue("u1:d1", "u1", 1, "Post text")
+    asyncio.run(queue._run_job(queue._claim()))
+    retried = queue.get("u1:d1")
+    next_attempt_at = _next_attempt_at(queue, job["id"])
+    queue.close()
+
+    assert retried["status"] == "retry"
+    assert next_attempt_at > time.time()
+    assert notify.messages[0].startswith("⏳ **Publishing is busy.**")
+
+
+# --- idempotency and leases ---
+def test_same_idempotency_key_gives_one_job(tmp_path):
+    queue = _queue(tmp_path, None)
+    first, created = queue.enqueue("u1:d1", "u1", 1, "Post text")
+    second, created_again = queue.enqueue("u1:d1", "u1", 1, "Post text")
+    stats = queue.stats()
+    queue.close()
+
+    assert created and not created_again
+    assert second["id"] == first["id"]
+    assert stats == {"queued": 1}
+
+def test_reclaimed_job_after_create_sent_is_not_reposted(monkeypatch, tmp_path):
+    stand_in = LinkedInStandIn()
+    queue = _queue(tmp_path, Recorder())
+
+    async def scenario():
+        job, _ = queue.enqueue("u1:d1", "u1", 1, "Post text")
+        queue._claim()
+        # The worker crashed after sending the create call; its lease has run out.
+        queue._update(job["id"], create_sent_at=time.time() - 600, lease_until=time.time() - 1)
+        reclaimed = queue._claim()
+        assert reclaimed["orphaned"]
+        assert queue._claim() is None
+
+    asyncio.run(_with_stand_in(monkeypatch, stand_in, scenario))
+    job = queue.get("u1:d1")
+    queue.close()
+
+    assert job["status"] == "failed"
+    assert stand_in.calls["create"] == 0 and stand_in.posts == []
+
+def test_worker_that_lost_its_lease_does_not_post(monkeypatch, tmp_path):
+    stand_in = LinkedInStandIn()
+    queue = _queue(tmp_path, Recorder())
+
+    async def scenario():
+        queue.enqueue("u1:d1", "u1", 1, "Post text")
+        job = queue._claim()
+        queue._update(job["id"], lease_owner="another-worker")
+        await queue._run_job(job)
+
+    asyncio.run(_with_stand_in(monkeypatch, stand_in, scenario))
+    job = queue.get("u1:d1")
+    queue.close()
+
+    assert stand_in.calls["create"] == 0
+    assert job["status"] == "running" and job["create_sent_at"] is None
@@ -0,0 +1,73 @@
+# tests/test_slop_linter.py
+from services.slop_linter import lint, merge_broetry, find_violations, replace_phrases
+
+
+def _rules(text, lang="en"):
+    return [rule for rule, _ in find_violations(text, lang)]
+
+
+# --- dashes ---
+def test_numeric_ranges_are_not_dashes():
+    assert _rules("We grew 3x in 2019–2020 and again in 2021—2022.") == []
+
+def test_em_dash_between_words_is_flagged():
+    assert _rules("We shipped it — and it broke.") == ["dash"]
+
+def test_spaced_hyphen_inside_a_line_is_flagged_but_not_a_bullet():
+    assert _rules("We shipped it - and it broke.") == ["dash"]
+    assert _rules("- first point, with detail\n- second point, with detail") == []
+
+
+# --- broetry ---
+def test_one_sentence_lines_are_merged_into_a_paragraph():
+    text, merged = merge_broetry("I quit my job.\n\nI was scared.\nThen I built this.\nIt paid off. Mostly.")
+    assert merged == 1
+    assert text == "I quit my job. I was scared. Then I built this.\nIt paid off. Mostly."
+
+def test_short_runs_are_left_alone():
+    text = "I quit my job.\nI was scared.\nIt paid off. Mostly.\nThen I built this."
+    assert merge_broetry(text) == (text, 0)
+
+def test_bullet_lists_are_not_broetry():
+    text = "What changed:\n- Faster builds.\n- Fewer flaky tests.\n- Smaller images.\n1. One more.\n2) And another."
+    assert merge_broetry(text) == (text, 0)
+    assert "broetry" not in _rules(text)
+
+
+# --- banned words ---
+def test_russian_stems_match_inflected_forms():
+    report = lint("Это история разбитых   надежд и хаоса в команде.", "Russian")
+    assert ("banned_word", "разбит надежд") in report["violations"]
+    assert ("banned_word", "хаос") in report["violations"]
+
+def test_stems_do_not_match_inside_other_words():
+    assert _rules("Мы обсудили битвы.", "ru") == ["banned_word"]
+    assert _rules("Он был в отпуске.", "ru") == []
+
+def test_english_banned_words_are_case_insensitive():
+    assert _rules("Unlocking growth is a Journey.") == ["banned_word", "banned_word"]
+
+
+# --- replacements ---
+def test_replacements_keep_the_case_of_the_original():
+    text, count = replace_phrases("Delve into the data. Then delve into the logs.", "en")
+    assert count == 2
+    assert text == "Look at the data. Then look at the logs."
+
+def test_longest_phrase_wins():
+    assert replace_phrases("A deep dive into metrics.", "en") == ("A close look at metrics.", 1)
+
+def test_russian_text_is_never_rewritten():
+    text = "Погрузимся в детали."
+    assert replace_phrases(text, "ru") == (text, 0)
+
+
+# --- lint ---
+def test_clean_draft_scores_zero():
+    report = lint("We cut build times by 40% in 2023–2024. Here is how.\n\nThe trick was caching.")
+    assert report["score"] == 0 and report["violations"] == []
+
+def test_fixed_phrases_no_longer_count():
+    report = lint("I was thrilled to delve into this.")
+    assert report["text"] == "I was glad to look at this."
+    assert report["fixes"] == 2 and report["score"] == 0